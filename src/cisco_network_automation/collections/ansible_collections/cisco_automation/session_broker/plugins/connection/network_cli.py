@@ -0,0 +1,192 @@
+# GNU General Public License v3.0+ (see https://www.gnu.org/licenses/gpl-3.0.txt)
+"""
+network_cli over the local session broker
+Reuses ansible.netcommon's network_cli (terminal, cliconf, prompt handling) but
+leases its shell from the session broker, so device login, enable and terminal
+setup happen once per pooled session instead of once per play.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import yaml
+
+from ansible.errors import AnsibleConnectionFailure
+from ansible.module_utils.common.text.converters import to_text
+from ansible_collections.ansible.netcommon.plugins.connection import network_cli
+from ansible_collections.cisco_automation.session_broker.plugins.plugin_utils import broker
+
+BROKER_OPTIONS = """
+session_broker_socket:
+  description:
+  - Unix socket of the session broker. The broker is started on first use if it is not running.
+  default: ~/.ansible/session_broker/broker.sock
+  type: string
+  env:
+  - name: ANSIBLE_SESSION_BROKER_SOCKET
+  ini:
+  - section: session_broker
+    key: socket
+  vars:
+  - name: ansible_session_broker_socket
+session_broker_idle_timeout:
+  description:
+  - Seconds an unused pooled session stays open. Applies when this plugin starts the broker.
+  default: 600
+  type: int
+  env:
+  - name: ANSIBLE_SESSION_BROKER_IDLE_TIMEOUT
+  ini:
+  - section: session_broker
+    key: idle_timeout
+session_broker_max_sessions:
+  description:
+  - Concurrent sessions the broker keeps per device (vty budget). Applies when this plugin starts the broker.
+  default: 2
+  type: int
+  env:
+  - name: ANSIBLE_SESSION_BROKER_MAX_SESSIONS
+  ini:
+  - section: session_broker
+    key: max_sessions
+session_broker_health_interval:
+  description:
+  - Seconds between health probes of idle pooled sessions. Applies when this plugin starts the broker.
+  default: 60
+  type: int
+  env:
+  - name: ANSIBLE_SESSION_BROKER_HEALTH_INTERVAL
+  ini:
+  - section: session_broker
+    key: health_interval
+session_broker_exit_after:
+  description:
+  - Seconds the broker keeps running with no sessions before exiting, 0 to run until stopped.
+  default: 3600
+  type: int
+  ini:
+  - section: session_broker
+    key: exit_after
+session_broker_terminal_setup:
+  description:
+  - Commands the broker runs once after login on each new session.
+  default: [terminal length 0, terminal width 512]
+  type: list
+  elements: string
+  vars:
+  - name: ansible_session_broker_terminal_setup
+session_broker_fallback:
+  description:
+  - Connect directly like network_cli when the broker cannot be reached.
+  default: true
+  type: boolean
+  env:
+  - name: ANSIBLE_SESSION_BROKER_FALLBACK
+  ini:
+  - section: session_broker
+    key: fallback
+  vars:
+  - name: ansible_session_broker_fallback
+"""
+
+_doc = yaml.safe_load(network_cli.DOCUMENTATION)
+_doc["name"] = "network_cli"
+_doc["short_description"] = "network_cli with pooled sessions from a local session broker"
+_doc["description"] = [
+    "Drop-in for ansible.netcommon.network_cli. Device shells are leased from a local"
+    " session broker daemon that keeps them authenticated, privileged and terminal-prepared"
+    " across plays and playbook runs, with idle eviction, per-device caps and health checks."
+]
+_doc["options"].update(yaml.safe_load(BROKER_OPTIONS))
+DOCUMENTATION = yaml.safe_dump(_doc, default_flow_style=False)
+
+
+class Connection(network_cli.Connection):
+    """network_cli whose shell is a session leased from the broker"""
+
+    transport = "cisco_automation.session_broker.network_cli"
+
+    def __init__(self, play_context, new_stdin, *args, **kwargs):
+        self._lease = None
+        super(Connection, self).__init__(play_context, new_stdin, *args, **kwargs)
+
+    @property
+    def ssh_type(self):
+        # The leased shell is a plain socket, read the way paramiko channels are
+        if self._lease is not None:
+            return "paramiko"
+        return super(Connection, self).ssh_type
+
+    def _lease_params(self):
+        become = bool(self._play_context.become)
+        return {
+            "host": self.get_option("host"),
+            "port": self.get_option("port"),
+            "username": self.get_option("remote_user") or self._play_context.remote_user,
+            "password": self.get_option("password"),
+            "private_key_file": self.get_option("private_key_file"),
+            "timeout": self.get_option("persistent_connect_timeout"),
+            "become": become,
+            "become_pass": self._play_context.become_pass if become else None,
+            "prompt_patterns": [to_text(regex.pattern) for regex in self._terminal.terminal_stdout_re],
+            "setup_commands": self.get_option("session_broker_terminal_setup"),
+        }
+
+    def _daemon_options(self):
+        return {
+            "idle_timeout": self.get_option("session_broker_idle_timeout"),
+            "max_sessions": self.get_option("session_broker_max_sessions"),
+            "health_interval": self.get_option("session_broker_health_interval"),
+            "exit_after": self.get_option("session_broker_exit_after"),
+        }
+
+    def _connect(self):
+        if self.connected:
+            return self
+
+        socket_path = self.get_option("session_broker_socket")
+        try:
+            sock, lease = broker.lease(
+                socket_path,
+                self._lease_params(),
+                daemon_options=self._daemon_options(),
+                timeout=self.get_option("persistent_connect_timeout"),
+            )
+        except broker.BrokerError as e:
+            if not self.get_option("session_broker_fallback"):
+                raise AnsibleConnectionFailure(to_text(e))
+            self.queue_message("warning", "session broker unavailable, connecting directly: %s" % e)
+            return super(Connection, self)._connect()
+
+        self._lease = lease
+        self._single_user_mode = self.get_option("single_user_mode")
+        self._ssh_shell = sock
+        self._ssh_shell.settimeout(self.get_option("persistent_command_timeout"))
+        self._connected = True
+        self.queue_message(
+            "vvvv",
+            "leased %s session from broker (%s leases)"
+            % ("new" if lease["fresh"] else "pooled", lease["leases"]),
+        )
+
+        # The broker replays the current prompt; consume it like a login prompt
+        self.receive()
+
+        if self._play_context.become and not lease["privileged"]:
+            self.queue_message("vvvv", "firing event: on_become")
+            self._on_become(become_pass=self._play_context.become_pass)
+
+        return self
+
+    def close(self):
+        if self._lease is None:
+            return super(Connection, self).close()
+
+        # Hand the session back instead of logging out
+        if self._ssh_shell:
+            self._ssh_shell.close()
+            self._ssh_shell = None
+        self._lease = None
+        self.queue_message("debug", "returned session to broker")
+        super(network_cli.Connection, self).close()
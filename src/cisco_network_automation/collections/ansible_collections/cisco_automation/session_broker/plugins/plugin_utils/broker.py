@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Device Session Broker
+Local daemon that keeps authenticated, privileged and terminal-prepared device
+CLI sessions alive across plays and playbook runs. The network_cli connection
+plugin leases a session over a Unix socket; after a one-line JSON handshake the
+socket is spliced byte-for-byte onto the pooled SSH shell.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import errno
+import hashlib
+import select
+import socket
+import logging
+import argparse
+import threading
+import subprocess
+import socketserver
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('session_broker')
+
+DEFAULT_SOCKET = '~/.ansible/session_broker/broker.sock'
+# Same shapes as the cisco.ios terminal plugin
+DEFAULT_PROMPT_PATTERNS = [r'[\r\n]?[\w\+\-\.:\/\[\]]+(?:\([^\)]+\)){0,3}(?:[>#]) ?$']
+BECOME_PROMPT = re.compile(rb'[\r\n]?(?:.*)?[Pp]assword: ?$')
+PROBE_RECHECK_SECONDS = 2.0
+
+
+class BrokerError(Exception):
+    """Raised when a session cannot be leased"""
+
+
+def session_identity(params: Dict[str, Any]) -> Tuple[Optional[str], bool, str]:
+    """Pool key within a device: user, privilege and a digest of the credentials used"""
+    credentials = json.dumps([params.get('password'), params.get('private_key_file'),
+                              params.get('become_pass') if params.get('become') else None])
+    return (params.get('username'), bool(params.get('become')),
+            hashlib.sha256(credentials.encode()).hexdigest())
+
+
+class DeviceSession:
+    """One authenticated shell on a device"""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.params = params
+        self.identity = session_identity(params)
+        self.timeout = float(params.get('timeout') or 30)
+        self.prompt_re = [re.compile(p.encode()) for p in params.get('prompt_patterns') or DEFAULT_PROMPT_PATTERNS]
+        self.client = None
+        self.channel = None
+        self.prompt = b''
+        self.created = self.last_used = self.last_checked = time.monotonic()
+        self.leases = 0
+
+    @property
+    def privileged(self) -> bool:
+        return self.prompt.rstrip().endswith(b'#')
+
+    @property
+    def alive(self) -> bool:
+        return (self.channel is not None and not self.channel.closed
+                and self.client.get_transport() is not None and self.client.get_transport().is_active())
+
+    def open(self) -> 'DeviceSession':
+        """Log in, escalate and run terminal setup once for the life of the session"""
+        try:
+            import paramiko
+        except ImportError as e:
+            raise BrokerError("The session broker requires paramiko (pip install paramiko)") from e
+
+        params = self.params
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(
+                params['host'], port=int(params.get('port') or 22),
+                username=params.get('username'), password=params.get('password'),
+                key_filename=params.get('private_key_file'),
+                look_for_keys=not params.get('password'), allow_agent=not params.get('password'),
+                timeout=self.timeout, banner_timeout=self.timeout, auth_timeout=self.timeout,
+            )
+        except Exception as e:
+            client.close()
+            raise BrokerError(f"SSH login to {params['host']}:{params.get('port', 22)} failed: {e}") from e
+
+        self.client = client
+        self.channel = client.invoke_shell()
+        self.channel.settimeout(self.timeout)
+        try:
+            self.read_until_prompt()
+            if params.get('become') and not self.privileged:
+                self._enable(params.get('become_pass'))
+            for command in params.get('setup_commands') or []:
+                self.command(command)
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def read_until_prompt(self, extra: Optional[re.Pattern] = None) -> bytes:
+        """Read until the device prompt (or `extra`) ends the buffer"""
+        buffer = b''
+        while True:
+            try:
+                data = self.channel.recv(4096)
+            except socket.timeout as e:
+                raise BrokerError(f"Timed out waiting for prompt from {self.params['host']}") from e
+            if not data:
+                raise BrokerError(f"Session to {self.params['host']} closed by device")
+            buffer += data
+            window = buffer[-256:]
+            if extra is not None and extra.search(window):
+                return buffer
+            if any(regex.search(window) for regex in self.prompt_re):
+                self.prompt = buffer.rsplit(b'\n', 1)[-1].strip(b'\r')
+                return buffer
+
+    def command(self, command: str) -> bytes:
+        self.channel.sendall(command.encode() + b'\r')
+        return self.read_until_prompt()
+
+    def _enable(self, password: Optional[str]) -> None:
+        self.channel.sendall(b'enable\r')
+        self.read_until_prompt(extra=BECOME_PROMPT)
+        if not self.privileged:
+            self.channel.sendall((password or '').encode() + b'\r')
+            self.read_until_prompt()
+        if not self.privileged:
+            raise BrokerError(f"Privilege escalation failed on {self.params['host']}")
+
+    def probe(self) -> None:
+        """Health check: the shell answers a bare newline with a prompt, outside config mode"""
+        self.channel.sendall(b'\r')
+        self.read_until_prompt()
+        if b'(config' in self.prompt:
+            self.command('end')
+        self.last_checked = time.monotonic()
+
+    def close(self) -> None:
+        try:
+            if self.channel is not None:
+                self.channel.close()
+            if self.client is not None:
+                self.client.close()
+        finally:
+            self.channel = None
+
+
+class SessionBroker:
+    """Per-device session pools with concurrency caps, idle eviction and health checks"""
+
+    def __init__(self, idle_timeout: float = 600, max_sessions_per_device: int = 2,
+                 health_interval: float = 60, acquire_timeout: float = 60, exit_after: float = 0):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions_per_device
+        self.health_interval = health_interval
+        self.acquire_timeout = acquire_timeout
+        self.exit_after = exit_after
+
+        self._pools: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+        self._last_activity = time.monotonic()
+        self.stats = {'leases': 0, 'opened': 0, 'reused': 0, 'waits': 0, 'evicted_idle': 0,
+                      'health_failures': 0, 'closed_unhealthy': 0}
+
+    @staticmethod
+    def device(params: Dict[str, Any]) -> Tuple[str, int]:
+        return params['host'], int(params.get('port') or 22)
+
+    def _pool(self, device: Tuple[str, int]) -> Dict[str, Any]:
+        pool = self._pools.get(device)
+        if pool is None:
+            pool = self._pools[device] = {'idle': [], 'busy': 0}
+        return pool
+
+    def acquire(self, params: Dict[str, Any]) -> Tuple[DeviceSession, bool]:
+        """Lease a session for a device; returns (session, fresh)"""
+        device = self.device(params)
+        identity = session_identity(params)
+        deadline = time.monotonic() + float(params.get('acquire_timeout') or self.acquire_timeout)
+        stale = None
+        waited = False
+
+        with self._cond:
+            while True:
+                pool = self._pool(device)
+                session = next((s for s in reversed(pool['idle']) if s.identity == identity), None)
+                if session is not None:
+                    pool['idle'].remove(session)
+                    pool['busy'] += 1
+                    break
+                if pool['busy'] + len(pool['idle']) < self.max_sessions:
+                    pool['busy'] += 1
+                    break
+                if pool['idle']:
+                    # At the cap with only other-identity sessions idle: replace one
+                    stale = pool['idle'].pop(0)
+                    pool['busy'] += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BrokerError(f"{device[0]} is at its limit of {self.max_sessions} concurrent sessions")
+                if not waited:
+                    self.stats['waits'] += 1
+                    waited = True
+                self._cond.wait(remaining)
+            self.stats['leases'] += 1
+            self._last_activity = time.monotonic()
+
+        if stale is not None:
+            stale.close()
+
+        try:
+            if session is not None:
+                if time.monotonic() - session.last_checked > PROBE_RECHECK_SECONDS:
+                    try:
+                        session.probe()
+                    except Exception as e:
+                        logger.info(f"Pooled session to {device[0]} failed health check: {e}")
+                        self.stats['health_failures'] += 1
+                        session.close()
+                        session = None
+                if session is not None:
+                    self.stats['reused'] += 1
+                    session.leases += 1
+                    return session, False
+
+            session = DeviceSession(params).open()
+            self.stats['opened'] += 1
+            session.leases += 1
+            logger.info(f"Opened session to {device[0]}:{device[1]} as {params.get('username')}")
+            return session, True
+        except Exception:
+            with self._cond:
+                self._pool(device)['busy'] -= 1
+                self._cond.notify_all()
+            raise
+
+    def release(self, session: DeviceSession, healthy: bool = True) -> None:
+        """Return a session to its pool, resetting it to the exec prompt"""
+        if healthy:
+            try:
+                session.probe()
+            except Exception as e:
+                logger.info(f"Session to {session.params['host']} unusable after lease: {e}")
+                healthy = False
+        self._return(session, healthy)
+
+    def _return(self, session: DeviceSession, healthy: bool, used: bool = True) -> None:
+        device = self.device(session.params)
+        with self._cond:
+            pool = self._pool(device)
+            pool['busy'] -= 1
+            if used:
+                # Health probes must not keep an otherwise idle session alive
+                session.last_used = time.monotonic()
+                self._last_activity = session.last_used
+            if healthy:
+                pool['idle'].append(session)
+            else:
+                self.stats['closed_unhealthy'] += 1
+            self._cond.notify_all()
+        if not healthy:
+            session.close()
+
+    def splice(self, client: socket.socket, session: DeviceSession) -> bool:
+        """Relay bytes between the plugin and the device until the plugin hangs up"""
+        channel = session.channel
+        while True:
+            readable, _, _ = select.select([client, channel], [], [], 1.0)
+            if client in readable:
+                data = client.recv(65536)
+                if not data:
+                    return True
+                channel.sendall(data)
+            if channel in readable:
+                data = channel.recv(65536)
+                if not data:
+                    return False
+                client.sendall(data)
+            if channel.closed:
+                return False
+
+    def maintain(self) -> None:
+        """Evict idle sessions and health-check the rest"""
+        now = time.monotonic()
+        evict: List[DeviceSession] = []
+        check: List[DeviceSession] = []
+        with self._cond:
+            for pool in self._pools.values():
+                for session in list(pool['idle']):
+                    if now - session.last_used > self.idle_timeout or not session.alive:
+                        pool['idle'].remove(session)
+                        evict.append(session)
+                    elif now - session.last_checked > self.health_interval:
+                        pool['idle'].remove(session)
+                        pool['busy'] += 1
+                        check.append(session)
+            self.stats['evicted_idle'] += len(evict)
+
+        for session in evict:
+            logger.info(f"Evicting idle session to {session.params['host']}")
+            session.close()
+        for session in check:
+            try:
+                session.probe()
+                healthy = True
+            except Exception as e:
+                logger.info(f"Idle session to {session.params['host']} failed health check: {e}")
+                self.stats['health_failures'] += 1
+                healthy = False
+            self._return(session, healthy, used=False)
+
+    def idle_for(self) -> float:
+        with self._cond:
+            if any(pool['busy'] or pool['idle'] for pool in self._pools.values()):
+                return 0.0
+            return time.monotonic() - self._last_activity
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            devices = {
+                f"{host}:{port}": {'idle': len(pool['idle']), 'busy': pool['busy']}
+                for (host, port), pool in self._pools.items() if pool['idle'] or pool['busy']
+            }
+        return dict(self.stats, devices=devices, max_sessions_per_device=self.max_sessions,
+                    idle_timeout=self.idle_timeout, health_interval=self.health_interval)
+
+    def close_all(self) -> None:
+        with self._cond:
+            sessions = [s for pool in self._pools.values() for s in pool['idle']]
+            for pool in self._pools.values():
+                pool['idle'] = []
+        for session in sessions:
+            session.close()
+
+
+class LeaseHandler(socketserver.BaseRequestHandler):
+    """One request per connection: stats, shutdown, or a lease that becomes a byte pipe"""
+
+    def handle(self):
+        broker = self.server.broker
+        try:
+            request = json.loads(_read_line(self.request))
+        except (ValueError, BrokerError) as e:
+            self._reply({'ok': False, 'error': f"Bad request: {e}"})
+            return
+
+        op = request.get('op')
+        if op == 'stats':
+            self._reply(dict(broker.snapshot(), ok=True))
+            return
+        if op == 'shutdown':
+            self._reply({'ok': True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if op != 'lease':
+            self._reply({'ok': False, 'error': f"Unknown op {op}"})
+            return
+
+        try:
+            session, fresh = broker.acquire(request)
+        except Exception as e:
+            self._reply({'ok': False, 'error': str(e)})
+            return
+
+        healthy = True
+        try:
+            self._reply({'ok': True, 'fresh': fresh, 'privileged': session.privileged,
+                         'prompt': session.prompt.decode(errors='replace'), 'leases': session.leases})
+            # Replay the prompt so the plugin's first receive() matches it
+            self.request.sendall(b'\r\n' + session.prompt)
+            healthy = broker.splice(self.request, session)
+        except (OSError, EOFError) as e:
+            logger.info(f"Lease for {request.get('host')} ended abnormally: {e}")
+            healthy = session.alive
+        finally:
+            broker.release(session, healthy)
+
+    def _reply(self, payload: Dict[str, Any]) -> None:
+        self.request.sendall(json.dumps(payload).encode() + b'\n')
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, broker: SessionBroker):
+        self.broker = broker
+        super().__init__(socket_path, LeaseHandler)
+        os.chmod(socket_path, 0o600)
+
+
+def _read_line(sock: socket.socket, limit: int = 65536) -> bytes:
+    """Read one newline-terminated line without consuming bytes after it"""
+    line = bytearray()
+    while len(line) < limit:
+        byte = sock.recv(1)
+        if not byte:
+            raise BrokerError("Connection closed before a full line was received")
+        if byte == b'\n':
+            return bytes(line)
+        line += byte
+    raise BrokerError("Line too long")
+
+
+def socket_path(path: Optional[str] = None) -> str:
+    return os.path.abspath(os.path.expanduser(path or os.environ.get('ANSIBLE_SESSION_BROKER_SOCKET', DEFAULT_SOCKET)))
+
+
+def _connect(path: str, timeout: float) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def start_daemon(path: str, options: Optional[Dict[str, Any]] = None) -> None:
+    """Spawn a detached broker process for `path`"""
+    options = options or {}
+    command = [sys.executable, os.path.abspath(__file__), '--socket', path]
+    for key in ('idle_timeout', 'max_sessions', 'health_interval', 'exit_after'):
+        if options.get(key) is not None:
+            command += [f"--{key.replace('_', '-')}", str(options[key])]
+    log_path = os.path.join(os.path.dirname(path), 'broker.log')
+    with open(log_path, 'a') as log:
+        subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                         start_new_session=True, close_fds=True)
+
+
+def request(path: str, op: str, timeout: float = 10) -> Dict[str, Any]:
+    sock = _connect(path, timeout)
+    try:
+        sock.sendall(json.dumps({'op': op}).encode() + b'\n')
+        return json.loads(_read_line(sock))
+    finally:
+        sock.close()
+
+
+def lease(path: str, params: Dict[str, Any], daemon_options: Optional[Dict[str, Any]] = None,
+          timeout: float = 30) -> Tuple[socket.socket, Dict[str, Any]]:
+    """Lease a device session, starting the broker if it is not running"""
+    path = socket_path(path)
+    deadline = time.monotonic() + timeout
+    spawned = False
+    while True:
+        try:
+            sock = _connect(path, timeout)
+            break
+        except OSError as e:
+            if e.errno not in (errno.ENOENT, errno.ECONNREFUSED) or time.monotonic() > deadline:
+                raise BrokerError(f"Session broker at {path} unavailable: {e}") from e
+            if not spawned and daemon_options is not None:
+                os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+                start_daemon(path, daemon_options)
+                spawned = True
+            elif daemon_options is None:
+                raise BrokerError(f"Session broker at {path} is not running") from e
+            time.sleep(0.1)
+
+    try:
+        sock.settimeout(max(timeout, float(params.get('acquire_timeout') or 0)) + float(params.get('timeout') or 30))
+        sock.sendall(json.dumps(dict(params, op='lease')).encode() + b'\n')
+        reply = json.loads(_read_line(sock))
+    except (OSError, ValueError, BrokerError) as e:
+        sock.close()
+        raise BrokerError(f"Session broker lease failed: {e}") from e
+    if not reply.get('ok'):
+        sock.close()
+        raise BrokerError(reply.get('error', 'lease refused'))
+    return sock, reply
+
+
+def serve(path: str, broker: SessionBroker) -> None:
+    """Run the broker until shutdown, holding a lock so only one daemon owns the socket"""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    lock = open(path + '.lock', 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        logger.info(f"Another broker already owns {path}")
+        return
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = BrokerServer(path, broker)
+    stop = threading.Event()
+
+    def maintenance():
+        interval = max(1.0, min(broker.health_interval, broker.idle_timeout) / 2)
+        while not stop.wait(interval):
+            broker.maintain()
+            if broker.exit_after and broker.idle_for() > broker.exit_after:
+                logger.info(f"No sessions for {broker.exit_after}s, exiting")
+                server.shutdown()
+                return
+
+    threading.Thread(target=maintenance, name='broker-maintenance', daemon=True).start()
+    logger.info(f"Session broker listening on {path}")
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
+        broker.close_all()
+        if os.path.exists(path):
+            os.unlink(path)
+        lock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pooled device CLI session broker')
+    parser.add_argument('--socket', help=f"Unix socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument('--idle-timeout', type=float, default=600, help='Close sessions idle this many seconds')
+    parser.add_argument('--max-sessions', type=int, default=2, help='Concurrent sessions per device')
+    parser.add_argument('--health-interval', type=float, default=60, help='Probe idle sessions this often')
+    parser.add_argument('--exit-after', type=float, default=3600, help='Exit after this long with no sessions (0: never)')
+    parser.add_argument('--stats', action='store_true', help='Print pool statistics of a running broker')
+    parser.add_argument('--stop', action='store_true', help='Stop a running broker')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+    path = socket_path(args.socket)
+
+    if args.stats or args.stop:
+        try:
+            reply = request(path, 'stats' if args.stats else 'shutdown')
+        except OSError as e:
+            print(f"Session broker at {path} is not running: {e}")
+            sys.exit(1)
+        print(json.dumps(reply, indent=2))
+        return
+
+    serve(path, SessionBroker(idle_timeout=args.idle_timeout, max_sessions_per_device=args.max_sessions,
+                              health_interval=args.health_interval, exit_after=args.exit_after))
+
+
+if __name__ == '__main__':
+    main()
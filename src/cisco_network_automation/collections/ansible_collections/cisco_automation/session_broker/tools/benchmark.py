@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Session Broker Benchmark
+Runs the same sequence of plays against local SSH stand-in devices twice: once
+opening a fresh session per play per device (login, enable, terminal setup, as
+network_cli does) and once leasing pooled sessions from the broker. Reports wall
+time, device logins and per-device concurrency, then exercises idle eviction.
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'plugins', 'plugin_utils'))
+
+import broker  # noqa: E402
+from ssh_standin import StandinServer  # noqa: E402
+
+PROMPT = re.compile(broker.DEFAULT_PROMPT_PATTERNS[0].encode())
+COMMANDS = ['show version', 'show running-config', 'show privilege']
+
+
+def device_params(port, args):
+    return {
+        'host': '127.0.0.1', 'port': port, 'username': 'admin', 'password': 'admin',
+        'become': True, 'become_pass': 'enable', 'timeout': 30,
+        'setup_commands': ['terminal length 0', 'terminal width 512'],
+    }
+
+
+def read_prompt(sock):
+    buffer = b''
+    while not PROMPT.search(buffer[-256:]):
+        data = sock.recv(4096)
+        if not data:
+            raise RuntimeError('lease closed')
+        buffer += data
+    return buffer
+
+
+def play_direct(port, args):
+    session = broker.DeviceSession(device_params(port, args)).open()
+    try:
+        for command in COMMANDS[:args.commands]:
+            session.command(command)
+    finally:
+        session.close()
+
+
+def play_brokered(port, args):
+    sock, _ = broker.lease(args.socket, device_params(port, args), timeout=30)
+    try:
+        read_prompt(sock)
+        for command in COMMANDS[:args.commands]:
+            sock.sendall(command.encode() + b'\r')
+            read_prompt(sock)
+    finally:
+        sock.close()
+
+
+def run(play, ports, args):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.forks) as pool:
+        for _ in range(args.plays):
+            list(pool.map(lambda port: play(port, args), ports))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pooled vs per-play device sessions')
+    parser.add_argument('--devices', type=int, default=10, help='Stand-in devices')
+    parser.add_argument('--plays', type=int, default=6, help='Plays, each touching every device')
+    parser.add_argument('--commands', type=int, default=3, help='Commands per play per device (max 3)')
+    parser.add_argument('--forks', type=int, default=10, help='Parallel devices, like ansible forks')
+    parser.add_argument('--login-delay', type=float, default=0.25, help='Simulated AAA latency per login')
+    parser.add_argument('--base-port', type=int, default=22201, help='First stand-in port')
+    args = parser.parse_args()
+
+    # Closed sessions make the stand-in's paramiko transports log connection resets
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+    standin = StandinServer(args.base_port, args.devices, login_delay=args.login_delay).start()
+    ports = list(standin.devices)
+
+    print("SESSION BROKER BENCHMARK")
+    print(f"{args.devices} devices, {args.plays} plays, {args.commands} commands/play, "
+          f"forks {args.forks}, login delay {args.login_delay * 1000:.0f} ms")
+
+    direct = run(play_direct, ports, args)
+    direct_totals = standin.totals()
+    print(f"Per-play sessions: {direct:.2f}s, {direct_totals['logins']} logins")
+
+    workdir = tempfile.mkdtemp(prefix='session_broker_')
+    args.socket = os.path.join(workdir, 'broker.sock')
+    pool = broker.SessionBroker(idle_timeout=2, max_sessions_per_device=1, health_interval=1)
+    server = threading.Thread(target=broker.serve, args=(args.socket, pool), daemon=True)
+    server.start()
+    while not os.path.exists(args.socket):
+        time.sleep(0.01)
+
+    brokered = run(play_brokered, ports, args)
+    totals = standin.totals()
+    stats = broker.request(args.socket, 'stats')
+    print(f"Brokered sessions: {brokered:.2f}s, {totals['logins'] - direct_totals['logins']} logins, "
+          f"{stats['reused']} reused leases, speedup {direct / brokered:.1f}x")
+    print(f"Per-device concurrency cap 1: max concurrent sessions seen {totals['max_concurrent_per_device']}")
+
+    # Forks racing for the same device queue behind the cap instead of opening more sessions
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: play_brokered(ports[0], args), range(4)))
+    contended = broker.request(args.socket, 'stats')
+    print(f"4 concurrent leases on one device: {contended['waits'] - stats['waits']} queued, "
+          f"{contended['opened'] - stats['opened']} extra sessions opened")
+
+    time.sleep(4)
+    stats = broker.request(args.socket, 'stats')
+    print(f"After idle timeout: {stats['evicted_idle']} sessions evicted, "
+          f"{sum(d['idle'] for d in stats['devices'].values())} still pooled")
+
+    broker.request(args.socket, 'shutdown')
+    server.join(timeout=5)
+    standin.stop()
+
+
+if __name__ == '__main__':
+    main()
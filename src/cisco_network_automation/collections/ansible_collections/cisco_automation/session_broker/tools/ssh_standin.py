@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+SSH Stand-in Device
+Local paramiko SSH server that behaves like an IOS CLI (user/privileged/config
+modes, enable password, terminal settings, show commands) for exercising the
+session broker and network_cli without lab hardware. Each simulated device
+listens on its own port and counts logins and commands.
+
+    python3 ssh_standin.py --port 2201 --devices 4 --login-delay 0.5
+    ansible -i 127.0.0.1, all -m cisco.ios.ios_command -a "commands='show version'" \\
+        -e ansible_port=2201 -e ansible_connection=cisco_automation.session_broker.network_cli \\
+        -e ansible_network_os=cisco.ios.ios -e ansible_user=admin -e ansible_password=admin \\
+        -e ansible_become=true -e ansible_become_method=enable -e ansible_become_password=enable
+"""
+
+import time
+import socket
+import logging
+import argparse
+import threading
+from typing import Dict, List, Optional
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+SHOW_VERSION = """Cisco IOS Software, C3900 Software (C3900-UNIVERSALK9-M), Version 15.7(3)M5, RELEASE SOFTWARE (fc1)
+Technical Support: http://www.cisco.com/techsupport
+ROM: System Bootstrap, Version 15.0(1r)M16, RELEASE SOFTWARE (fc1)
+
+{hostname} uptime is 12 weeks, 3 days, 4 hours, 12 minutes
+System returned to ROM by power-on
+System image file is "flash0:c3900-universalk9-mz.SPA.157-3.M5.bin"
+
+Cisco CISCO3945-CHASSIS (revision 1.1) with C3900-SPE150/K9 with 2027520K/69632K bytes of memory.
+Processor board ID FTX1234A5BC
+3 Gigabit Ethernet interfaces
+Configuration register is 0x2102
+"""
+
+
+class StandinDevice:
+    """Configuration and counters for one simulated device"""
+
+    def __init__(self, hostname: str, username: str, password: str, enable_password: str,
+                 login_delay: float = 0.0, command_delay: float = 0.0):
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.enable_password = enable_password
+        self.login_delay = login_delay
+        self.command_delay = command_delay
+        self.running_config: List[str] = [
+            f"hostname {hostname}",
+            "interface GigabitEthernet0/0",
+            " description uplink",
+            " ip address 10.0.0.1 255.255.255.0",
+            "!",
+        ]
+        self.logins = 0
+        self.commands = 0
+        self.active_sessions = 0
+        self.max_active_sessions = 0
+        self._lock = threading.Lock()
+
+    def session_opened(self) -> None:
+        with self._lock:
+            self.logins += 1
+            self.active_sessions += 1
+            self.max_active_sessions = max(self.max_active_sessions, self.active_sessions)
+
+    def session_closed(self) -> None:
+        with self._lock:
+            self.active_sessions -= 1
+
+
+class StandinServerInterface(paramiko.ServerInterface):
+    def __init__(self, device: StandinDevice):
+        self.device = device
+
+    def check_auth_password(self, username, password):
+        # Stand-in for AAA round trips on a real device
+        time.sleep(self.device.login_delay)
+        if username == self.device.username and password == self.device.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == 'session' else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        return True
+
+
+class IOSShell:
+    """Minimal IOS exec/config state machine on one channel"""
+
+    def __init__(self, channel: paramiko.Channel, device: StandinDevice):
+        self.channel = channel
+        self.device = device
+        self.mode = 'user'
+        self.parent = ''
+        self.awaiting_enable = False
+
+    @property
+    def prompt(self) -> str:
+        name = self.device.hostname
+        if self.mode == 'user':
+            return f"{name}>"
+        if self.mode == 'exec':
+            return f"{name}#"
+        return f"{name}({self.mode})#"
+
+    def write(self, text: str) -> None:
+        self.channel.sendall(text.replace('\n', '\r\n').encode())
+
+    def run(self) -> None:
+        self.write(f"\n{self.prompt}")
+        buffer = b''
+        while True:
+            data = self.channel.recv(1024)
+            if not data:
+                return
+            buffer += data
+            while True:
+                index = min((i for i in (buffer.find(b'\r'), buffer.find(b'\n')) if i >= 0), default=-1)
+                if index < 0:
+                    break
+                line, buffer = buffer[:index], buffer[index + 1:]
+                if buffer.startswith(b'\n'):
+                    buffer = buffer[1:]
+                if not self.handle(line.decode(errors='replace')):
+                    return
+
+    def handle(self, line: str) -> bool:
+        if self.awaiting_enable:
+            self.awaiting_enable = False
+            self.write("\n")
+            if line == self.device.enable_password:
+                self.mode = 'exec'
+            else:
+                self.write("% Access denied\n")
+            self.write(self.prompt)
+            return True
+
+        # IOS echoes the command before its output
+        self.write(f"{line}\n")
+        command = line.strip()
+        self.device.commands += 1
+        if self.device.command_delay:
+            time.sleep(self.device.command_delay)
+
+        output = self.execute(command)
+        if output is None:
+            return False
+        if self.awaiting_enable:
+            # "Password: " stands in for the prompt until the password line arrives
+            return True
+        self.write(output + self.prompt)
+        return True
+
+    def execute(self, command: str) -> Optional[str]:
+        if not command:
+            return ''
+        words = command.split()
+        if self.mode in ('user', 'exec'):
+            if command == 'enable':
+                if self.mode == 'user':
+                    self.awaiting_enable = True
+                    self.write("Password: ")
+                    return ''
+                return ''
+            if command in ('exit', 'logout', 'quit'):
+                return None
+            if words[0] == 'terminal':
+                return ''
+            if command.startswith('show ver'):
+                return SHOW_VERSION.format(hostname=self.device.hostname)
+            if command.startswith('show priv'):
+                return f"Current privilege level is {15 if self.mode == 'exec' else 1}\n"
+            if command.startswith('show run') and self.mode == 'exec':
+                return "Building configuration...\n\n" + "\n".join(self.device.running_config) + "\nend\n"
+            if command.startswith('show'):
+                return ''
+            if command.startswith('conf') and self.mode == 'exec':
+                self.mode = 'config'
+                return "Enter configuration commands, one per line.  End with CNTL/Z.\n"
+            return "% Invalid input detected at '^' marker.\n"
+
+        if command in ('end', '\x1a'):
+            self.mode = 'exec'
+            return ''
+        if command == 'exit':
+            self.mode = 'config' if self.mode != 'config' else 'exec'
+            return ''
+        if self.mode == 'config' and words[0] in ('interface', 'router', 'line'):
+            self.mode = {'interface': 'config-if', 'router': 'config-router', 'line': 'config-line'}[words[0]]
+            self.device.running_config.append(command)
+            return ''
+        self.device.running_config.append((' ' if self.mode != 'config' else '') + command)
+        return ''
+
+
+class StandinServer:
+    """Serve one or more stand-in devices on consecutive local ports"""
+
+    def __init__(self, base_port: int = 2201, devices: int = 1, username: str = 'admin',
+                 password: str = 'admin', enable_password: str = 'enable',
+                 login_delay: float = 0.0, command_delay: float = 0.0, bind: str = '127.0.0.1'):
+        self.bind = bind
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.devices: Dict[int, StandinDevice] = {
+            base_port + i: StandinDevice(f"standin-{i + 1:03d}", username, password, enable_password,
+                                         login_delay, command_delay)
+            for i in range(devices)
+        }
+        self._sockets: List[socket.socket] = []
+        self._running = False
+
+    def start(self) -> 'StandinServer':
+        self._running = True
+        for port, device in self.devices.items():
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self.bind, port))
+            sock.listen(64)
+            self._sockets.append(sock)
+            threading.Thread(target=self._accept, args=(sock, device), daemon=True).start()
+        return self
+
+    def _accept(self, sock: socket.socket, device: StandinDevice) -> None:
+        while self._running:
+            try:
+                client, _ = sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(client, device), daemon=True).start()
+
+    def _serve(self, client: socket.socket, device: StandinDevice) -> None:
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self.host_key)
+        try:
+            transport.start_server(server=StandinServerInterface(device))
+            channel = transport.accept(30)
+            if channel is None:
+                return
+            device.session_opened()
+            try:
+                IOSShell(channel, device).run()
+            finally:
+                device.session_closed()
+                channel.close()
+        except (EOFError, OSError, paramiko.SSHException) as e:
+            logger.debug(f"{device.hostname}: session ended: {e}")
+        finally:
+            transport.close()
+
+    def stop(self) -> None:
+        self._running = False
+        for sock in self._sockets:
+            sock.close()
+
+    def totals(self) -> Dict[str, int]:
+        return {
+            'logins': sum(d.logins for d in self.devices.values()),
+            'commands': sum(d.commands for d in self.devices.values()),
+            'max_concurrent_per_device': max(d.max_active_sessions for d in self.devices.values()),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local SSH stand-in for IOS devices')
+    parser.add_argument('--port', type=int, default=2201, help='First listening port')
+    parser.add_argument('--devices', type=int, default=1, help='Devices, one per consecutive port')
+    parser.add_argument('--username', default='admin', help='Login username')
+    parser.add_argument('--password', default='admin', help='Login password')
+    parser.add_argument('--enable-password', default='enable', help='Enable password')
+    parser.add_argument('--login-delay', type=float, default=0.0, help='Seconds added to each authentication')
+    parser.add_argument('--command-delay', type=float, default=0.0, help='Seconds added to each command')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+    server = StandinServer(args.port, args.devices, args.username, args.password, args.enable_password,
+                           args.login_delay, args.command_delay).start()
+    logger.info(f"Serving {args.devices} stand-in device(s) on ports {args.port}-{args.port + args.devices - 1}")
+    try:
+        while True:
+            time.sleep(10)
+            logger.info(f"Totals: {server.totals()}")
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
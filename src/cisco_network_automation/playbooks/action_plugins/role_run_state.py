@@ -0,0 +1,427 @@
+# GNU General Public License v3.0+ (see https://www.gnu.org/licenses/gpl-3.0.txt)
+"""
+Role run-state change detection
+Fingerprints each role's inputs per host (role files including templates and
+dependencies, role version, and the host's values for every variable the role
+references) together with a hash of the device running config, and compares
+them with the last successful run so unchanged roles can be skipped.
+
+    state: check   decide which roles to execute or skip for this host
+    state: record  store fingerprints of executed roles after the phase succeeded
+    state: report  (localhost) aggregate skipped vs executed work across the run
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+
+import yaml
+
+from ansible import constants as C
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+
+STATE_VERSION = 1
+
+# Volatile or controller-wide names that would defeat skipping or are too large to hash per host
+DEFAULT_IGNORE_VARS = [
+    'ansible_date_time', 'ansible_facts', 'ansible_check_mode', 'ansible_diff_mode', 'ansible_forks',
+    'ansible_run_tags', 'ansible_skip_tags', 'ansible_verbosity', 'ansible_version', 'ansible_play_batch',
+    'ansible_play_hosts', 'ansible_play_hosts_all', 'ansible_play_role_names', 'ansible_role_names',
+    'ansible_config_file', 'ansible_inventory_sources', 'ansible_playbook_python', 'ansible_search_path',
+    'hostvars', 'groups', 'vars', 'omit', 'playbook_dir', 'inventory_dir', 'inventory_file',
+    'deployment_id', 'deployment_timestamp', 'deployment_base_path', 'backup_timestamp', 'phase_name',
+    'role_run_state', 'role_run_history',
+]
+
+# Lines that change without any configuration change
+VOLATILE_CONFIG = re.compile(
+    r'^(Building configuration|Current configuration|! Last configuration change|! NVRAM config last updated'
+    r'|! No configuration change since last restart|! Time:|ntp clock-period)'
+)
+
+JINJA_BLOCK = re.compile(r'\{\{(.*?)\}\}|\{%(.*?)%\}', re.S)
+BARE_EXPRESSION = re.compile(
+    r'^\s*-?\s*(?:when|that|loop|with_items|with_dict|with_list|until|failed_when|changed_when)\s*:\s*(.+)$', re.M
+)
+IDENTIFIER = re.compile(r'(?<![\w.\'"])([A-Za-z_][A-Za-z0-9_]*)')
+DEPENDENCY = re.compile(r'^\s*-\s*(?:role:\s*|name:\s*)?["\']?([\w.]+)["\']?\s*$')
+
+
+def config_hash(config):
+    """sha256 of a running config with volatile lines and trailing whitespace removed"""
+    lines = []
+    for line in (config or '').splitlines():
+        line = line.rstrip()
+        if line and not VOLATILE_CONFIG.match(line):
+            lines.append(line)
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+
+def _digest_values(values):
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _write_json(path, data):
+    """Atomic write so a concurrent fork or an interrupted run never leaves a partial state file"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+    with os.fdopen(fd, 'w') as handle:
+        json.dump(data, handle, indent=2, sort_keys=True, default=str)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+class RoleInputs:
+    """Static inputs of a role: file digest, version, dependencies and referenced variable names"""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.files = sorted(
+            os.path.join(root, f)
+            for root, dirs, files in os.walk(path)
+            for f in files
+            if '__pycache__' not in root and not f.endswith(('.pyc', '.pyo'))
+        )
+
+    def signature(self):
+        """Cheap stat signature used to reuse a cached digest"""
+        stats = [(os.path.relpath(f, self.path), os.stat(f).st_size, os.stat(f).st_mtime_ns) for f in self.files]
+        return _digest_values(stats)
+
+    def _meta(self):
+        meta_path = os.path.join(self.path, 'meta', 'main.yml')
+        try:
+            with open(meta_path) as handle:
+                text = handle.read()
+        except OSError:
+            return None, []
+        try:
+            meta = yaml.safe_load(text) or {}
+            version = (meta.get('galaxy_info') or {}).get('version')
+            dependencies = [d.get('role') or d.get('name') if isinstance(d, dict) else d
+                            for d in meta.get('dependencies') or []]
+            return version, [d for d in dependencies if d]
+        except yaml.YAMLError:
+            # Some role metadata is hand-edited; fall back to scanning the dependencies block
+            version = None
+            dependencies = []
+            section = text.split('dependencies:', 1)[1] if 'dependencies:' in text else ''
+            for line in section.splitlines():
+                if line and not line[0].isspace() and not line.startswith('-'):
+                    break
+                match = DEPENDENCY.match(line)
+                if match:
+                    dependencies.append(match.group(1))
+            return version, dependencies
+
+    def _variables(self):
+        names = set()
+        for path in self.files:
+            if not path.endswith(('.yml', '.yaml', '.j2', '.json', '.cfg', '.conf', '.txt')):
+                continue
+            try:
+                with open(path, errors='replace') as handle:
+                    text = handle.read()
+            except OSError:
+                continue
+            if os.path.basename(os.path.dirname(path)) in ('defaults', 'vars'):
+                try:
+                    data = yaml.safe_load(text)
+                    if isinstance(data, dict):
+                        names.update(data)
+                except yaml.YAMLError:
+                    pass
+            for match in JINJA_BLOCK.finditer(text):
+                names.update(IDENTIFIER.findall(match.group(1) or match.group(2)))
+            for match in BARE_EXPRESSION.finditer(text):
+                names.update(IDENTIFIER.findall(match.group(1)))
+        return sorted(n for n in names if isinstance(n, str))
+
+    def describe(self):
+        hasher = hashlib.sha256()
+        for path in self.files:
+            hasher.update(os.path.relpath(path, self.path).encode('utf-8') + b'\0')
+            with open(path, 'rb') as handle:
+                hasher.update(handle.read())
+            hasher.update(b'\0')
+        version, dependencies = self._meta()
+        return {
+            'digest': hasher.hexdigest(),
+            'version': version,
+            'dependencies': dependencies,
+            'variables': self._variables(),
+        }
+
+
+class ActionModule(ActionBase):
+    """Decide, record and report role execution based on input fingerprints"""
+
+    TRANSFERS_FILES = False
+    _VALID_ARGS = frozenset((
+        'state', 'roles', 'config', 'store', 'run_state', 'deployment_id', 'phase', 'force', 'ignore_vars',
+        'dest', 'hosts',
+    ))
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        task_vars = task_vars or {}
+        args = self._task.args
+        state = args.get('state', 'check')
+
+        if state == 'report':
+            result.update(self._report(args, task_vars))
+            return result
+
+        store = args.get('store')
+        if not store:
+            raise AnsibleActionFail("'store' is required")
+        store = os.path.abspath(os.path.expanduser(store))
+        host = task_vars.get('inventory_hostname')
+        state_path = os.path.join(store, 'hosts', '%s.json' % host)
+
+        if state == 'check':
+            result.update(self._check(args, task_vars, store, state_path))
+        elif state == 'record':
+            result.update(self._record(args, task_vars, state_path))
+        else:
+            raise AnsibleActionFail("state must be one of check, record, report")
+        return result
+
+    # Role inputs
+
+    def _role_path(self, name, task_vars):
+        search = [os.path.join(task_vars.get('playbook_dir', '.'), 'roles'),
+                  os.path.join(task_vars.get('playbook_dir', '.'), '..', 'roles')]
+        search.extend(C.DEFAULT_ROLES_PATH or [])
+        for directory in search:
+            path = os.path.abspath(os.path.join(os.path.expanduser(directory), name))
+            if os.path.isdir(path):
+                return path
+        raise AnsibleActionFail("role '%s' not found in %s" % (name, ', '.join(search)))
+
+    def _role_inputs(self, name, task_vars, store, cache):
+        """Role description, cached on disk by stat signature so only changed roles are re-hashed"""
+        if name in cache:
+            return cache[name]
+        role = RoleInputs(name, self._role_path(name, task_vars))
+        signature = role.signature()
+        cache_path = os.path.join(store, 'roles', '%s.json' % name)
+        cached = _read_json(cache_path)
+        if cached and cached.get('signature') == signature:
+            description = cached['description']
+        else:
+            description = role.describe()
+            _write_json(cache_path, {'signature': signature, 'description': description})
+        cache[name] = description
+        return description
+
+    def _closure(self, name, task_vars, store, cache, seen=None):
+        """The role plus its meta dependencies, depth first"""
+        seen = seen if seen is not None else []
+        if name in seen:
+            return seen
+        seen.append(name)
+        for dependency in self._role_inputs(name, task_vars, store, cache)['dependencies']:
+            try:
+                self._closure(dependency, task_vars, store, cache, seen)
+            except AnsibleActionFail:
+                # Collection roles and other external dependencies are pinned by their own versions
+                seen.append(dependency)
+        return seen
+
+    def _variable_values(self, names, task_vars, ignore):
+        values = {}
+        for name in names:
+            if name in ignore or name not in task_vars:
+                continue
+            value = task_vars[name]
+            try:
+                value = self._templar.template(value)
+            except Exception:
+                # Undefined references stay raw; a later definition still changes the fingerprint
+                pass
+            values[name] = value
+        return values
+
+    def _fingerprint(self, name, task_vars, store, cache, ignore):
+        closure = self._closure(name, task_vars, store, cache)
+        digests = {}
+        variables = set()
+        for role in closure:
+            try:
+                description = self._role_inputs(role, task_vars, store, cache)
+            except AnsibleActionFail:
+                continue
+            digests[role] = description['digest']
+            variables.update(description['variables'])
+        values = self._variable_values(sorted(variables), task_vars, ignore)
+        version = self._role_inputs(name, task_vars, store, cache)['version']
+        return {
+            'inputs': _digest_values({'roles': digests, 'version': version, 'vars': values}),
+            'files': _digest_values(digests),
+            'vars': _digest_values(values),
+            'version': version,
+        }
+
+    # States
+
+    def _check(self, args, task_vars, store, state_path):
+        force = args.get('force', False)
+        force_all = not isinstance(force, list) and boolean(force, strict=False)
+        force_roles = force if isinstance(force, list) else []
+        ignore = set(DEFAULT_IGNORE_VARS) | set(args.get('ignore_vars') or [])
+        current_config = config_hash(args.get('config'))
+        previous = _read_json(state_path) or {}
+        if previous.get('version') != STATE_VERSION:
+            previous = {}
+        previous_roles = previous.get('roles', {})
+
+        cache = {}
+        execute, skip, not_applicable = [], [], []
+        fingerprints, reasons = {}, {}
+        for entry in args.get('roles') or []:
+            if not isinstance(entry, dict):
+                entry = {'name': entry}
+            name = entry['name']
+            if not boolean(entry.get('applies', True), strict=False):
+                not_applicable.append(name)
+                continue
+
+            fingerprint = self._fingerprint(name, task_vars, store, cache, ignore)
+            fingerprints[name] = fingerprint
+            last = previous_roles.get(name)
+            if force_all or name in force_roles:
+                reason = 'forced'
+            elif last is None:
+                reason = 'no previous successful run'
+            elif previous.get('config_hash') != current_config:
+                reason = 'device configuration changed'
+            elif last.get('files') != fingerprint['files'] or last.get('version') != fingerprint['version']:
+                reason = 'role files or version changed'
+            elif last.get('vars') != fingerprint['vars'] or last.get('inputs') != fingerprint['inputs']:
+                reason = 'variables changed'
+            else:
+                reason = None
+
+            if reason is None:
+                skip.append(name)
+                reasons[name] = 'unchanged since %s' % last.get('deployment_id', 'last run')
+            else:
+                execute.append(name)
+                reasons[name] = reason
+
+        run_state = {
+            'phase': args.get('phase'),
+            'execute': execute,
+            'skip': skip,
+            'not_applicable': not_applicable,
+            'reasons': reasons,
+            'fingerprints': fingerprints,
+            'config_hash': current_config,
+            'recorded': False,
+        }
+        return {
+            'changed': False,
+            'execute': execute,
+            'skip': skip,
+            'run_state': run_state,
+            'ansible_facts': {'role_run_history': self._history(task_vars, run_state)},
+            'msg': 'executing %d, skipping %d unchanged role(s)' % (len(execute), len(skip)),
+        }
+
+    def _record(self, args, task_vars, state_path):
+        run_state = args.get('run_state')
+        if not isinstance(run_state, dict):
+            raise AnsibleActionFail("'run_state' must be the result of state=check")
+
+        state = _read_json(state_path) or {}
+        if state.get('version') != STATE_VERSION:
+            state = {'version': STATE_VERSION, 'roles': {}}
+        completed = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        for name in run_state.get('execute', []):
+            state['roles'][name] = dict(
+                run_state['fingerprints'][name], deployment_id=args.get('deployment_id'), completed=completed,
+            )
+        # Config after this phase is the baseline every role on the host is compared against next run
+        state['config_hash'] = config_hash(args.get('config')) if args.get('config') is not None \
+            else run_state.get('config_hash')
+        state['host'] = task_vars.get('inventory_hostname')
+        state['updated'] = completed
+        _write_json(state_path, state)
+
+        run_state = dict(run_state, recorded=True)
+        return {
+            'changed': bool(run_state.get('execute')),
+            'recorded': run_state.get('execute', []),
+            'ansible_facts': {'role_run_history': self._history(task_vars, run_state)},
+        }
+
+    @staticmethod
+    def _history(task_vars, run_state):
+        history = dict(task_vars.get('role_run_history') or {})
+        entry = {k: v for k, v in run_state.items() if k != 'fingerprints'}
+        history[run_state.get('phase') or 'default'] = entry
+        return history
+
+    def _report(self, args, task_vars):
+        hostvars = task_vars.get('hostvars', {})
+        hosts = args.get('hosts') or list(hostvars)
+        roles = {}
+        phases = {}
+        devices = []
+        totals = {'executed': 0, 'skipped': 0}
+        unrecorded = []
+        for host in hosts:
+            history = hostvars[host].get('role_run_history') if host in hostvars else None
+            if not history:
+                continue
+            device = {'host': host, 'executed': [], 'skipped': [], 'reasons': {}}
+            for phase, entry in sorted(history.items()):
+                counts = phases.setdefault(phase, {'executed': 0, 'skipped': 0, 'hosts': 0})
+                counts['hosts'] += 1
+                if entry.get('execute') and not entry.get('recorded'):
+                    # Checked but never recorded: the phase failed on this host or recording is disabled
+                    unrecorded.append('%s:%s' % (host, phase))
+                for bucket, names in (('executed', entry.get('execute', [])), ('skipped', entry.get('skip', []))):
+                    for name in names:
+                        device[bucket].append(name)
+                        roles.setdefault(name, {'executed': 0, 'skipped': 0})[bucket] += 1
+                        totals[bucket] += 1
+                        counts[bucket] += 1
+                device['reasons'].update(entry.get('reasons', {}))
+            devices.append(device)
+
+        work = totals['executed'] + totals['skipped']
+        report = {
+            'deployment_id': args.get('deployment_id'),
+            'generated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'devices': len(devices),
+            'totals': totals,
+            'skipped_percent': round(100.0 * totals['skipped'] / work, 1) if work else 0.0,
+            'unrecorded': unrecorded,
+            'phases': phases,
+            'roles': roles,
+            'hosts': devices,
+        }
+        if args.get('dest'):
+            _write_json(os.path.abspath(os.path.expanduser(args['dest'])), report)
+        summary = {k: v for k, v in report.items() if k != 'hosts'}
+        return {'changed': False, 'report': summary}
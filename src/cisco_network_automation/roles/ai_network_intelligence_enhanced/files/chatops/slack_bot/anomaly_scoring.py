@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Anomaly Scoring Engine
+Local, batched scoring for the anomaly_detection model (isolation_forest).
+Feature vectors are micro-batched into NumPy arrays and scored with a single
+score_samples call per batch; recent scores and detected anomalies are cached
+per device for the ChatOps investigation lookup. TelemetryFeatureConsumer feeds
+the scorer from the processed telemetry rollups.
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Distance below the model's decision offset that maps to each severity
+SEVERITY_MARGINS = [(0.15, 'critical'), (0.10, 'high'), (0.05, 'medium'), (0.0, 'low')]
+
+# Rollup fields (metric.statistic) forming the model's feature vector, in order
+DEFAULT_FEATURES = ['in_octets.rate', 'out_octets.rate', 'in_packets.rate', 'out_packets.rate',
+                    'in_errors.rate']
+
+
+def mlflow_model_loader(model_name: str, version: str) -> Any:
+    """Load a registered sklearn model version (number or stage) from MLflow."""
+    try:
+        import mlflow.sklearn
+    except ImportError as e:
+        raise RuntimeError("Loading models from the registry requires mlflow (pip install mlflow)") from e
+
+    tracking_uri = os.environ.get('MLFLOW_ENDPOINT')
+    if tracking_uri:
+        mlflow.set_tracking_uri(tracking_uri)
+    return mlflow.sklearn.load_model(f"models:/{model_name}/{version}")
+
+
+class AnomalyScoringEngine:
+    """Micro-batching scorer with per-version model cache and per-device history."""
+
+    def __init__(self, model_loader: Optional[Callable[[str, str], Any]] = None,
+                 model_name: str = 'anomaly_detection', default_version: str = 'Production',
+                 max_batch_size: int = 256, max_wait_ms: float = 5.0,
+                 history_per_device: int = 256, max_devices: int = 50000,
+                 max_anomalies: int = 10000, max_loaded_versions: int = 2,
+                 threshold: Optional[float] = None):
+        self.model_loader = model_loader or mlflow_model_loader
+        self.model_name = model_name
+        self.active_version = default_version
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.threshold = threshold
+
+        # Least recently loaded first; the active version is never evicted
+        self._models: 'OrderedDict[str, Any]' = OrderedDict()
+        self._max_loaded_versions = max(1, max_loaded_versions)
+        self._model_lock = threading.Lock()
+
+        # Least recently scored subject first, capped at max_devices
+        self._history_size = history_per_device
+        self._history: 'OrderedDict[str, deque]' = OrderedDict()
+        self._max_devices = max_devices
+        self._anomalies: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._max_anomalies = max_anomalies
+        self._cache_lock = threading.Lock()
+
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._running = False
+
+        self._batch_sizes: deque = deque(maxlen=10000)
+        self._batch_latencies: deque = deque(maxlen=10000)
+        self._queue_waits: deque = deque(maxlen=10000)
+        self._samples_scored = 0
+        self._stats_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Model management
+    # ------------------------------------------------------------------
+
+    def model(self, version: Optional[str] = None) -> Any:
+        """Return the model for a version, loading it once."""
+        version = version or self.active_version
+        model = self._models.get(version)
+        if model is None:
+            with self._model_lock:
+                model = self._models.get(version)
+                if model is None:
+                    logger.info(f"Loading {self.model_name} v{version}")
+                    model = self.model_loader(self.model_name, version)
+                    self._models[version] = model
+                    self._evict_models(keep=version)
+        return model
+
+    def activate(self, version: str) -> None:
+        """Switch new submissions to a version, loading it ahead of traffic."""
+        self.model(version)
+        self.active_version = version
+        with self._model_lock:
+            self._evict_models(keep=version)
+
+    def _evict_models(self, keep: str) -> None:
+        """Drop the oldest loaded versions beyond the cap (caller holds _model_lock)."""
+        for version in list(self._models):
+            if len(self._models) <= self._max_loaded_versions:
+                break
+            if version not in (keep, self.active_version):
+                del self._models[version]
+                logger.info(f"Unloaded {self.model_name} v{version}")
+
+    def _threshold(self, model: Any) -> float:
+        if self.threshold is not None:
+            return self.threshold
+        # IsolationForest: decision_function = score_samples - offset_
+        return float(getattr(model, 'offset_', -0.5))
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def score_batch(self, devices: Sequence[str], features: Any,
+                    timestamps: Optional[Sequence[float]] = None,
+                    version: Optional[str] = None) -> np.ndarray:
+        """Score a batch of feature vectors with one vectorized model call."""
+        version = version or self.active_version
+        model = self.model(version)
+        matrix = np.asarray(features, dtype=np.float64)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+
+        started = time.perf_counter()
+        scores = model.score_samples(matrix)
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._batch_latencies.append(elapsed)
+            self._batch_sizes.append(len(matrix))
+            self._samples_scored += len(matrix)
+
+        if timestamps is None:
+            now = time.time()
+            timestamps = [now] * len(matrix)
+        self._record(devices, timestamps, scores, matrix, version, self._threshold(model))
+        return scores
+
+    def _record(self, devices: Sequence[str], timestamps: Sequence[float], scores: np.ndarray,
+                matrix: np.ndarray, version: str, threshold: float) -> None:
+        anomalous = np.flatnonzero(scores < threshold)
+        score_list = scores.tolist()
+        with self._cache_lock:
+            for device, ts, score in zip(devices, timestamps, score_list):
+                history = self._history.get(device)
+                if history is None:
+                    history = self._history[device] = deque(maxlen=self._history_size)
+                else:
+                    self._history.move_to_end(device)
+                history.append((ts, score, version))
+            # Subjects that stop reporting (removed devices, renamed interfaces) age out
+            while len(self._history) > self._max_devices:
+                self._history.popitem(last=False)
+
+            for index in anomalous.tolist():
+                device, ts, score = devices[index], timestamps[index], score_list[index]
+                anomaly_id = f"{device}-{int(ts * 1000)}"
+                margin = threshold - score
+                self._anomalies[anomaly_id] = {
+                    'id': anomaly_id,
+                    'device': device,
+                    'type': self.model_name,
+                    'severity': next(level for limit, level in SEVERITY_MARGINS if margin >= limit),
+                    'score': score,
+                    'threshold': threshold,
+                    'timestamp': ts,
+                    'model_version': version,
+                    'features': matrix[index].tolist(),
+                }
+                self._anomalies.move_to_end(anomaly_id)
+            while len(self._anomalies) > self._max_anomalies:
+                self._anomalies.popitem(last=False)
+
+    def submit(self, device: str, features: Sequence[float], timestamp: Optional[float] = None,
+               version: Optional[str] = None) -> Future:
+        """Queue one feature vector for micro-batched scoring."""
+        if not self._running:
+            self.start()
+        future: Future = Future()
+        self._queue.put((version or self.active_version, device, features,
+                         timestamp if timestamp is not None else time.time(),
+                         future, time.perf_counter()))
+        return future
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._worker = threading.Thread(target=self._batch_loop, name='anomaly-scoring', daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+            self._worker = None
+
+    def _batch_loop(self) -> None:
+        while self._running:
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = first[5] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            dequeued = time.perf_counter()
+            by_version: Dict[str, List[tuple]] = {}
+            for item in batch:
+                by_version.setdefault(item[0], []).append(item)
+            with self._stats_lock:
+                self._queue_waits.extend(dequeued - item[5] for item in batch)
+
+            for version, items in by_version.items():
+                try:
+                    scores = self.score_batch([i[1] for i in items], np.vstack([i[2] for i in items]),
+                                              [i[3] for i in items], version)
+                except Exception as e:
+                    logger.error(f"Batch scoring failed for v{version}: {e}")
+                    for item in items:
+                        item[4].set_exception(e)
+                    continue
+                for item, score in zip(items, scores.tolist()):
+                    item[4].set_result(score)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get_anomaly(self, anomaly_id: str) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            anomaly = self._anomalies.get(anomaly_id)
+            return dict(anomaly) if anomaly else None
+
+    def recent_scores(self, device: str, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._cache_lock:
+            history = list(self._history.get(device, ()))[-limit:]
+        return [{'timestamp': ts, 'score': score, 'model_version': version}
+                for ts, score, version in history]
+
+    def recent_anomalies(self, device: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._cache_lock:
+            anomalies = [a for a in reversed(self._anomalies.values())
+                         if device is None or a['device'] == device]
+        return [dict(a) for a in anomalies[:limit]]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Batch size and latency statistics over recent batches."""
+        # Snapshot under the lock; the scoring thread appends concurrently
+        with self._stats_lock:
+            sizes = np.array(self._batch_sizes, dtype=np.float64)
+            latencies = np.array(self._batch_latencies, dtype=np.float64)
+            waits = np.array(self._queue_waits, dtype=np.float64)
+            samples_scored = self._samples_scored
+        with self._cache_lock:
+            devices_tracked = len(self._history)
+            anomalies_cached = len(self._anomalies)
+        with self._model_lock:
+            loaded_versions = sorted(self._models)
+
+        def pct(values: np.ndarray, q: float) -> float:
+            return float(np.percentile(values, q)) if len(values) else 0.0
+
+        return {
+            'model': self.model_name,
+            'active_version': self.active_version,
+            'loaded_versions': loaded_versions,
+            'samples_scored': samples_scored,
+            'batches': len(sizes),
+            'batch_size_mean': float(sizes.mean()) if len(sizes) else 0.0,
+            'batch_size_p95': pct(sizes, 95),
+            'batch_latency_ms_p50': pct(latencies, 50) * 1000,
+            'batch_latency_ms_p99': pct(latencies, 99) * 1000,
+            'queue_wait_ms_p99': pct(waits, 99) * 1000,
+            'devices_tracked': devices_tracked,
+            'anomalies_cached': anomalies_cached,
+        }
+
+
+class TelemetryFeatureConsumer:
+    """Builds feature vectors from processed telemetry rollups and submits them for scoring.
+
+    Records come from network.telemetry.processed, one per interface and window:
+    {"device": ..., "interface": ..., "window_end": ..., "metrics": {name: {stat: value}}}
+    """
+
+    def __init__(self, engine: AnomalyScoringEngine, bootstrap_servers: str,
+                 topic: str = 'network.telemetry.processed',
+                 group_id: str = 'chatops-anomaly-scoring',
+                 features: Optional[Sequence[str]] = None):
+        self.engine = engine
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self.group_id = group_id
+        self.features = [tuple(f.split('.', 1)) for f in (features or DEFAULT_FEATURES)]
+        self.stats = {'records': 0, 'submitted': 0, 'incomplete': 0, 'errors': 0}
+        self._consumer: Any = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def vector(self, record: Dict[str, Any]) -> Optional[List[float]]:
+        """Feature vector for one rollup record, or None if a feature is missing."""
+        metrics = record.get('metrics') or {}
+        vector = []
+        for metric, stat in self.features:
+            value = (metrics.get(metric) or {}).get(stat)
+            if value is None:
+                return None
+            vector.append(float(value))
+        return vector
+
+    def handle(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Submit every complete record; returns the number submitted."""
+        submitted = 0
+        for record in records:
+            self.stats['records'] += 1
+            vector = self.vector(record)
+            if vector is None:
+                self.stats['incomplete'] += 1
+                continue
+            subject = record['device']
+            if record.get('interface'):
+                subject = f"{subject}:{record['interface']}"
+            self.engine.submit(subject, vector, record.get('window_end'))
+            submitted += 1
+        self.stats['submitted'] += submitted
+        return submitted
+
+    def start(self) -> None:
+        if self._running:
+            return
+        try:
+            from kafka import KafkaConsumer
+        except ImportError as e:
+            raise RuntimeError("TelemetryFeatureConsumer requires kafka-python (pip install kafka-python)") from e
+
+        self._consumer = KafkaConsumer(
+            self.topic,
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=self.group_id,
+            auto_offset_reset='latest',
+            value_deserializer=json.loads,
+        )
+        self._running = True
+        self._thread = threading.Thread(target=self._consume_loop, name='anomaly-features', daemon=True)
+        self._thread.start()
+        logger.info(f"Scoring {self.topic} rollups on features {', '.join('.'.join(f) for f in self.features)}")
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._consumer is not None:
+            self._consumer.close()
+            self._consumer = None
+
+    def _consume_loop(self) -> None:
+        while self._running:
+            try:
+                batches = self._consumer.poll(timeout_ms=500)
+                self.handle(message.value for messages in batches.values() for message in messages)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Telemetry feature consumer error: {e}")
+                time.sleep(1)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Command Handler for AI Network Intelligence ChatOps
+Parses /ai commands and renders Slack responses from the ML integration
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from ml_integration import MLIntegration
+
+logger = logging.getLogger(__name__)
+
+DASHBOARDS = {
+    'models': '/d/model-metrics',
+    'anomalies': '/d/anomaly-overview',
+    'traffic': '/d/traffic-prediction',
+    'automation': '/d/automation-actions',
+}
+
+
+def parse_options(args: List[str]) -> Dict[str, str]:
+    """Split `--flag value` pairs from positional arguments"""
+    options = {'_': []}
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg.startswith('--'):
+            has_value = index + 1 < len(args) and not args[index + 1].startswith('--')
+            options[arg[2:]] = args[index + 1] if has_value else 'true'
+            index += 2 if has_value else 1
+        else:
+            options['_'].append(arg)
+            index += 1
+    return options
+
+
+def ephemeral(text: str) -> Dict[str, Any]:
+    return {"text": text, "response_type": "ephemeral"}
+
+
+class CommandHandler:
+    """Dispatch ChatOps commands to their handlers"""
+
+    def __init__(self, ml_integration: Optional[MLIntegration] = None):
+        self.ml = ml_integration or MLIntegration()
+        self.grafana_url = os.environ.get('GRAFANA_ENDPOINT', 'http://grafana.ai.local:3000')
+        self.handlers = {
+            'deploy': self._deploy,
+            'status': self._status,
+            'train': self._train,
+            'predict': self._predict,
+            'analyze': self._analyze,
+            'explain': self._explain,
+            'automate': self._automate,
+            'workflow': self._workflow,
+            'dashboard': self._dashboard,
+        }
+
+    def execute_command(self, command: str, args: List[str], user_id: str, channel_id: str) -> Dict[str, Any]:
+        """Execute a command and return {success, response}"""
+        handler = self.handlers.get(command)
+        if handler is None:
+            return {"success": False, "response": ephemeral(f"❓ Unknown command `{command}`. Try `/ai help`.")}
+
+        try:
+            return handler(parse_options(args), user_id, channel_id)
+        except requests.RequestException as e:
+            logger.error(f"ML API call failed for {command}: {e}")
+            return {"success": False, "response": ephemeral(f"❌ ML API unavailable: {str(e)}")}
+        except ValueError as e:
+            return {"success": False, "response": ephemeral(f"❌ Invalid arguments: {str(e)}")}
+
+    def _deploy(self, options: Dict[str, Any], user_id: str, channel_id: str) -> Dict[str, Any]:
+        positional = options['_']
+        if len(positional) < 3 or positional[0] != 'model':
+            return {"success": False, "response": ephemeral("Usage: `/ai deploy model <name> <version> [--env <environment>]`")}
+
+        model_name, version = positional[1], positional[2]
+        environment = options.get('env', 'staging')
+        value = json.dumps({"model_name": model_name, "version": version, "environment": environment})
+        return {"success": True, "response": {
+            "text": f"Deploy {model_name} v{version} to {environment}?",
+            "blocks": [
+                {
+                    "type": "section",
+                    "text": {
+                        "type": "mrkdwn",
+                        "text": f"*Confirm Model Deployment*\n\n"
+                               f"*Model:* {model_name}\n"
+                               f"*Version:* {version}\n"
+                               f"*Environment:* {environment}"
+                    }
+                },
+                {
+                    "type": "actions",
+                    "elements": [
+                        {
+                            "type": "button",
+                            "text": {"type": "plain_text", "text": "Deploy"},
+                            "style": "primary",
+                            "action_id": "model_deploy_confirm",
+                            "value": value
+                        }
+                    ]
+                }
+            ]
+        }}
+
+    def _status(self, options: Dict[str, Any], user_id: str, channel_id: str) -> Dict[str, Any]:
+        positional = options['_']
+        if not positional or positional[0] != 'models':
+            return {"success": False, "response": ephemeral("Usage: `/ai status models [name]`")}
+
+        result = self.ml.list_models(positional[1] if len(positional) > 1 else None)
+        models, snapshot = result['models'], result['snapshot']
+        if not models:
+            message = "No registered models found."
+            if snapshot['last_error']:
+                message += f" Registry unavailable: {snapshot['last_error']}"
+            return {"success": snapshot['last_error'] is None, "response": ephemeral(message)}
+
+        lines = []
+        for name, model in sorted(models.items()):
+            stages = ', '.join(f"{stage}: v{version}" for stage, version in sorted(model['stages'].items()))
+            lines.append(f"• *{name}* — {stages or 'no versions'}")
+
+        footer = f"Registry snapshot {snapshot['age_seconds']}s old"
+        if snapshot['stale']:
+            footer += " ⚠️ stale"
+        if snapshot['refreshing']:
+            footer += ", refreshing"
+        return {"success": True, "response": {
+            "blocks": [
+                {"type": "section", "text": {"type": "mrkdwn", "text": "*Model Status*\n" + "\n".join(lines)}},
+                {"type": "context", "elements": [{"type": "mrkdwn", "text": footer}]}
+            ],
+            "response_type": "ephemeral"
+        }}
+
+    def _train(self, options: Dict[str, Any], user_id: str, channel_id: str) -> Dict[str, Any]:
+        if not options['_'] or 'dataset' not in options:
+            return {"success": False, "response": ephemeral("Usage: `/ai train <model> --dataset <data>`")}
+
+        model_name = options['_'][0]
+        result = self.ml.train_model(model_name, options['dataset'], user_id)
+        return {"success": True, "response": {
+            "text": f"🚀 Training started for {model_name} on {options['dataset']} "
+                    f"(run {result.get('run_id', 'pending')})"
+        }}
+
+    def _predict(self, options: Dict[str, Any], user_id: str, channel_id: str) -> Dict[str, Any]:
+        if not options['_'] or 'device' not in options:
+            return {"success": False, "response": ephemeral("Usage: `/ai predict <type> --device <id> [--timeframe <timeframe>]`")}
+
+        prediction_type, device = options['_'][0], options['device']
+        result = self.ml.predict(prediction_type, device, options.get('timeframe', '1h'))
+        prediction = result['prediction']
+        source = "cached" if result['cached'] else "live"
+        return {"success": True, "response": {
+            "blocks": [
+                {
+                    "type": "section",
+                    "text": {
+                        "type": "mrkdwn",
+                        "text": f"*{prediction_type.title()} Prediction* for `{device}`\n\n"
+                               f"*Forecast:* {prediction.get('value', prediction.get('forecast', 'n/a'))}\n"
+                               f"*Confidence:* {prediction.get('confidence', 'n/a')}\n"
+                               f"*Prediction ID:* {prediction.get('prediction_id', 'n/a')}"
+                    }
+                },
+                {
+                    "type": "context",
+                    "elements": [{"type": "mrkdwn", "text": f"{result['model']} v{result['model_version']} ({source})"}]
+                }
+            ]
+        }}
+
+    def _analyze(self, options: Dict[str, Any], user_id: str, channel_id: str) -> Dict[str, Any]:
+        severity = options.get('severity')
+        anomalies = [a for a in self.ml.anomaly_engine.recent_anomalies(options.get('device'))
+                     if severity is None or a['severity'] == severity]
+        if not anomalies:
+            return {"success": True, "response": ephemeral("✅ No matching anomalies in the local scorer cache.")}
+
+        lines = [f"• `{a['id']}` {a['device']} — {a['severity']} (score {a['score']:.3f})" for a in anomalies[:10]]
+        return {"success": True, "response": {
+            "text": f"*{len(anomalies)} anomalies*\n" + "\n".join(lines),
+            "response_type": "ephemeral"
+        }}
+
+    def _explain(self, options: Dict[str, Any], user_id: str, channel_id: str) -> Dict[str, Any]:
+        positional = options['_']
+        if len(positional) < 2 or positional[0] != 'prediction':
+            return {"success": False, "response": ephemeral("Usage: `/ai explain prediction <id>`")}
+
+        explanation = self.ml.explain_prediction(positional[1])
+        features = explanation.get('feature_importance', {})
+        lines = [f"• {name}: {weight:.3f}" for name, weight in
+                 sorted(features.items(), key=lambda item: abs(item[1]), reverse=True)[:5]]
+        return {"success": True, "response": ephemeral(
+            f"*Explanation for {positional[1]}*\n" + ("\n".join(lines) or explanation.get('summary', 'n/a'))
+        )}
+
+    def _automate(self, options: Dict[str, Any], user_id: str, channel_id: str) -> Dict[str, Any]:
+        positional = options['_']
+        if len(positional) < 2:
+            return {"success": False, "response": ephemeral("Usage: `/ai automate <action> <rule> [--threshold <value>]`")}
+
+        parameters = {'threshold': options['threshold']} if 'threshold' in options else {}
+        result = self.ml.set_automation_rule(positional[0], positional[1], parameters, user_id)
+        return {"success": True, "response": {
+            "text": f"⚙️ Rule {positional[1]}: {result.get('status', positional[0])}"
+        }}
+
+    def _workflow(self, options: Dict[str, Any], user_id: str, channel_id: str) -> Dict[str, Any]:
+        positional = options['_']
+        if len(positional) < 2:
+            return {"success": False, "response": ephemeral("Usage: `/ai workflow <action> <name> [--params <parameters>]`")}
+
+        parameters = json.loads(options['params']) if 'params' in options else {}
+        result = self.ml.run_workflow(positional[0], positional[1], parameters, user_id)
+        return {"success": True, "response": {
+            "text": f"🔄 Workflow {positional[1]}: {result.get('status', 'submitted')} "
+                    f"(run {result.get('run_id', 'pending')})"
+        }}
+
+    def _dashboard(self, options: Dict[str, Any], user_id: str, channel_id: str) -> Dict[str, Any]:
+        name = options['_'][0] if options['_'] else 'models'
+        path = DASHBOARDS.get(name)
+        if path is None:
+            return {"success": False, "response": ephemeral(f"Available dashboards: {', '.join(DASHBOARDS)}")}
+        return {"success": True, "response": ephemeral(f"📊 {self.grafana_url}{path}")}
@@ -15,7 +15,8 @@ from typing import Dict, List, Optional, Any
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 import requests
-from prometheus_client import Counter, Histogram, Gauge
+from prometheus_client import Counter, Histogram, Gauge, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
 
 from command_handler import CommandHandler
 from ml_integration import MLIntegration
@@ -32,16 +33,38 @@ command_counter = Counter('chatops_commands_total', 'Total number of ChatOps com
 command_duration = Histogram('chatops_command_duration_seconds', 'Command execution duration')
 active_users = Gauge('chatops_active_users', 'Number of active ChatOps users')
 
+
+class AnomalyScoringCollector:
+    """Exports local anomaly scorer metrics from one snapshot per scrape"""
+    
+    def __init__(self, ml_integration: MLIntegration):
+        self.ml_integration = ml_integration
+    
+    def collect(self):
+        metrics = self.ml_integration.scoring_metrics()
+        yield GaugeMetricFamily('anomaly_scoring_batch_size', 'Mean anomaly scoring batch size',
+                                value=metrics['batch_size_mean'])
+        yield GaugeMetricFamily('anomaly_scoring_batch_latency_p99_ms', 'p99 anomaly scoring batch latency',
+                                value=metrics['batch_latency_ms_p99'])
+        yield GaugeMetricFamily('anomaly_scoring_anomalies_cached', 'Anomalies held in the local scorer cache',
+                                value=metrics['anomalies_cached'])
+
+
 class AINetworkSlackBot:
     """Main Slack Bot class for AI Network Intelligence platform"""
     
     def __init__(self):
         self.app = App(token=os.environ["SLACK_BOT_TOKEN"])
-        self.command_handler = CommandHandler()
+        # Commands and button actions share one client so deployments invalidate
+        # the registry snapshot and prediction cache used by status/predict
         self.ml_integration = MLIntegration()
+        self.command_handler = CommandHandler(self.ml_integration)
         self.config = self._load_config()
         self.active_sessions = {}
         
+        # Export local anomaly scorer metrics on scrape
+        REGISTRY.register(AnomalyScoringCollector(self.ml_integration))
+        
         # Register event handlers
         self._register_handlers()
         
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+ML Integration for AI Network Intelligence ChatOps
+Bridges ChatOps commands to the ML API gateway and the local anomaly scorer
+"""
+
+import os
+import logging
+from typing import Any, Dict, Optional
+
+import requests
+
+from anomaly_scoring import AnomalyScoringEngine, TelemetryFeatureConsumer
+from registry_cache import PredictionCache, RegistrySnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class MLIntegration:
+    """Client for model deployment, anomaly lookup and automation actions"""
+
+    def __init__(self, api_endpoint: Optional[str] = None, timeout: int = 30,
+                 scoring_engine: Optional[AnomalyScoringEngine] = None,
+                 mlflow_endpoint: Optional[str] = None):
+        self.api_endpoint = (api_endpoint or os.environ.get('ML_API_ENDPOINT', 'http://api.ai.local:443')).rstrip('/')
+        self.mlflow_endpoint = (mlflow_endpoint or os.environ.get('MLFLOW_ENDPOINT', 'http://mlflow.ai.local:5000')).rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.registry = RegistrySnapshot(
+            self._fetch_registry,
+            refresh_interval=float(os.environ.get('REGISTRY_REFRESH_SECONDS', '30')),
+            max_staleness=float(os.environ.get('REGISTRY_MAX_STALENESS_SECONDS', '600')),
+            retry_interval=float(os.environ.get('REGISTRY_RETRY_SECONDS', '5')),
+        )
+        self.predictions = PredictionCache(
+            ttl=float(os.environ.get('PREDICTION_CACHE_TTL_SECONDS', '300')),
+            max_entries=int(os.environ.get('PREDICTION_CACHE_MAX_ENTRIES', '10000')),
+            bucket_seconds=int(os.environ.get('PREDICTION_BUCKET_SECONDS', '300')),
+        )
+        self.anomaly_engine = scoring_engine or AnomalyScoringEngine(
+            model_name=os.environ.get('ANOMALY_MODEL_NAME', 'anomaly_detection'),
+            default_version=os.environ.get('ANOMALY_MODEL_VERSION', 'Production'),
+            max_batch_size=int(os.environ.get('ANOMALY_MAX_BATCH_SIZE', '256')),
+            max_wait_ms=float(os.environ.get('ANOMALY_MAX_WAIT_MS', '5')),
+            max_devices=int(os.environ.get('ANOMALY_MAX_DEVICES', '50000')),
+            max_loaded_versions=int(os.environ.get('ANOMALY_MAX_LOADED_VERSIONS', '2')),
+        )
+
+        # Score processed telemetry as it arrives so the anomaly cache stays warm
+        self.feature_consumer: Optional[TelemetryFeatureConsumer] = None
+        bootstrap_servers = os.environ.get('KAFKA_BOOTSTRAP_SERVERS')
+        if bootstrap_servers:
+            features = os.environ.get('ANOMALY_FEATURES')
+            self.feature_consumer = TelemetryFeatureConsumer(
+                self.anomaly_engine,
+                bootstrap_servers,
+                topic=os.environ.get('ANOMALY_FEATURE_TOPIC', 'network.telemetry.processed'),
+                group_id=os.environ.get('ANOMALY_CONSUMER_GROUP', 'chatops-anomaly-scoring'),
+                features=features.split(',') if features else None,
+            )
+            try:
+                self.feature_consumer.start()
+            except Exception as e:
+                logger.error(f"Anomaly feature consumer not started: {e}")
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """Call the ML API gateway and return the decoded JSON body"""
+        response = self.session.request(method, f"{self.api_endpoint}{path}", timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response.json() if response.content else {}
+
+    def _fetch_registry(self) -> Dict[str, Any]:
+        """Read all registered models and their stage versions from MLflow"""
+        response = self.session.get(f"{self.mlflow_endpoint}/api/2.0/mlflow/registered-models/search",
+                                    params={'max_results': 1000}, timeout=self.timeout)
+        response.raise_for_status()
+
+        models = {}
+        for model in response.json().get('registered_models', []):
+            versions = model.get('latest_versions', [])
+            models[model['name']] = {
+                'name': model['name'],
+                'description': model.get('description', ''),
+                'stages': {v.get('current_stage', 'None'): v['version'] for v in versions},
+                'latest_version': max((v['version'] for v in versions), key=int, default=None),
+                'status': {v['version']: v.get('status', 'UNKNOWN') for v in versions},
+                'updated': model.get('last_updated_timestamp'),
+            }
+        return models
+
+    def list_models(self, model_name: Optional[str] = None) -> Dict[str, Any]:
+        """Return registered models from the in-process registry snapshot"""
+        models, meta = self.registry.get()
+        if model_name:
+            models = {model_name: models[model_name]} if model_name in models else {}
+        return {'models': models, 'snapshot': meta}
+
+    def serving_version(self, model_name: str) -> Optional[str]:
+        """Version currently in Production, falling back to the latest registered"""
+        model = self.registry.model(model_name)
+        if not model:
+            return None
+        return model['stages'].get('Production') or model['latest_version']
+
+    def predict(self, prediction_type: str, device: str, timeframe: str = '1h') -> Dict[str, Any]:
+        """Run a prediction, reusing results for the same model version and time bucket"""
+        model_name = f"{prediction_type}_prediction" if prediction_type != 'anomaly' else 'anomaly_detection'
+        version = self.serving_version(model_name) or 'unknown'
+        key = self.predictions.key(device, model_name, version, timeframe)
+
+        result, cached = self.predictions.get_or_compute(key, lambda: self._request(
+            'POST', '/api/v1/predictions',
+            json={'type': prediction_type, 'device': device, 'timeframe': timeframe, 'model_version': version},
+        ))
+        return {'prediction': result, 'model': model_name, 'model_version': version, 'cached': cached}
+
+    def invalidate_model(self, model_name: str) -> None:
+        """Forget cached state for a model after a new version ships"""
+        dropped = self.predictions.invalidate_model(model_name)
+        self.registry.invalidate()
+        logger.info(f"Invalidated registry snapshot and {dropped} cached predictions for {model_name}")
+
+    def deploy_model(self, model_name: str, version: str, environment: str) -> Dict[str, Any]:
+        """Deploy a registered model version"""
+        try:
+            result = self._request('POST', f"/api/v1/models/{model_name}/deploy",
+                                   json={'version': version, 'environment': environment})
+        except requests.RequestException as e:
+            logger.error(f"Model deployment request failed: {e}")
+            return {'success': False, 'error': str(e)}
+
+        self.invalidate_model(model_name)
+
+        if model_name == self.anomaly_engine.model_name and environment == 'production':
+            try:
+                self.anomaly_engine.activate(version)
+            except Exception as e:
+                logger.warning(f"Deployed {model_name} v{version} but local scorer could not load it: {e}")
+
+        return {'success': True, 'deployment_id': result.get('deployment_id', f"{model_name}-{version}")}
+
+    def get_anomaly_details(self, anomaly_id: str) -> Optional[Dict[str, Any]]:
+        """Look up an anomaly, preferring the local scorer cache"""
+        anomaly = self.anomaly_engine.get_anomaly(anomaly_id)
+        if anomaly is not None:
+            return anomaly
+        try:
+            return self._request('GET', f"/api/v1/anomalies/{anomaly_id}") or None
+        except requests.RequestException as e:
+            logger.error(f"Anomaly lookup failed for {anomaly_id}: {e}")
+            return None
+
+    def start_investigation(self, anomaly_id: str, user_id: str) -> Dict[str, Any]:
+        """Open an investigation, attaching the device's recent anomaly scores"""
+        anomaly = self.get_anomaly_details(anomaly_id) or {}
+        device = anomaly.get('device')
+        recent = self.anomaly_engine.recent_scores(device) if device else []
+
+        investigation = self._request('POST', '/api/v1/investigations', json={
+            'anomaly_id': anomaly_id,
+            'requested_by': user_id,
+            'anomaly': anomaly,
+            'recent_scores': recent,
+        })
+
+        if 'analysis' not in investigation:
+            flagged = len(self.anomaly_engine.recent_anomalies(device)) if device else 0
+            investigation['analysis'] = (
+                f"{flagged} anomalies cached for {device}; "
+                f"{len(recent)} recent samples scored by {anomaly.get('type', 'model')} "
+                f"v{anomaly.get('model_version', 'unknown')}"
+            )
+        return investigation
+
+    def execute_automation(self, action_type: str, target: str, parameters: Dict[str, Any],
+                           user_id: str) -> Dict[str, Any]:
+        """Trigger an automation action"""
+        try:
+            result = self._request('POST', '/api/v1/automation/actions', json={
+                'action_type': action_type,
+                'target': target,
+                'parameters': parameters,
+                'requested_by': user_id,
+            })
+        except requests.RequestException as e:
+            logger.error(f"Automation request failed: {e}")
+            return {'success': False, 'error': str(e)}
+        return {
+            'success': True,
+            'execution_id': result.get('execution_id'),
+            'status': result.get('status', 'submitted'),
+        }
+
+    def train_model(self, model_name: str, dataset: str, user_id: str) -> Dict[str, Any]:
+        """Start a training run for a registered model"""
+        return self._request('POST', f"/api/v1/models/{model_name}/train",
+                             json={'dataset': dataset, 'requested_by': user_id})
+
+    def explain_prediction(self, prediction_id: str) -> Dict[str, Any]:
+        """Fetch feature attributions for a prediction"""
+        return self._request('GET', f"/api/v1/predictions/{prediction_id}/explanation")
+
+    def set_automation_rule(self, action: str, rule_name: str, parameters: Dict[str, Any],
+                            user_id: str) -> Dict[str, Any]:
+        """Enable, disable or tune an automation rule"""
+        return self._request('POST', f"/api/v1/automation/rules/{rule_name}/{action}",
+                             json={'parameters': parameters, 'requested_by': user_id})
+
+    def run_workflow(self, action: str, workflow_name: str, parameters: Dict[str, Any],
+                     user_id: str) -> Dict[str, Any]:
+        """Run or inspect an orchestrated workflow"""
+        return self._request('POST', f"/api/v1/workflows/{workflow_name}/{action}",
+                             json={'parameters': parameters, 'requested_by': user_id})
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Registry snapshot and prediction cache statistics"""
+        return {'registry': self.registry.get()[1], 'predictions': self.predictions.stats()}
+
+    def scoring_metrics(self) -> Dict[str, Any]:
+        """Expose local anomaly scorer batch and latency metrics"""
+        metrics = self.anomaly_engine.metrics()
+        if self.feature_consumer is not None:
+            metrics['feature_consumer'] = dict(self.feature_consumer.stats)
+        return metrics
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Model Registry Snapshot and Prediction Cache
+Keeps an in-process, background-refreshed copy of the MLflow model registry
+(stale-while-revalidate) and a TTL + LRU bounded cache of predictions keyed by
+device, model version and time bucket. Concurrent misses for one key share a
+single computation.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RegistrySnapshot:
+    """Serve the last registry snapshot immediately, refreshing it in the background"""
+
+    def __init__(self, fetch: Callable[[], Dict[str, Any]], refresh_interval: float = 30.0,
+                 max_staleness: float = 600.0, retry_interval: float = 5.0):
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.retry_interval = retry_interval
+
+        self._models: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0
+        self._generation = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self.last_error: Optional[str] = None
+        # Failed fetches back off exponentially, up to the refresh interval
+        self.failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self._fetched_at if self._models is not None else float('inf')
+
+    def get(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return (models, metadata); only the very first call blocks on the registry"""
+        retry_due = time.monotonic() >= self._retry_at
+        if self._models is None:
+            if retry_due:
+                self.refresh()
+        elif self.age > self.refresh_interval and retry_due:
+            self._refresh_async()
+
+        age = self.age
+        return self._models or {}, {
+            'age_seconds': round(age, 1) if age != float('inf') else None,
+            'stale': age > self.max_staleness,
+            'refreshing': self._refreshing,
+            'last_error': self.last_error,
+            'failures': self.failures,
+        }
+
+    def model(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.get()[0].get(name)
+
+    def refresh(self) -> None:
+        """Fetch the registry synchronously"""
+        with self._lock:
+            generation = self._generation
+        try:
+            models = self.fetch()
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                backoff = min(self.retry_interval * 2 ** (self.failures - 1),
+                              max(self.refresh_interval, self.retry_interval))
+                self._retry_at = time.monotonic() + backoff
+                self.last_error = str(e)
+            logger.error(f"Model registry refresh failed, retrying in {backoff:.1f}s: {e}")
+            return
+        with self._lock:
+            # A newer invalidation raced this fetch; keep it marked for refresh
+            self._models = models
+            self._fetched_at = time.monotonic() if generation == self._generation else 0.0
+            self.last_error = None
+            self.failures = 0
+            self._retry_at = 0.0
+
+    def _refresh_async(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='registry-refresh', daemon=True).start()
+
+    def invalidate(self) -> None:
+        """Mark the snapshot stale and refresh it without blocking readers"""
+        with self._lock:
+            self._generation += 1
+            self._fetched_at = 0.0
+        self._refresh_async()
+
+
+class PredictionCache:
+    """TTL cache with size-bounded LRU eviction and per-model invalidation"""
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000, bucket_seconds: int = 300):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bucket_seconds = bucket_seconds
+
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._by_model: Dict[str, Set[Hashable]] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def key(self, device: str, model_name: str, model_version: str,
+            timeframe: str = '', now: Optional[float] = None) -> Tuple[str, str, str, str, int]:
+        bucket = int((now if now is not None else time.time()) // self.bucket_seconds)
+        return (device, model_name, str(model_version), timeframe, bucket)
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def _lookup(self, key: Tuple) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._by_model.setdefault(key[1], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                self._by_model.get(oldest[1], set()).discard(oldest)
+
+    def get_or_compute(self, key: Tuple, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (value, cached); concurrent misses for a key wait on one compute"""
+        value = self.get(key)
+        if value is not None:
+            return value, True
+
+        with self._lock:
+            # The leader may have stored the value since the miss above
+            value = self._lookup(key)
+            if value is not None:
+                return value, True
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.result(), True
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.set_exception(e)
+            raise
+        self.put(key, value)
+        with self._lock:
+            self._inflight.pop(key, None)
+        flight.set_result(value)
+        return value, False
+
+    def invalidate_model(self, model_name: str) -> int:
+        """Drop every cached prediction produced by a model"""
+        with self._lock:
+            keys = self._by_model.pop(model_name, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            return len(keys)
+
+    def _remove(self, key: Tuple) -> None:
+        self._entries.pop(key, None)
+        self._by_model.get(key[1], set()).discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Telemetry Ingestion Worker
+Consumes raw telemetry from network.telemetry.raw in batches, decodes it into
+columnar NumPy buffers, computes per-interface windowed rollups (rate, p95,
+min/max) with vectorized operations and produces them to
+network.telemetry.processed.
+"""
+
+import os
+import json
+import time
+import signal
+import logging
+import argparse
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+try:
+    import orjson
+
+    def _loads(data: bytes) -> Any:
+        return orjson.loads(data)
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _loads(data: bytes) -> Any:
+        return json.loads(data)
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'bootstrap_servers': 'kafka.ai.local:9092',
+    'raw_topic': 'network.telemetry.raw',
+    'processed_topic': 'network.telemetry.processed',
+    'dead_letter_topic': 'network.telemetry.deadletter',
+    'consumer_group': 'ai-network-intelligence',
+    'batch_size': 5000,
+    'poll_timeout_ms': 100,
+    'window_seconds': 60,
+    'allowed_lateness_seconds': 10,
+    'counter_suffixes': ['_octets', '_packets', '_pkts', '_errors', '_discards'],
+}
+
+
+# ----------------------------------------------------------------------
+# Transports
+# ----------------------------------------------------------------------
+
+class Transport:
+    """Minimal consume/produce interface the worker depends on."""
+
+    def poll(self, max_records: int, timeout_ms: int) -> List[bytes]:
+        raise NotImplementedError
+
+    def produce(self, topic: str, records: List[bytes]) -> None:
+        raise NotImplementedError
+
+    def offsets(self) -> Dict[Any, int]:
+        """Next offset per partition for everything returned by poll so far."""
+        return {}
+
+    def commit(self, offsets: Dict[Any, int]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class LocalTransport(Transport):
+    """In-process stand-in for Kafka, used for development and benchmarks."""
+
+    def __init__(self, raw_topic: str = DEFAULT_CONFIG['raw_topic']):
+        self.raw_topic = raw_topic
+        self.topics: Dict[str, deque] = {raw_topic: deque()}
+        self.consumed = 0
+        self.committed: Dict[Any, int] = {}
+        self._ready = threading.Condition()
+
+    def publish(self, topic: str, records: Iterable[bytes]) -> None:
+        with self._ready:
+            self.topics.setdefault(topic, deque()).extend(records)
+            self._ready.notify_all()
+
+    def poll(self, max_records: int, timeout_ms: int) -> List[bytes]:
+        queue = self.topics[self.raw_topic]
+        with self._ready:
+            if not queue:
+                self._ready.wait(timeout_ms / 1000.0)
+            count = min(max_records, len(queue))
+            self.consumed += count
+            return [queue.popleft() for _ in range(count)]
+
+    def produce(self, topic: str, records: List[bytes]) -> None:
+        self.publish(topic, records)
+
+    def offsets(self) -> Dict[Any, int]:
+        return {self.raw_topic: self.consumed}
+
+    def commit(self, offsets: Dict[Any, int]) -> None:
+        self.committed.update(offsets)
+
+
+class KafkaTransport(Transport):
+    """Kafka transport backed by kafka-python."""
+
+    def __init__(self, config: Dict[str, Any]):
+        try:
+            from kafka import KafkaConsumer, KafkaProducer
+            from kafka.structs import OffsetAndMetadata
+        except ImportError as e:
+            raise RuntimeError("KafkaTransport requires kafka-python (pip install kafka-python)") from e
+
+        servers = config['bootstrap_servers']
+        self.consumer = KafkaConsumer(
+            config['raw_topic'],
+            bootstrap_servers=servers,
+            group_id=config['consumer_group'],
+            enable_auto_commit=False,
+            max_poll_records=config['batch_size'],
+        )
+        self.producer = KafkaProducer(bootstrap_servers=servers, linger_ms=5, compression_type='lz4')
+        self._offset_type = OffsetAndMetadata
+        self._positions: Dict[Any, int] = {}
+
+    def poll(self, max_records: int, timeout_ms: int) -> List[bytes]:
+        batches = self.consumer.poll(timeout_ms=timeout_ms, max_records=max_records)
+        for partition, messages in batches.items():
+            if messages:
+                self._positions[partition] = messages[-1].offset + 1
+        return [message.value for messages in batches.values() for message in messages]
+
+    def produce(self, topic: str, records: List[bytes]) -> None:
+        for record in records:
+            self.producer.send(topic, record)
+
+    def offsets(self) -> Dict[Any, int]:
+        return dict(self._positions)
+
+    def commit(self, offsets: Dict[Any, int]) -> None:
+        if not offsets:
+            return
+        # Processed output must be durable before offsets move forward
+        self.producer.flush()
+        self.consumer.commit({partition: self._offset(offset) for partition, offset in offsets.items()})
+
+    def _offset(self, offset: int) -> Any:
+        # kafka-python 2.1 added leader_epoch to OffsetAndMetadata
+        try:
+            return self._offset_type(offset, '', -1)
+        except TypeError:
+            return self._offset_type(offset, '')
+
+    def close(self) -> None:
+        self.producer.flush()
+        self.producer.close()
+        self.consumer.close()
+
+
+# ----------------------------------------------------------------------
+# Decoding and aggregation
+# ----------------------------------------------------------------------
+
+class SeriesRegistry:
+    """Interns (device, interface, metric) tuples to dense integer ids."""
+
+    def __init__(self, counter_suffixes: Iterable[str]):
+        self.ids: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self.keys: List[Tuple[str, str, str]] = []
+        self.counter_suffixes = tuple(counter_suffixes)
+        self._is_counter: List[bool] = []
+        self._counter_mask = np.zeros(0, dtype=bool)
+
+    def metrics_for(self, device: str, interface: str) -> Dict[str, int]:
+        """Return the metric -> series id map for one interface."""
+        metrics = self.ids.get((device, interface))
+        if metrics is None:
+            metrics = self.ids[(device, interface)] = {}
+        return metrics
+
+    def intern(self, device: str, interface: str, metric: str) -> int:
+        metrics = self.metrics_for(device, interface)
+        series_id = metrics.get(metric)
+        if series_id is None:
+            series_id = metrics[metric] = len(self.keys)
+            self.keys.append((device, interface, metric))
+            self._is_counter.append(metric.endswith(self.counter_suffixes))
+        return series_id
+
+    @property
+    def counter_mask(self) -> np.ndarray:
+        if len(self._counter_mask) != len(self._is_counter):
+            self._counter_mask = np.array(self._is_counter, dtype=bool)
+        return self._counter_mask
+
+
+def _columns(documents: List[Any], registry: SeriesRegistry) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten parsed sample documents into (series_id, timestamp, value) columns."""
+    series: List[int] = []
+    timestamps: List[float] = []
+    values: List[float] = []
+    for document in documents:
+        samples = document if isinstance(document, list) else (document,)
+        for sample in samples:
+            device = sample['device']
+            interface = sample.get('interface', '')
+            metrics = sample['metrics']
+            known = registry.metrics_for(device, interface)
+            for metric in metrics:
+                series_id = known.get(metric)
+                if series_id is None:
+                    series_id = registry.intern(device, interface, metric)
+                series.append(series_id)
+            timestamps.extend([sample['timestamp']] * len(metrics))
+            values.extend(metrics.values())
+
+    return (
+        np.fromiter(series, dtype=np.int64, count=len(series)),
+        np.fromiter(timestamps, dtype=np.float64, count=len(timestamps)),
+        np.fromiter(values, dtype=np.float64, count=len(values)),
+    )
+
+
+def decode_batch(messages: List[bytes], registry: SeriesRegistry,
+                 rejected: Optional[List[bytes]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Decode raw messages into (series_id, timestamp, value) columns.
+
+    A message is one sample document or a list of them:
+    {"device": ..., "interface": ..., "timestamp": ..., "metrics": {name: value}}
+
+    With a rejected list, messages that are not valid sample documents are
+    appended to it and left out instead of failing the whole batch.
+    """
+    empty = np.empty(0)
+    if not messages:
+        return empty.astype(np.int64), empty, empty
+
+    # One parser call for the whole batch instead of one per message
+    try:
+        return _columns(_loads(b'[' + b','.join(messages) + b']'), registry)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        if rejected is None:
+            raise
+
+    # Slow path, only for batches holding a bad record: isolate it per message
+    parts = []
+    for message in messages:
+        try:
+            parts.append(_columns([_loads(message)], registry))
+        except (ValueError, TypeError, KeyError, AttributeError):
+            rejected.append(message)
+    if not parts:
+        return empty.astype(np.int64), empty, empty
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+def compute_rollups(series: np.ndarray, timestamps: np.ndarray, values: np.ndarray,
+                    counter_mask: np.ndarray) -> Dict[str, np.ndarray]:
+    """Vectorized per-series rollups over one window of samples."""
+    # Sort by series then time so each series is a contiguous, ordered run
+    order = np.lexsort((timestamps, series))
+    series, timestamps, values = series[order], timestamps[order], values[order]
+
+    starts = np.flatnonzero(np.r_[True, series[1:] != series[:-1]])
+    ends = np.r_[starts[1:], len(series)] - 1
+    counts = ends - starts + 1
+    ids = series[starts]
+
+    minimum = np.minimum.reduceat(values, starts)
+    maximum = np.maximum.reduceat(values, starts)
+    mean = np.add.reduceat(values, starts) / counts
+
+    # Counter rate from first/last sample; a negative delta means wrap or reset
+    elapsed = timestamps[ends] - timestamps[starts]
+    delta = values[ends] - values[starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where((elapsed > 0) & (delta >= 0), delta / elapsed, np.nan)
+    rate[~counter_mask[ids]] = np.nan
+
+    # p95 per series: sort values within each run and take the nearest rank
+    by_value = np.lexsort((values, series))
+    sorted_values = values[by_value]
+    p95 = sorted_values[starts + np.ceil(0.95 * counts).astype(np.int64) - 1]
+
+    return {
+        'series': ids,
+        'count': counts,
+        'min': minimum,
+        'max': maximum,
+        'mean': mean,
+        'p95': p95,
+        'rate': rate,
+    }
+
+
+class WindowBuffer:
+    """Tumbling windows of columnar chunks, closed by event-time watermark."""
+
+    def __init__(self, window_seconds: int, allowed_lateness: int):
+        self.window = window_seconds
+        self.lateness = allowed_lateness
+        self.chunks: Dict[int, List[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = {}
+        self.watermark = -np.inf
+        self.late_samples = 0
+
+    def add(self, series: np.ndarray, timestamps: np.ndarray, values: np.ndarray) -> float:
+        """Buffer samples; returns the highest window id they landed in (-inf if none)."""
+        if not len(series):
+            return -np.inf
+        window_ids = (timestamps // self.window).astype(np.int64)
+        closed = (window_ids + 1) * self.window <= self.watermark
+        if closed.any():
+            self.late_samples += int(closed.sum())
+            keep = ~closed
+            series, timestamps, values, window_ids = (
+                series[keep], timestamps[keep], values[keep], window_ids[keep])
+        for window_id in np.unique(window_ids):
+            mask = window_ids == window_id
+            self.chunks.setdefault(int(window_id), []).append(
+                (series[mask], timestamps[mask], values[mask]))
+        if not len(timestamps):
+            return -np.inf
+        self.watermark = max(self.watermark, float(timestamps.max()) - self.lateness)
+        return float(window_ids.max())
+
+    @property
+    def oldest_open(self) -> float:
+        return min(self.chunks, default=np.inf)
+
+    def pop_closed(self, flush_all: bool = False) -> List[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+        ready = sorted(w for w in self.chunks if flush_all or (w + 1) * self.window <= self.watermark)
+        closed = []
+        for window_id in ready:
+            chunks = self.chunks.pop(window_id)
+            closed.append((
+                window_id,
+                np.concatenate([c[0] for c in chunks]),
+                np.concatenate([c[1] for c in chunks]),
+                np.concatenate([c[2] for c in chunks]),
+            ))
+        return closed
+
+
+class IngestionWorker:
+    """Batch consume, decode, aggregate and produce loop."""
+
+    def __init__(self, transport: Transport, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update(config or {})
+        self.transport = transport
+        self.registry = SeriesRegistry(self.config['counter_suffixes'])
+        self.windows = WindowBuffer(int(self.config['window_seconds']),
+                                    int(self.config['allowed_lateness_seconds']))
+        self.running = True
+        # (highest window id, transport offsets) per batch not yet committed
+        self.pending: deque = deque()
+        self.last_window = -np.inf
+        self.stats = {
+            'messages': 0,
+            'metrics': 0,
+            'rollups': 0,
+            'rejected': 0,
+            'batches': 0,
+            'cpu_seconds': 0.0,
+        }
+        self.latencies = deque(maxlen=10000)
+
+    def process(self, messages: List[bytes], flush: bool = False) -> int:
+        """Process one batch; returns the number of rollup records produced."""
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+
+        rejected: List[bytes] = []
+        series, timestamps, values = decode_batch(messages, self.registry, rejected)
+        if rejected:
+            # Park malformed records so the batch (and its offsets) can move past them
+            logger.warning(f"Skipped {len(rejected)} malformed telemetry records")
+            if self.config.get('dead_letter_topic'):
+                self.transport.produce(self.config['dead_letter_topic'], rejected)
+        self.last_window = self.windows.add(series, timestamps, values)
+
+        produced = 0
+        for window_id, w_series, w_ts, w_values in self.windows.pop_closed(flush_all=flush):
+            records = self._encode(window_id, compute_rollups(w_series, w_ts, w_values,
+                                                              self.registry.counter_mask))
+            self.transport.produce(self.config['processed_topic'], records)
+            produced += len(records)
+
+        self.stats['messages'] += len(messages)
+        self.stats['metrics'] += len(series)
+        self.stats['rollups'] += produced
+        self.stats['rejected'] += len(rejected)
+        self.stats['batches'] += 1
+        self.stats['cpu_seconds'] += time.process_time() - cpu_started
+        self.latencies.append(time.perf_counter() - started)
+        return produced
+
+    def _encode(self, window_id: int, rollups: Dict[str, np.ndarray]) -> List[bytes]:
+        """Encode one processed record per interface and window."""
+        window_start = window_id * self.windows.window
+        keys = self.registry.keys
+        interfaces: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        columns = zip(rollups['series'].tolist(), rollups['count'].tolist(), rollups['min'].tolist(),
+                      rollups['max'].tolist(), rollups['mean'].tolist(), rollups['p95'].tolist(),
+                      rollups['rate'].tolist())
+        for series_id, count, minimum, maximum, mean, p95, rate in columns:
+            device, interface, metric = keys[series_id]
+            metrics = interfaces.get((device, interface))
+            if metrics is None:
+                metrics = interfaces[(device, interface)] = {}
+            metrics[metric] = {
+                'count': count,
+                'min': minimum,
+                'max': maximum,
+                'mean': mean,
+                'p95': p95,
+                'rate': None if rate != rate else rate,
+            }
+        return [
+            _dumps({
+                'device': device,
+                'interface': interface,
+                'window_start': window_start,
+                'window_end': window_start + self.windows.window,
+                'metrics': metrics,
+            })
+            for (device, interface), metrics in interfaces.items()
+        ]
+
+    def latency_percentile(self, percentile: float) -> float:
+        if not self.latencies:
+            return 0.0
+        return float(np.percentile(np.fromiter(self.latencies, dtype=np.float64), percentile))
+
+    def commit_closed(self) -> None:
+        """Commit offsets up to the last batch whose windows have all been produced."""
+        oldest_open = self.windows.oldest_open
+        covered = None
+        while self.pending and self.pending[0][0] < oldest_open:
+            covered = self.pending.popleft()[1]
+        if covered is not None:
+            self.transport.commit(covered)
+
+    def run(self, max_batches: Optional[int] = None) -> None:
+        """Consume until stopped (or max_batches), committing once windows are produced."""
+        batches = 0
+        while self.running and (max_batches is None or batches < max_batches):
+            messages = self.transport.poll(int(self.config['batch_size']),
+                                           int(self.config['poll_timeout_ms']))
+            if not messages:
+                continue
+            offsets = self.transport.offsets()
+            self.process(messages)
+            self.pending.append((self.last_window, offsets))
+            self.commit_closed()
+            batches += 1
+            if self.stats['batches'] % 1000 == 0:
+                logger.info(f"Processed {self.stats['metrics']} metrics, "
+                            f"p99 batch latency {self.latency_percentile(99) * 1000:.1f} ms")
+
+    def stop(self, *_args) -> None:
+        self.running = False
+
+    def shutdown(self) -> None:
+        """Flush open windows and release the transport."""
+        self.process([], flush=True)
+        self.commit_closed()
+        self.transport.close()
+
+
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+    """Load worker settings from the role's data_pipeline.ingestion.kafka block."""
+    config: Dict[str, Any] = {}
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            data = yaml.safe_load(f) or {}
+        kafka = data.get('data_pipeline', {}).get('ingestion', {}).get('kafka', data)
+        topics = kafka.get('topics', {})
+        config.update({k: v for k, v in kafka.items() if k in DEFAULT_CONFIG})
+        if 'telemetry' in topics:
+            config['raw_topic'] = topics['telemetry']
+        if 'processed' in topics:
+            config['processed_topic'] = topics['processed']
+        if 'dead_letter' in topics:
+            config['dead_letter_topic'] = topics['dead_letter']
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Telemetry ingestion worker')
+    parser.add_argument('--config', '-c', default=os.environ.get('INGESTION_CONFIG', '/etc/telemetry/config.yaml'),
+                        help='Pipeline configuration file')
+    parser.add_argument('--bootstrap-servers', default=os.environ.get('KAFKA_BOOTSTRAP_SERVERS'),
+                        help='Override Kafka bootstrap servers')
+    parser.add_argument('--batch-size', type=int, help='Override records per poll')
+    parser.add_argument('--window-seconds', type=int, help='Override rollup window')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = dict(DEFAULT_CONFIG)
+    config.update(load_config(args.config))
+    if args.bootstrap_servers:
+        config['bootstrap_servers'] = args.bootstrap_servers
+    if args.batch_size:
+        config['batch_size'] = args.batch_size
+    if args.window_seconds:
+        config['window_seconds'] = args.window_seconds
+
+    worker = IngestionWorker(KafkaTransport(config), config)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+
+    logger.info(f"Consuming {config['raw_topic']} -> {config['processed_topic']}")
+    try:
+        worker.run()
+    finally:
+        worker.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Utilization Analytics Benchmark
+Feeds a week of 5-minute SNMP counter polls for 100k interfaces into the store one
+day at a time (64-bit and 32-bit counters, wraps, device reboots, missed polls),
+then runs the analytics pass. Checks decoded rates against the generated traffic
+and compares the percentile pass with np.nanpercentile over float64 rates. A
+second, smaller fleet goes through the collector export (JSON lines) end to end:
+first ingest, an idle re-run, an incremental cycle and a run after compaction.
+"""
+
+import os
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from utilization_analytics import (
+    INVALID, InterfaceCatalog, UNITS, UtilizationStore, analyze, findings, ingest_polls, resolve_limits, summarize,
+)
+
+INTERVAL = 300
+PER_DAY = 86400 // INTERVAL
+
+# Port layout per device: name -> (speed bps, counter bits)
+PORTS = (
+    [(f"Ethernet1/{i}", 100e9, 64) for i in (1, 2)]
+    + [(f"Ethernet1/{i}", 10e9, 64) for i in range(3, 25)]
+    + [(f"Ethernet1/{i}", 1e9, 64) for i in range(25, 47)]
+    + [("Ethernet1/47", 1e9, 32), ("Ethernet1/48", 100e6, 32)]
+)
+
+POLICY_VARS = {
+    'hierarchical_shaping': [
+        {'parent_policy': 'WAN-SHAPE', 'parent_class': 'class-default', 'total_bandwidth': 2000000000,
+         'child_policy': 'WAN-CHILD'},
+    ],
+    'bandwidth_allocation_policies': [
+        {'policy_name': 'WAN-CHILD', 'class_name': 'BUSINESS', 'bandwidth_type': 'percent', 'bandwidth_value': 60},
+        {'policy_name': 'WAN-CHILD', 'class_name': 'BULK', 'bandwidth_type': 'percent', 'bandwidth_value': 30},
+    ],
+    'priority_queue_policies': [
+        {'policy_name': 'WAN-CHILD', 'class_name': 'VOICE', 'priority_bandwidth': 'percent 20'},
+    ],
+    'single_rate_policers': [
+        {'policy_name': 'EDGE-POLICE', 'class_name': 'class-default', 'rate': 500000000, 'burst': 15625000,
+         'conform_action': 'transmit', 'exceed_action': 'drop'},
+    ],
+    'shaping_interface_bindings': [{'interface': 'Ethernet1/3', 'policy_name': 'WAN-SHAPE'}],
+    # Short form as in SNMP ifName; bindings match either form
+    'policing_interface_bindings': [{'interface': 'Eth1/25', 'policy_name': 'EDGE-POLICE'}],
+    'bandwidth_threshold_minor': 70,
+    'bandwidth_threshold_major': 85,
+}
+
+
+class Fleet:
+    """Synthetic traffic and raw SNMP counters, generated one block of polls at a time"""
+
+    def __init__(self, interfaces: int, seed: int = 11):
+        self.rng = np.random.default_rng(seed)
+        devices = -(-interfaces // len(PORTS))
+        self.catalog = InterfaceCatalog()
+        for d in range(devices):
+            for name, speed, bits in PORTS[:min(len(PORTS), interfaces - d * len(PORTS))]:
+                self.catalog.add(f"device-{d:05d}", name, speed, bits)
+        rows = len(self.catalog)
+        self.devices = devices
+        speed = self.catalog.speed
+        narrow = self.catalog.narrow
+
+        # Mean load, diurnal swing and daily growth per interface
+        self.base = self.rng.uniform(0.05, 0.6, rows) * speed
+        self.base[narrow & (speed >= 1e9)] = self.rng.uniform(0.01, 0.05, int((narrow & (speed >= 1e9)).sum())) * 1e9
+        self.growth = np.where(self.rng.random(rows) < 0.02, self.rng.uniform(0.03, 0.06, rows), 0.0) * speed
+        limits = resolve_limits(self.catalog, POLICY_VARS)
+        self.in_ceiling = limits['in_limit']
+        self.out_ceiling = limits['out_limit']
+
+        self.jitter = self.rng.integers(0, 20, devices)
+        self.boot = np.full(devices, 1700000000 - 86400 * 30, dtype=np.int64)
+        self.octets_in = self.rng.uniform(0, 1e12, rows)
+        self.octets_out = self.rng.uniform(0, 1e12, rows)
+        self.reboots = 0
+        self.missed = 0
+
+    def block(self, first_cycle: int, k: int):
+        """Counters for k polls; returns store inputs and the true per-interval rates"""
+        rows = len(self.catalog)
+        cycles = first_cycle + np.arange(k)
+        times = 1700000000 + cycles[None, :] * INTERVAL + self.jitter[:, None]
+
+        # A few devices reboot during the block: counters restart from zero
+        rebooting = np.flatnonzero(self.rng.random(self.devices) < 0.002)
+        reboot_at = self.rng.integers(0, k, len(rebooting))
+        self.reboots += len(rebooting)
+
+        day = cycles / PER_DAY
+        diurnal = 0.7 + 0.3 * np.sin(2 * np.pi * (cycles % PER_DAY) / PER_DAY)
+        device_index = self.catalog.device_index
+        true_rates, counters = [], []
+        for ceiling, octets in ((self.in_ceiling, self.octets_in), (self.out_ceiling, self.octets_out)):
+            rate = (self.base[:, None] * diurnal[None, :]).astype(np.float32)
+            rate += (self.growth[:, None] * day[None, :]).astype(np.float32)
+            rate *= self.rng.uniform(0.85, 1.15, (rows, k)).astype(np.float32)
+            np.minimum(rate, np.minimum(ceiling, self.catalog.speed)[:, None].astype(np.float32), out=rate)
+            elapsed = np.diff(times, axis=1, prepend=times[:, :1] - INTERVAL)[device_index]
+            total = np.cumsum(rate * elapsed / 8, axis=1, dtype=np.float64)
+            total += octets[:, None]
+            for device, column in zip(rebooting, reboot_at):
+                selected = device_index == device
+                # Traffic since the reboot only
+                total[selected, column:] -= total[selected, column - 1:column] if column else octets[selected, None]
+            octets[:] = total[:, -1]
+            raw = total.astype(np.uint64)
+            raw[self.catalog.narrow] %= np.uint64(2 ** 32)
+            true_rates.append(rate)
+            counters.append(raw)
+
+        uptime = (times - self.boot[:, None]).astype(np.float64)
+        for device, column in zip(rebooting, reboot_at):
+            boot = times[device, column] - INTERVAL // 2
+            uptime[device, column:] = times[device, column:] - boot
+            self.boot[device] = boot
+
+        # Unreachable devices miss the occasional poll
+        missed = self.rng.random(times.shape) < 0.001
+        self.missed += int(missed.sum())
+        times = np.where(missed, 0, times)
+        return times, counters[0], counters[1], uptime, true_rates
+
+
+def percentile_baseline(store: UtilizationStore, rows: int, percentiles) -> float:
+    """np.nanpercentile over float64 rates for the first `rows` interfaces"""
+    started = time.perf_counter()
+    for data in (store.inbound, store.outbound):
+        samples = data[:rows].astype(np.float64)
+        samples[data[:rows] == INVALID] = np.nan
+        samples *= (store.catalog.full_scale[:rows] / UNITS)[:, None]
+        np.nanpercentile(samples, percentiles, axis=1)
+        np.nanmean(samples, axis=1)
+    return time.perf_counter() - started
+
+
+def write_export(handle, fleet: Fleet, first_cycle: int, k: int) -> tuple:
+    """Append k cycles of collector poll documents; returns the equivalent store inputs"""
+    times, in_octets, out_octets, uptime, _ = fleet.block(first_cycle, k)
+    uptime = np.where(times > 0, uptime, 0.0)
+    catalog = fleet.catalog
+    starts = np.searchsorted(catalog.device_index, np.arange(fleet.devices + 1))
+    names = [[catalog.rows[r][1] for r in range(starts[d], starts[d + 1])] for d in range(fleet.devices)]
+    speeds = [[catalog.speed[r] / 1e6 for r in range(starts[d], starts[d + 1])] for d in range(fleet.devices)]
+    hc = [[not catalog.narrow[r] for r in range(starts[d], starts[d + 1])] for d in range(fleet.devices)]
+    for column in range(k):
+        column_in, column_out = in_octets[:, column].tolist(), out_octets[:, column].tolist()
+        for d, device in enumerate(catalog.devices):
+            if times[d, column] <= 0:
+                continue
+            first, last = starts[d], starts[d + 1]
+            handle.write(json.dumps({
+                'device': device, 'timestamp': int(times[d, column]), 'sys_uptime': int(uptime[d, column] * 100),
+                'names': names[d], 'in_octets': column_in[first:last], 'out_octets': column_out[first:last],
+                'speed_mbps': speeds[d], 'hc': hc[d],
+            }, separators=(',', ':')) + '\n')
+    return times, in_octets, out_octets, uptime
+
+
+def same_store(store: UtilizationStore, reference: UtilizationStore) -> bool:
+    """Equal samples and counter state per (device, interface), whatever the row order"""
+    order = [store.catalog.row_ids[row] for row in reference.catalog.rows]
+    return np.array_equal(store.slot_time, reference.slot_time) and all(
+        np.array_equal(getattr(store, name)[order], getattr(reference, name))
+        for name in ('inbound', 'outbound', 'last_in', 'last_out', 'last_time'))
+
+
+def export_benchmark(interfaces: int, days: int) -> None:
+    """Collector export -> store through ingest_polls, checked against direct store ingest"""
+    fleet = Fleet(interfaces, seed=5)
+    reference = UtilizationStore(fleet.catalog, INTERVAL, (days + 1) * PER_DAY)
+    with tempfile.TemporaryDirectory() as directory:
+        export, path = os.path.join(directory, 'counters.jsonl'), os.path.join(directory, 'store.npz')
+        with open(export, 'w') as handle:
+            for day in range(days):
+                reference.ingest(*write_export(handle, fleet, day * PER_DAY, PER_DAY))
+        size = os.path.getsize(export)
+
+        store = UtilizationStore(InterfaceCatalog(), INTERVAL, (days + 1) * PER_DAY)
+        started = time.perf_counter()
+        cycles = ingest_polls(store, [export], block_cycles=PER_DAY)
+        first_time = time.perf_counter() - started
+        store.save(path)
+        matches = same_store(store, reference)
+
+        store = UtilizationStore.load(path)
+        started = time.perf_counter()
+        idle = ingest_polls(store, [export])
+        idle_time = time.perf_counter() - started
+
+        with open(export, 'a') as handle:
+            reference.ingest(*write_export(handle, fleet, days * PER_DAY, 1))
+        started = time.perf_counter()
+        incremental = ingest_polls(store, [export])
+        incremental_time = time.perf_counter() - started
+
+        # Compaction rewrites the export (new inode): the saved offset no longer applies
+        with open(export) as handle:
+            lines = handle.readlines()
+        with open(export + '.tmp', 'w') as handle:
+            handle.writelines(lines[len(lines) // 2:])
+            reference.ingest(*write_export(handle, fleet, days * PER_DAY + 1, 1))
+        os.replace(export + '.tmp', export)
+        started = time.perf_counter()
+        compacted = ingest_polls(store, [export])
+        compacted_time = time.perf_counter() - started
+        matches = matches and same_store(store, reference)
+
+    print(f"Collector export end to end: {len(store.catalog):,} interfaces x {days} day(s), "
+          f"{size / 2 ** 20:,.0f} MiB JSON lines")
+    print(f"  first ingest {first_time:.1f}s ({cycles} cycles, {size / 2 ** 20 / first_time:,.0f} MiB/s), "
+          f"idle re-run {idle_time * 1000:.1f} ms ({idle} cycles), next cycle {incremental_time * 1000:.0f} ms "
+          f"({incremental}), after compaction {compacted_time * 1000:.0f} ms ({compacted})")
+    print(f"  store matches direct ingest of the same counters: {matches}")
+    assert matches and (cycles, idle, incremental, compacted) == (days * PER_DAY, 0, 1, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vectorized interface utilization analytics')
+    parser.add_argument('--interfaces', type=int, default=100000, help='Interfaces in the fleet')
+    parser.add_argument('--days', type=int, default=7, help='Days of 5-minute polls')
+    parser.add_argument('--baseline-rows', type=int, default=2000, help='Rows for the nanpercentile baseline')
+    parser.add_argument('--export-interfaces', type=int, default=10000,
+                        help='Interfaces in the collector export run (0 to skip)')
+    parser.add_argument('--export-days', type=int, default=1, help='Days of polls in the collector export')
+    args = parser.parse_args()
+
+    fleet = Fleet(args.interfaces)
+    store = UtilizationStore(fleet.catalog, INTERVAL, args.days * PER_DAY)
+    rows = len(fleet.catalog)
+
+    generate_time = ingest_time = 0.0
+    errors, checked = [], 0
+    last_polled = None
+    sample = np.flatnonzero(~(fleet.catalog.narrow & (fleet.catalog.speed >= 1e9)))[::97]
+    for day in range(args.days):
+        started = time.perf_counter()
+        times, in_octets, out_octets, uptime, true_rates = fleet.block(day * PER_DAY, PER_DAY)
+        generate_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        store.ingest(times, in_octets, out_octets, uptime)
+        ingest_time += time.perf_counter() - started
+
+        # Decoded samples against the generated traffic, where both polls were taken
+        polled = times[fleet.catalog.device_index[sample]] > 0
+        before = polled[:, -1:]
+        steady = polled & np.concatenate([before if last_polled is None else last_polled, polled[:, :-1]], axis=1)
+        last_polled = before
+        stored = store.inbound[sample][:, day * PER_DAY:(day + 1) * PER_DAY]
+        usable = steady & (stored != INVALID)
+        decoded = stored * (fleet.catalog.full_scale[sample] / UNITS)[:, None]
+        error = np.abs(decoded - true_rates[0][sample]) / fleet.catalog.full_scale[sample][:, None]
+        errors.append(error[usable].max())
+        checked += int(usable.sum())
+
+    started = time.perf_counter()
+    limits = resolve_limits(fleet.catalog, POLICY_VARS)
+    result = analyze(store, limits, {'threshold_minor': 70, 'threshold_major': 85})
+    records = findings(store, result)
+    analyze_time = time.perf_counter() - started
+    summary = summarize(store, result)
+
+    baseline_rows = min(args.baseline_rows, rows)
+    baseline_time = percentile_baseline(store, baseline_rows, [50, 95, 99]) * rows / baseline_rows
+    samples = rows * store.count * 2
+
+    print("UTILIZATION ANALYTICS BENCHMARK")
+    print(f"Fleet: {rows:,} interfaces on {fleet.devices:,} devices, {store.count:,} polls "
+          f"({args.days} days x {PER_DAY}), {samples / 1e6:,.0f}M counter samples")
+    print(f"Store: {summary['store_mb']:,.0f} MiB uint16 ring "
+          f"(raw 64-bit counters: {samples * 8 / 2 ** 20:,.0f} MiB); generated in {generate_time:.1f}s")
+    print(f"Ingest (wrap/reset/gap handling, rate encode): {ingest_time:.1f}s, "
+          f"{samples / ingest_time / 1e6:,.0f}M samples/s")
+    print(f"  wraps {store.stats['wraps']:,}, resets {store.stats['resets']:,} "
+          f"({fleet.reboots} device reboots), missed polls {fleet.missed:,}")
+    print(f"  decoded vs generated rate: max error {max(errors) * 100:.4f}% of speed over {checked:,} samples")
+    print(f"Analyze (percentiles, mean/max, time at limit, daily trend, flags): {analyze_time:.1f}s, "
+          f"{samples / analyze_time / 1e6:,.0f}M samples/s")
+    print(f"np.nanpercentile + nanmean on float64 (extrapolated from {baseline_rows:,} rows): "
+          f"{baseline_time:.1f}s")
+    print(f"Flagged interfaces: {summary['flagged']:,} {summary['flags']}")
+    shown = set()
+    for name in ('major', 'at_limit', 'forecast_breach'):
+        record = next((r for r in records if name in r['flags'] and r['interface'] not in shown), None)
+        if record:
+            shown.add(record['interface'])
+            worst = max(('in', 'out'), key=lambda d: record[d]['utilization_pct'] or 0)
+            print(f"  {name}: {record['device']} {record['interface']} {worst} "
+                  f"p95 {record[worst]['p95_bps'] / 1e6:,.0f} Mbps of {record[worst]['limit_bps'] / 1e6:,.0f} "
+                  f"({record[worst]['utilization_pct']}%), at limit {record[worst]['time_at_limit']:.1%}, "
+                  f"breach in {record[worst]['days_to_breach']} days")
+    record = next((r for r in records if 'overcommitted' in r['flags']), None)
+    if record:
+        print(f"  overcommitted: {record['device']} {record['interface']} guarantees "
+              f"{record['committed_bps'] / 1e6:,.0f} Mbps under a {record['out']['limit_bps'] / 1e6:,.0f} Mbps shaper")
+    assert max(errors) < 2.0 / UNITS + 1e-4, 'decoded rates drifted from generated traffic'
+    assert all(summary['flags'][name] for name in ('at_limit', 'overcommitted', 'counter_too_narrow'))
+
+    if args.export_interfaces:
+        export_benchmark(args.export_interfaces, args.export_days)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+SNMP Interface Counter Collector
+Polls ifDescr, octet counters and speed from every device with the net-snmp
+command line tools and appends one JSON document per device poll to the counter
+export read by utilization_analytics.py. Run once per polling interval (cron).
+"""
+
+import os
+import json
+import time
+import fcntl
+import shutil
+import logging
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SYS_UPTIME = '.1.3.6.1.2.1.1.3.0'
+IF_DESCR = '.1.3.6.1.2.1.2.2.1.2'             # full CLI name on IOS (GigabitEthernet0/1)
+IF_NAME = '.1.3.6.1.2.1.31.1.1.1.1'           # short form (Gi0/1), only where ifDescr is missing
+IF_HC_IN_OCTETS = '.1.3.6.1.2.1.31.1.1.1.6'
+IF_HC_OUT_OCTETS = '.1.3.6.1.2.1.31.1.1.1.10'
+IF_HIGH_SPEED = '.1.3.6.1.2.1.31.1.1.1.15'    # Mbps
+IF_IN_OCTETS = '.1.3.6.1.2.1.2.2.1.10'
+IF_OUT_OCTETS = '.1.3.6.1.2.1.2.2.1.16'
+IF_SPEED = '.1.3.6.1.2.1.2.2.1.5'             # bps, saturates at 4294967295
+
+DEFAULT_SETTINGS = {
+    'version': '2c',
+    'community': 'public',
+    'timeout': 5,
+    'retries': 1,
+    'walk_timeout': 120,    # seconds for one whole table walk
+}
+
+
+# ----------------------------------------------------------------------
+# SNMP
+# ----------------------------------------------------------------------
+
+def _snmp(tool: str, host: str, oid: str, settings: Dict[str, Any]) -> List[str]:
+    """Run a net-snmp tool with numeric OIDs and bare values; returns output lines"""
+    command = [tool, '-v', str(settings['version']), '-c', str(settings['community']),
+               '-On', '-Oq', '-Ot', '-Oe', '-t', str(settings['timeout']), '-r', str(settings['retries']),
+               host, oid]
+    result = subprocess.run(command, capture_output=True, text=True, timeout=float(settings['walk_timeout']))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"{tool} exited with {result.returncode}")
+    return result.stdout.splitlines()
+
+
+def parse_walk(lines: List[str], base: str) -> Dict[int, str]:
+    """Map ifIndex -> value from `-On -Oq` walk output under a column OID"""
+    values = {}
+    prefix = base + '.'
+    for line in lines:
+        oid, _, value = line.strip().partition(' ')
+        if not oid.startswith(prefix) or value.startswith(('No Such', 'No more')):
+            continue
+        values[int(oid[len(prefix):])] = value.strip().strip('"')
+    return values
+
+
+def walk(host: str, base: str, settings: Dict[str, Any]) -> Dict[int, str]:
+    return parse_walk(_snmp('snmpbulkwalk', host, base, settings), base)
+
+
+def poll_device(device: Dict[str, Any], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """One poll document: {device, timestamp, sys_uptime} plus one column per counter field,
+    so the analytics side parses lists rather than a dict per interface"""
+    host = device.get('host') or device['name']
+    timestamp = int(time.time())
+    uptime = _snmp('snmpget', host, SYS_UPTIME, settings)
+    # Policy bindings use CLI names, which IOS reports as ifDescr rather than ifName
+    names = walk(host, IF_DESCR, settings)
+    if not names:
+        names = walk(host, IF_NAME, settings)
+    hc_in, hc_out = walk(host, IF_HC_IN_OCTETS, settings), walk(host, IF_HC_OUT_OCTETS, settings)
+    high_speed = walk(host, IF_HIGH_SPEED, settings)
+
+    # Agents without the ifXTable HC columns only get 32-bit counters
+    narrow = [index for index in names if index not in hc_in or index not in hc_out]
+    in_octets = out_octets = speed = {}
+    if narrow:
+        in_octets, out_octets = walk(host, IF_IN_OCTETS, settings), walk(host, IF_OUT_OCTETS, settings)
+        speed = walk(host, IF_SPEED, settings)
+
+    document = {
+        'device': device['name'],
+        'timestamp': timestamp,
+        'sys_uptime': int(uptime[0].split()[-1]) if uptime else None,
+        'names': [], 'in_octets': [], 'out_octets': [], 'speed_mbps': [], 'hc': [],
+    }
+    for index, name in names.items():
+        if index in hc_in and index in hc_out:
+            counters = (int(hc_in[index]), int(hc_out[index]), True)
+        elif index in in_octets and index in out_octets:
+            counters = (int(in_octets[index]), int(out_octets[index]), False)
+        else:
+            continue
+        if index in high_speed:
+            link = int(high_speed[index])
+        elif index in speed:
+            link = int(speed[index]) / 1e6
+        else:
+            link = None
+        document['names'].append(name)
+        document['in_octets'].append(counters[0])
+        document['out_octets'].append(counters[1])
+        document['hc'].append(counters[2])
+        document['speed_mbps'].append(link)
+    return document
+
+
+# ----------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------
+
+def compact(path: str, retention_days: float) -> int:
+    """Drop polls older than the retention window once the oldest is a day past it;
+    returns the number of polls dropped"""
+    cutoff = time.time() - retention_days * 86400
+    with open(path) as handle:
+        first = handle.readline()
+        if not first.strip() or json.loads(first)['timestamp'] >= cutoff - 86400:
+            return 0
+        handle.seek(0)
+        lines = [line for line in handle if line.strip()]
+    kept = [line for line in lines if json.loads(line)['timestamp'] >= cutoff]
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as handle:
+        handle.writelines(kept)
+    os.replace(temporary, path)
+    return len(lines) - len(kept)
+
+
+def collect(devices: List[Dict[str, Any]], settings: Dict[str, Any], output: str,
+            workers: int = 16, retention_days: Optional[float] = None) -> Dict[str, Any]:
+    """Poll every device concurrently and append the successful polls to the export"""
+    for tool in ('snmpget', 'snmpbulkwalk'):
+        if shutil.which(tool) is None:
+            raise RuntimeError(f"SNMP counter collection requires net-snmp ({tool} not found)")
+
+    def poll(device):
+        try:
+            return poll_device(device, settings)
+        except Exception as e:
+            logger.warning(f"SNMP poll of {device['name']} failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        polls = [p for p in pool.map(poll, devices) if p is not None]
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output + '.lock', 'w') as lock:
+        # Overlapping cron runs append one after the other
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        with open(output, 'a') as handle:
+            handle.writelines(json.dumps(p, separators=(',', ':')) + '\n' for p in polls)
+        if retention_days:
+            compact(output, retention_days)
+
+    return {
+        'devices': len(devices),
+        'polled': len(polls),
+        'failed': len(devices) - len(polls),
+        'interfaces': sum(len(p['names']) for p in polls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Append SNMP interface counter polls to a JSONL export')
+    parser.add_argument('--config', required=True,
+                        help='Collector JSON: {"devices": [{name, host}], "version", "community", "timeout"}')
+    parser.add_argument('--output', '-o', required=True, help='Counter export (JSON lines), appended')
+    parser.add_argument('--workers', '-w', type=int, default=16, help='Concurrent device polls')
+    parser.add_argument('--retention-days', type=float, help='Trim polls older than this from the export')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    with open(args.config) as handle:
+        config = json.load(handle)
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update({k: v for k, v in config.items() if k in DEFAULT_SETTINGS and v is not None})
+    devices = config.get('devices', [])
+
+    stats = collect(devices, settings, args.output, args.workers, args.retention_days)
+    logger.info(f"Polled {stats['polled']}/{stats['devices']} devices, {stats['interfaces']} interfaces")
+    print(json.dumps(stats))
+    if devices and not stats['polled']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
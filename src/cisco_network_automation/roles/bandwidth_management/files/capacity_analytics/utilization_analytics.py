@@ -0,0 +1,901 @@
+#!/usr/bin/env python3
+"""
+Interface Utilization Analytics
+Turns SNMP interface octet counters (the interface_stats source of the data
+pipeline) into utilization and capacity findings. Each interface keeps a ring of
+uint16 samples scaled to its link speed, so a week of 5-minute polls for 100k
+interfaces takes ~800 MB for both directions instead of 3.2 GB of raw 64-bit
+counters. Counter wrap, device resets, rates, percentiles, daily trends and
+headroom against the role's shaping, policing and bandwidth allocation are
+computed in vectorized passes over blocks of interfaces.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import argparse
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Stored samples are fractions of each interface's full-scale rate (its link speed)
+UNITS = 50000                          # 1.0 x full scale
+INVALID = np.iinfo(np.uint16).max      # gap, reset or implausible delta
+DEFAULT_FULL_SCALE = 10e9              # interfaces reporting no speed
+SPEED_TOLERANCE = 1.05                 # faster than speed x tolerance is a counter glitch
+COUNTER_32 = 2 ** 32
+
+FLAGS = {
+    'minor': 1,                # headroom percentile above bandwidth_threshold_minor of the ceiling
+    'major': 2,                # headroom percentile above bandwidth_threshold_major of the ceiling
+    'at_limit': 4,             # sustained time at the shaper, policer or link ceiling
+    'forecast_breach': 8,      # daily trend reaches the major threshold within the horizon
+    'overcommitted': 16,       # bandwidth/priority guarantees exceed the output ceiling
+    'counter_too_narrow': 32,  # 32-bit counter can wrap more than once between polls
+    'low_coverage': 64,        # fewer than half of the polls produced a usable rate
+}
+
+DEFAULT_SETTINGS = {
+    'interval': 300,
+    'retention_days': 7,
+    'percentiles': [50, 95, 99],
+    'headroom_percentile': 95,
+    'threshold_minor': 70,
+    'threshold_major': 85,
+    'at_limit_ratio': 0.95,
+    'at_limit_fraction': 0.01,
+    'horizon_days': 30,
+    'max_gap_polls': 3,
+    'chunk_rows': 4096,
+}
+
+OUTPUT_BINDINGS = ('shaping_interface_bindings', 'bandwidth_interface_bindings')
+INPUT_BINDINGS = ('policing_interface_bindings',)
+
+RATE_PATTERN = re.compile(r'^\s*([\d.]+)\s*([kmg]?)(?:bps)?\s*$', re.IGNORECASE)
+RATE_SCALE = {'': 1.0, 'k': 1e3, 'm': 1e6, 'g': 1e9}
+
+# IOS/NX-OS short interface types (SNMP ifName, hand-written bindings) -> full names (ifDescr, CLI)
+INTERFACE_TYPES = {
+    'gi': 'GigabitEthernet', 'te': 'TenGigabitEthernet', 'fa': 'FastEthernet', 'fo': 'FortyGigabitEthernet',
+    'hu': 'HundredGigE', 'twe': 'TwentyFiveGigE', 'tw': 'TwoGigabitEthernet', 'fi': 'FiveGigabitEthernet',
+    'ap': 'AppGigabitEthernet', 'e': 'Ethernet', 'et': 'Ethernet', 'eth': 'Ethernet', 'po': 'Port-channel',
+    'lo': 'Loopback', 'vl': 'Vlan', 'tu': 'Tunnel', 'se': 'Serial',
+}
+INTERFACE_NAME_PATTERN = re.compile(r'^([A-Za-z][A-Za-z-]*?)\s*(\d[\d/.:]*)$')
+_FULL_TYPES = {name.lower(): name for name in INTERFACE_TYPES.values()}
+
+
+def parse_rate(value: Any) -> float:
+    """Rates in the role vars are bps; '500m' style strings are accepted too"""
+    if value is None or value == '':
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = RATE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"Unrecognised rate: {value!r}")
+    return float(match.group(1)) * RATE_SCALE[match.group(2).lower()]
+
+
+def canonical_interface(name: str) -> str:
+    """Full interface name for a short or differently cased one: Gi0/1 -> GigabitEthernet0/1"""
+    match = INTERFACE_NAME_PATTERN.match(name.strip())
+    if not match:
+        return name
+    kind = match.group(1).lower()
+    full = INTERFACE_TYPES.get(kind) or _FULL_TYPES.get(kind)
+    return full + match.group(2) if full else name
+
+
+# ----------------------------------------------------------------------
+# Interfaces and policy ceilings
+# ----------------------------------------------------------------------
+
+class InterfaceCatalog:
+    """Dense row ids for (device, interface) with link speed and counter width"""
+
+    def __init__(self):
+        self.devices: List[str] = []
+        self.device_ids: Dict[str, int] = {}
+        self.rows: List[Tuple[str, str]] = []
+        self.row_ids: Dict[Tuple[str, str], int] = {}
+        self._device: List[int] = []
+        self._speed: List[float] = []
+        self._bits: List[int] = []
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, device: str, interface: str, speed_bps: float = 0.0, counter_bits: int = 64) -> int:
+        """Intern an interface; a later poll may update its speed or counter width"""
+        row = self.row_ids.get((device, interface))
+        if row is None:
+            device_id = self.device_ids.get(device)
+            if device_id is None:
+                device_id = self.device_ids[device] = len(self.devices)
+                self.devices.append(device)
+            row = self.row_ids[(device, interface)] = len(self.rows)
+            self.rows.append((device, interface))
+            self._device.append(device_id)
+            self._speed.append(float(speed_bps))
+            self._bits.append(int(counter_bits))
+            self._arrays = None
+        elif (self._speed[row], self._bits[row]) != (float(speed_bps), int(counter_bits)):
+            self._speed[row] = float(speed_bps)
+            self._bits[row] = int(counter_bits)
+            self._arrays = None
+        return row
+
+    def _array(self, name: str) -> np.ndarray:
+        if self._arrays is None:
+            speed = np.array(self._speed, dtype=np.float64)
+            self._arrays = {
+                'device_index': np.array(self._device, dtype=np.int64),
+                'speed': speed,
+                'narrow': np.array(self._bits, dtype=np.int64) == 32,
+                'full_scale': np.where(speed > 0, speed, DEFAULT_FULL_SCALE),
+            }
+        return self._arrays[name]
+
+    @property
+    def device_index(self) -> np.ndarray:
+        return self._array('device_index')
+
+    @property
+    def speed(self) -> np.ndarray:
+        return self._array('speed')
+
+    @property
+    def narrow(self) -> np.ndarray:
+        """True for interfaces polled through 32-bit ifIn/OutOctets"""
+        return self._array('narrow')
+
+    @property
+    def full_scale(self) -> np.ndarray:
+        return self._array('full_scale')
+
+    def rows_named(self) -> Dict[str, List[int]]:
+        """Rows by canonical interface name"""
+        named: Dict[str, List[int]] = defaultdict(list)
+        for row, (_, interface) in enumerate(self.rows):
+            named[canonical_interface(interface)].append(row)
+        return named
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'rows': [[d, i, s, b] for (d, i), s, b in zip(self.rows, self._speed, self._bits)]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'InterfaceCatalog':
+        catalog = cls()
+        for device, interface, speed, bits in data.get('rows', []):
+            catalog.add(device, interface, speed, bits)
+        return catalog
+
+
+def _reservation(value: Any) -> Tuple[float, float]:
+    """(bps, percent) reserved by a `bandwidth`/`priority` argument given in kbps or percent"""
+    text = str(value).strip().lower()
+    if text.startswith('remaining'):
+        # A share of what is left over reserves nothing
+        return 0.0, 0.0
+    if text.startswith('percent'):
+        return 0.0, float(text.split()[-1])
+    return float(text.split()[0]) * 1000, 0.0
+
+
+def resolve_limits(catalog: InterfaceCatalog, policy_vars: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Per-interface ceilings and guarantees from the bandwidth_management variables.
+
+    Output ceiling: the parent shaper of a hierarchical policy, otherwise the sum of
+    the policy's `shape average` rates. Input ceiling: the sum of the bound policy's
+    policer rates/CIRs. Guarantees: `bandwidth` and `priority` reservations of the
+    bound output policy and its child policy. Bindings apply to every device with
+    that interface name (short or full form) unless they carry a `device` key.
+    """
+    shaped: Dict[str, float] = defaultdict(float)
+    for item in policy_vars.get('shaping_policies') or []:
+        shaped[item['policy_name']] += parse_rate(item.get('average_rate'))
+    children: Dict[str, List[str]] = defaultdict(list)
+    for item in policy_vars.get('hierarchical_shaping') or []:
+        shaped[item['parent_policy']] = parse_rate(item.get('total_bandwidth'))
+        children[item['parent_policy']].append(item.get('child_policy'))
+
+    policed: Dict[str, float] = defaultdict(float)
+    for key, field in (('single_rate_policers', 'rate'), ('dual_rate_policers', 'cir'), ('dscp_policers', 'rate')):
+        for item in policy_vars.get(key) or []:
+            policed[item['policy_name']] += parse_rate(item.get(field))
+
+    reserved_bps: Dict[str, float] = defaultdict(float)
+    reserved_percent: Dict[str, float] = defaultdict(float)
+    for item in policy_vars.get('bandwidth_allocation_policies') or []:
+        bps, percent = _reservation(f"{item.get('bandwidth_type', '')} {item.get('bandwidth_value')}".strip())
+        reserved_bps[item['policy_name']] += bps
+        reserved_percent[item['policy_name']] += percent
+    for item in policy_vars.get('priority_queue_policies') or []:
+        bps, percent = _reservation(item.get('priority_bandwidth'))
+        reserved_bps[item['policy_name']] += bps
+        reserved_percent[item['policy_name']] += percent
+
+    rows = len(catalog)
+    speed = np.where(catalog.speed > 0, catalog.speed, np.inf)
+    out_policy = np.full(rows, np.inf)
+    in_policy = np.full(rows, np.inf)
+    committed = np.zeros(rows)
+    named = catalog.rows_named()
+
+    def bound_rows(item: Dict[str, Any]) -> np.ndarray:
+        selected = named.get(canonical_interface(str(item.get('interface', ''))), [])
+        if item.get('device'):
+            selected = [r for r in selected if catalog.rows[r][0] == item['device']]
+        if rows and not selected:
+            where = f" on {item['device']}" if item.get('device') else ''
+            logger.warning(f"Binding of {item.get('policy_name')} to {item.get('interface')}{where} "
+                           f"matches no polled interface")
+        return np.array(selected, dtype=np.int64)
+
+    for key in OUTPUT_BINDINGS:
+        for item in policy_vars.get(key) or []:
+            selected, policy = bound_rows(item), item.get('policy_name')
+            if not len(selected):
+                continue
+            if policy in shaped:
+                out_policy[selected] = np.minimum(out_policy[selected], shaped[policy])
+            base = np.minimum(speed[selected], shaped.get(policy, np.inf))
+            for name in [policy] + children.get(policy, []):
+                committed[selected] += reserved_bps.get(name, 0.0)
+                if reserved_percent.get(name):
+                    committed[selected] += np.where(np.isfinite(base), base, 0.0) * reserved_percent[name] / 100
+    for key in INPUT_BINDINGS:
+        for item in policy_vars.get(key) or []:
+            selected, policy = bound_rows(item), item.get('policy_name')
+            if len(selected) and policy in policed:
+                in_policy[selected] = np.minimum(in_policy[selected], policed[policy])
+
+    return {
+        'in_limit': np.minimum(speed, in_policy),
+        'out_limit': np.minimum(speed, out_policy),
+        'committed': committed,
+    }
+
+
+# ----------------------------------------------------------------------
+# Counter store
+# ----------------------------------------------------------------------
+
+def _deltas(counters: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """Counter differences modulo 2**64, the first column against the carried state"""
+    delta = np.empty_like(counters)
+    np.subtract(counters[:, 1:], counters[:, :-1], out=delta[:, 1:])
+    delta[:, 0] = counters[:, 0] - last
+    return delta
+
+
+class UtilizationStore:
+    """Ring of per-interface utilization samples plus the counter state between polls"""
+
+    def __init__(self, catalog: InterfaceCatalog, interval: int = 300, capacity: int = 2016,
+                 max_gap_polls: int = 3):
+        self.catalog = catalog
+        self.interval = int(interval)
+        self.capacity = int(capacity)
+        self.max_gap = self.interval * max_gap_polls
+        self.head = 0
+        self.count = 0
+        self.slot_time = np.zeros(self.capacity, dtype=np.int64)
+        self.inbound = np.full((0, self.capacity), INVALID, dtype=np.uint16)
+        self.outbound = np.full((0, self.capacity), INVALID, dtype=np.uint16)
+        self.last_in = np.zeros(0, dtype=np.uint64)
+        self.last_out = np.zeros(0, dtype=np.uint64)
+        self.last_time = np.zeros(0, dtype=np.int64)
+        self.last_uptime = np.zeros(0, dtype=np.float64)
+        self.wraps = np.zeros(0, dtype=np.int64)
+        self.resets = np.zeros(0, dtype=np.int64)
+        self.stats = {'polls': 0, 'samples': 0, 'usable': 0, 'wraps': 0, 'resets': 0}
+        # Collector export read positions: {path: {"inode": ..., "offset": ...}}
+        self.sources: Dict[str, Dict[str, int]] = {}
+        self._grow()
+
+    @property
+    def last_cycle(self) -> int:
+        """Timestamp of the newest stored poll cycle (0 when empty)"""
+        return int(self.slot_time[(self.head - 1) % self.capacity]) if self.count else 0
+
+    def _grow(self) -> None:
+        """Extend per-row arrays after new interfaces were added to the catalog"""
+        extra = len(self.catalog) - len(self.last_time)
+        if extra <= 0:
+            return
+        padding = np.full((extra, self.capacity), INVALID, dtype=np.uint16)
+        self.inbound = np.concatenate([self.inbound, padding])
+        self.outbound = np.concatenate([self.outbound, padding])
+        for name in ('last_in', 'last_out', 'last_time', 'last_uptime', 'wraps', 'resets'):
+            current = getattr(self, name)
+            setattr(self, name, np.concatenate([current, np.zeros(extra, dtype=current.dtype)]))
+
+    def filled_slots(self) -> np.ndarray:
+        """Ring positions holding samples, oldest first"""
+        return (self.head - self.count + np.arange(self.count)) % self.capacity
+
+    def ingest(self, times: np.ndarray, in_octets: np.ndarray, out_octets: np.ndarray,
+               uptime: Optional[np.ndarray] = None, present: Optional[np.ndarray] = None) -> int:
+        """Append k poll cycles and return k.
+
+        times:     (devices, k) poll timestamps, 0 where the device was not polled
+        *_octets:  (interfaces, k) ifHCIn/OutOctets, or ifIn/OutOctets on 32-bit rows
+        uptime:    (devices, k) sysUpTime in seconds, tells reboots from counter wraps
+        present:   (interfaces, k) False where an interface was missing from its poll
+        """
+        self._grow()
+        catalog = self.catalog
+        device_index = catalog.device_index
+        times = np.asarray(times, dtype=np.int64)
+        k = times.shape[1]
+        if uptime is None:
+            uptime = np.zeros(times.shape)
+        scale = 8.0 * UNITS / catalog.full_scale
+
+        # Poll spacing and reboots are per device: one small pass, then one gather to rows
+        elapsed = np.zeros(times.shape)
+        elapsed[:, 1:] = times[:, 1:] - times[:, :-1]
+        usable = (times > 0) & (elapsed > 0) & (elapsed <= self.max_gap)
+        usable[:, 1:] &= times[:, :-1] > 0
+        rebooted = np.zeros(times.shape, dtype=bool)
+        rebooted[:, 1:] = (uptime[:, 1:] > 0) & ((uptime[:, 1:] < uptime[:, :-1]) | (uptime[:, 1:] < elapsed[:, 1:]))
+        rebooted &= usable
+        with np.errstate(divide='ignore'):
+            inverse = np.where(usable & ~rebooted, 1.0 / elapsed, np.nan).astype(np.float32)
+        factor = inverse[device_index]
+        factor *= scale.astype(np.float32)[:, None]
+        reboots = np.count_nonzero(rebooted, axis=1)[device_index]
+
+        # The first column continues from each row's carried state
+        factor[:, 0], first_rebooted = self._factor(
+            times[device_index, 0], uptime[device_index, 0], self.last_time, self.last_uptime, scale)
+        reboots += first_rebooted
+
+        deltas = [_deltas(in_octets, self.last_in), _deltas(out_octets, self.last_out)]
+        missing = (times <= 0)[device_index]
+        if present is not None:
+            missing |= ~present
+        last_time, last_uptime = times[device_index, -1], uptime[device_index, -1]
+        if missing.any():
+            last_time, last_uptime = self._bridge(missing, times, uptime, usable, factor, deltas, scale, reboots)
+
+        # Latest polled counters per row, recovered across a trailing gap
+        gone = missing[:, -1]
+        self.last_in = np.where(gone, in_octets[:, -1] - deltas[0][:, -1], in_octets[:, -1])
+        self.last_out = np.where(gone, out_octets[:, -1] - deltas[1][:, -1], out_octets[:, -1])
+
+        skipped = np.count_nonzero(np.isnan(factor), axis=1)
+        inbound, in_wraps, in_resets = self._encode(deltas[0], factor, in_octets, skipped)
+        outbound, out_wraps, out_resets = self._encode(deltas[1], factor, out_octets, skipped)
+        self.last_time, self.last_uptime = last_time, last_uptime
+
+        kept = min(k, self.capacity)
+        first = (self.head + k - kept) % self.capacity
+        if first + kept <= self.capacity:
+            slots = slice(first, first + kept)
+        else:
+            slots = (first + np.arange(kept)) % self.capacity
+        self.inbound[:, slots] = inbound[:, k - kept:]
+        self.outbound[:, slots] = outbound[:, k - kept:]
+        self.slot_time[slots] = times.max(axis=0)[k - kept:]
+        self.head = (self.head + k) % self.capacity
+        self.count = min(self.count + k, self.capacity)
+
+        wraps = in_wraps + out_wraps
+        resets = in_resets + out_resets + 2 * reboots
+        self.wraps += wraps
+        self.resets += resets
+        self.stats['polls'] += k
+        self.stats['samples'] += 2 * (missing.size - int(np.count_nonzero(missing)))
+        self.stats['usable'] += int(np.count_nonzero(inbound != INVALID) + np.count_nonzero(outbound != INVALID))
+        self.stats['wraps'] += int(wraps.sum())
+        self.stats['resets'] += int(resets.sum())
+        return k
+
+    def _factor(self, now: np.ndarray, now_uptime: np.ndarray, then: np.ndarray, then_uptime: np.ndarray,
+                scale: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Octets -> units multiplier between two polls of the same rows (NaN when
+        unusable), and whether the device rebooted in between"""
+        elapsed = (now - then).astype(np.float64)
+        usable = (now > 0) & (then > 0) & (elapsed > 0) & (elapsed <= self.max_gap)
+        rebooted = usable & (now_uptime > 0) & ((now_uptime < then_uptime) | (now_uptime < elapsed))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(usable & ~rebooted, scale / elapsed, np.nan), rebooted
+
+    def _bridge(self, missing: np.ndarray, times: np.ndarray, uptime: np.ndarray, usable: np.ndarray,
+                factor: np.ndarray, deltas: List[np.ndarray], scale: np.ndarray,
+                reboots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Carry counter deltas and poll spacing across polls a row missed, so the next
+        poll yields the average rate over the gap. Returns each row's latest polled time
+        and uptime. Missed polls are sparse: this walks their columns, not the block."""
+        device_index = self.catalog.device_index
+        k = times.shape[1]
+        rows, columns = np.nonzero(missing)
+        order = np.argsort(columns, kind='stable')
+        rows, columns = rows[order], columns[order]
+        bounds = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1], True])
+
+        # Latest polled (time, uptime) per row for rows currently inside a gap
+        carry_column = np.full(len(missing), -1, dtype=np.int64)
+        carry_time = self.last_time.copy()
+        carry_uptime = self.last_uptime.copy()
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            column, selected = int(columns[start]), rows[start:stop]
+            devices = device_index[selected]
+            inside = carry_column[selected] == column
+            if column:
+                then = np.where(inside, carry_time[selected], times[devices, column - 1])
+                then_uptime = np.where(inside, carry_uptime[selected], uptime[devices, column - 1])
+            else:
+                then, then_uptime = carry_time[selected], carry_uptime[selected]
+            carry_column[selected] = column + 1
+            carry_time[selected] = then
+            carry_uptime[selected] = then_uptime
+            if column + 1 < k:
+                for delta in deltas:
+                    delta[selected, column + 1] += delta[selected, column]
+                factor[selected, column + 1], rebooted = self._factor(
+                    times[devices, column + 1], uptime[devices, column + 1], then, then_uptime, scale[selected])
+                # Reboots the device-level pass could not see across the gap
+                reboots[selected] += rebooted & ~usable[devices, column + 1]
+        factor[missing] = np.nan
+
+        gone = missing[:, -1]
+        last_time = np.where(gone, carry_time, times[device_index, -1])
+        last_uptime = np.where(gone, carry_uptime, uptime[device_index, -1])
+        return last_time, last_uptime
+
+    def _encode(self, delta: np.ndarray, factor: np.ndarray, counters: np.ndarray,
+                skipped: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Encode the rate of each interval as uint16 full-scale units"""
+        wraps = np.zeros(len(delta), dtype=np.int64)
+        narrow = np.flatnonzero(self.catalog.narrow)
+        wrapped = None
+        if len(narrow):
+            # A 32-bit counter that went down wrapped once, unless the implied rate is impossible
+            sub = delta[narrow]
+            wrapped = sub > counters[narrow]
+            np.add(sub, np.uint64(COUNTER_32), out=sub, where=wrapped)
+            delta[narrow] = sub
+
+        # A 64-bit counter that went down (reset) leaves a ~2**64 delta, far beyond the tolerance
+        units = delta.astype(np.float32)
+        units *= factor
+        plausible = units <= SPEED_TOLERANCE * UNITS
+        resets = delta.shape[1] - np.count_nonzero(plausible, axis=1) - skipped
+        units += 0.5
+        np.copyto(units, INVALID, where=~plausible)
+        if wrapped is not None:
+            wraps[narrow] = np.count_nonzero(wrapped & plausible[narrow], axis=1)
+        return units.astype(np.uint16), wraps, resets
+
+    def save(self, path: str) -> None:
+        temporary = f"{path}.tmp.npz"
+        np.savez(
+            temporary,
+            catalog=np.array(json.dumps(self.catalog.to_dict())),
+            sources=np.array(json.dumps(self.sources)),
+            meta=np.array([self.interval, self.capacity, self.max_gap, self.head, self.count], dtype=np.int64),
+            slot_time=self.slot_time, inbound=self.inbound, outbound=self.outbound,
+            last_in=self.last_in, last_out=self.last_out, last_time=self.last_time,
+            last_uptime=self.last_uptime, wraps=self.wraps, resets=self.resets,
+        )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'UtilizationStore':
+        with np.load(path) as data:
+            catalog = InterfaceCatalog.from_dict(json.loads(str(data['catalog'])))
+            interval, capacity, max_gap, head, count = (int(v) for v in data['meta'])
+            store = cls(InterfaceCatalog(), interval, capacity)
+            store.catalog, store.max_gap, store.head, store.count = catalog, max_gap, head, count
+            for name in ('slot_time', 'inbound', 'outbound', 'last_in', 'last_out', 'last_time',
+                         'last_uptime', 'wraps', 'resets'):
+                setattr(store, name, data[name])
+            if 'sources' in data.files:
+                store.sources = json.loads(str(data['sources']))
+        return store
+
+
+# ----------------------------------------------------------------------
+# Analytics
+# ----------------------------------------------------------------------
+
+def _ranked(ordered: np.ndarray, counts: np.ndarray, percentile: float) -> np.ndarray:
+    """Linear-interpolated percentile of the first `counts` values of each sorted row
+    (INVALID sorts last, so the usable samples are a prefix)"""
+    position = percentile / 100.0 * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+    low = np.take_along_axis(ordered, lower[..., None], -1)[..., 0].astype(np.float64)
+    high = np.take_along_axis(ordered, upper[..., None], -1)[..., 0].astype(np.float64)
+    value = low + (high - low) * (position - lower)
+    return np.where(counts > 0, value, np.nan)
+
+
+def _columns(block: np.ndarray, slots: np.ndarray) -> np.ndarray:
+    """C-contiguous copy of the given ring columns (a slice copy when they are consecutive)"""
+    if len(slots) and slots[-1] - slots[0] == len(slots) - 1:
+        return block[:, slots[0]:slots[-1] + 1].copy()
+    return np.take(block, slots, axis=1)
+
+
+def _trend(daily: np.ndarray, usable: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Least-squares slope per day and fitted value on the last day, per row"""
+    weight = usable.astype(np.float64)
+    day = np.arange(daily.shape[1], dtype=np.float64)
+    values = np.where(usable, daily, 0.0)
+    n = weight.sum(1)
+    sx, sy = weight @ day, values.sum(1)
+    sxx, sxy = weight @ (day * day), values @ day
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        intercept = (sy - slope * sx) / n
+    slope = np.where(n >= 3, slope, np.nan)
+    return slope, intercept + slope * day[-1]
+
+
+def analyze(store: UtilizationStore, limits: Dict[str, np.ndarray],
+            settings: Optional[Dict[str, Any]] = None) -> Dict[str, np.ndarray]:
+    """Per-interface rates, percentiles, headroom, trend and breach flags"""
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    percentiles = sorted(set(settings['percentiles']) | {settings['headroom_percentile']})
+    rows = len(store.catalog)
+    full_scale = store.catalog.full_scale
+    scale = full_scale / UNITS
+
+    filled = store.filled_slots()
+    whole = store.count == store.capacity
+    per_day = max(86400 // store.interval, 1)
+    days = store.count // per_day
+    daily_slots = filled[len(filled) - days * per_day:]
+
+    result: Dict[str, np.ndarray] = {}
+    for direction in ('in', 'out'):
+        for name in ['mean', 'max', 'time_at_limit', 'trend', 'fitted'] + \
+                [f"p{p:g}" for p in percentiles]:
+            result[f"{direction}_{name}"] = np.full(rows, np.nan)
+    usable_samples = np.zeros((2, rows), dtype=np.int64)
+
+    chunk = int(settings['chunk_rows'])
+    for start in range(0, rows, chunk):
+        stop = min(start + chunk, rows)
+        block_scale = scale[start:stop]
+        for side, (direction, data) in enumerate((('in', store.inbound), ('out', store.outbound))):
+            samples = data[start:stop] if whole else _columns(data[start:stop], filled)
+            ordered = np.sort(samples, axis=1)
+            counts = (ordered != INVALID).sum(axis=1)
+            usable_samples[side, start:stop] = counts
+            if not samples.shape[1]:
+                continue
+
+            invalid = samples.shape[1] - counts
+            total = samples.sum(axis=1, dtype=np.int64) - invalid * int(INVALID)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[f"{direction}_mean"][start:stop] = total / counts * block_scale
+            peak = np.take_along_axis(ordered, np.maximum(counts - 1, 0)[:, None], 1)[:, 0]
+            result[f"{direction}_max"][start:stop] = np.where(counts > 0, peak * block_scale, np.nan)
+            for p in percentiles:
+                result[f"{direction}_p{p:g}"][start:stop] = _ranked(ordered, counts, p) * block_scale
+
+            # Time spent at the ceiling: the shaper is queueing or the policer dropping
+            ceiling = limits[f"{direction}_limit"][start:stop] * settings['at_limit_ratio'] / block_scale
+            threshold = np.minimum(np.ceil(ceiling), INVALID).astype(np.uint16)[:, None]
+            at_limit = (samples >= threshold).sum(axis=1) - invalid
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[f"{direction}_time_at_limit"][start:stop] = at_limit / counts
+
+            # Trend of the daily headroom percentile across whole days in the ring
+            if days >= 3:
+                by_day = _columns(data[start:stop], daily_slots).reshape(stop - start, days, per_day)
+                by_day.sort(axis=2)
+                day_counts = (by_day != INVALID).sum(axis=2)
+                daily = _ranked(by_day, day_counts, settings['headroom_percentile']) * block_scale[:, None]
+                slope, current = _trend(daily, day_counts >= per_day // 2)
+                result[f"{direction}_trend"][start:stop] = slope
+                result[f"{direction}_fitted"][start:stop] = current
+
+    # Headroom and flags in whole-array passes
+    flags = np.zeros(rows, dtype=np.int64)
+    headroom_key = f"p{settings['headroom_percentile']:g}"
+    major = minor = np.zeros(rows, dtype=bool)
+    for direction in ('in', 'out'):
+        limit = limits[f"{direction}_limit"]
+        level = limit * settings['threshold_major'] / 100
+        value = result[f"{direction}_{headroom_key}"]
+        trend, current = result[f"{direction}_trend"], result.pop(f"{direction}_fitted")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            utilization = np.where(np.isfinite(limit), value / limit * 100, np.nan)
+            days_to_breach = np.where(current >= level, 0.0, np.where(trend > 0, (level - current) / trend, np.inf))
+        days_to_breach[~np.isfinite(limit) | np.isnan(current)] = np.inf
+        result[f"{direction}_projected"] = current + trend * settings['horizon_days']
+        result[f"{direction}_limit"] = limit
+        result[f"{direction}_headroom"] = limit - value
+        result[f"{direction}_utilization"] = utilization
+        result[f"{direction}_days_to_breach"] = days_to_breach
+        major = major | (utilization >= settings['threshold_major'])
+        minor = minor | (utilization >= settings['threshold_minor'])
+        flags |= np.where(result[f"{direction}_time_at_limit"] >= settings['at_limit_fraction'], FLAGS['at_limit'], 0)
+        flags |= np.where((days_to_breach > 0) & (days_to_breach <= settings['horizon_days']),
+                          FLAGS['forecast_breach'], 0)
+
+    flags |= np.where(major, FLAGS['major'], np.where(minor, FLAGS['minor'], 0))
+    flags |= np.where(limits['committed'] > limits['out_limit'] * 1.0001, FLAGS['overcommitted'], 0)
+    narrow_wraps = store.catalog.narrow & (store.catalog.speed * store.interval / 8 >= COUNTER_32)
+    flags |= np.where(narrow_wraps, FLAGS['counter_too_narrow'], 0)
+    coverage = usable_samples.min(axis=0) / max(store.count, 1)
+    flags |= np.where(coverage < 0.5, FLAGS['low_coverage'], 0)
+
+    result.update({
+        'speed': store.catalog.speed,
+        'committed': limits['committed'],
+        'coverage': coverage,
+        'wraps': store.wraps,
+        'resets': store.resets,
+        'flags': flags,
+    })
+    return result
+
+
+def flag_names(value: int) -> List[str]:
+    return [name for name, bit in FLAGS.items() if value & bit]
+
+
+def findings(store: UtilizationStore, result: Dict[str, np.ndarray],
+             settings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """One record per flagged interface, most urgent first"""
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    headroom_key = f"p{settings['headroom_percentile']:g}"
+
+    def number(value: float, digits: int = 0) -> Optional[float]:
+        return None if not np.isfinite(value) else round(float(value), digits)
+
+    records = []
+    for row in np.flatnonzero(result['flags']).tolist():
+        device, interface = store.catalog.rows[row]
+        record = {
+            'device': device,
+            'interface': interface,
+            'flags': flag_names(int(result['flags'][row])),
+            'speed_bps': number(result['speed'][row]),
+            'committed_bps': number(result['committed'][row]),
+            'coverage': number(result['coverage'][row], 3),
+            'wraps': int(result['wraps'][row]),
+            'resets': int(result['resets'][row]),
+        }
+        for direction in ('in', 'out'):
+            record[direction] = {
+                'limit_bps': number(result[f"{direction}_limit"][row]),
+                f"{headroom_key}_bps": number(result[f"{direction}_{headroom_key}"][row]),
+                'max_bps': number(result[f"{direction}_max"][row]),
+                'utilization_pct': number(result[f"{direction}_utilization"][row], 1),
+                'headroom_bps': number(result[f"{direction}_headroom"][row]),
+                'time_at_limit': number(result[f"{direction}_time_at_limit"][row], 4),
+                'trend_bps_per_day': number(result[f"{direction}_trend"][row]),
+                'days_to_breach': number(result[f"{direction}_days_to_breach"][row], 1),
+            }
+        records.append(record)
+
+    def urgency(record: Dict[str, Any]) -> Tuple[int, float, float]:
+        breach = min(record[d]['days_to_breach'] if record[d]['days_to_breach'] is not None else np.inf
+                     for d in ('in', 'out'))
+        utilization = max(record[d]['utilization_pct'] or 0 for d in ('in', 'out'))
+        return ('major' not in record['flags'], breach, -utilization)
+
+    return sorted(records, key=urgency)
+
+
+def summarize(store: UtilizationStore, result: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    flags = result['flags']
+    return {
+        'interfaces': len(store.catalog),
+        'devices': len(store.catalog.devices),
+        'polls_stored': store.count,
+        'window_hours': round(store.count * store.interval / 3600, 1),
+        'flagged': int(np.count_nonzero(flags)),
+        'flags': {name: int(np.count_nonzero(flags & bit)) for name, bit in FLAGS.items()},
+        'wraps': int(result['wraps'].sum()),
+        'resets': int(result['resets'].sum()),
+        'store_mb': round((store.inbound.nbytes + store.outbound.nbytes) / 2 ** 20, 1),
+    }
+
+
+# ----------------------------------------------------------------------
+# Collector exports
+# ----------------------------------------------------------------------
+
+def _poll_columns(poll: Dict[str, Any]) -> Tuple[List[str], List[int], List[int], List[Any], List[Any]]:
+    """(names, in_octets, out_octets, speed_mbps, hc) of one poll document"""
+    names = poll.get('names')
+    if names is not None:
+        return (names, poll['in_octets'], poll['out_octets'],
+                poll.get('speed_mbps') or [None] * len(names), poll.get('hc') or [True] * len(names))
+    # Exports written before the columnar layout: {"interfaces": {name: {counters}}}
+    interfaces = poll.get('interfaces') or {}
+    counters = list(interfaces.values())
+    return (list(interfaces), [c['in_octets'] for c in counters], [c['out_octets'] for c in counters],
+            [c.get('speed_mbps') for c in counters], [c.get('hc', True) for c in counters])
+
+
+def _export_start(handle, source: Optional[Dict[str, int]], since: int, slack: int) -> int:
+    """Byte offset to resume an export from: the saved position while the file is the
+    same one, otherwise (compacted or new) the first poll near `since`"""
+    stat = os.fstat(handle.fileno())
+    if source and source.get('inode') == stat.st_ino and source.get('offset', 0) <= stat.st_size:
+        return source['offset']
+    if since <= 0:
+        return 0
+
+    # Polls are appended in time order: bisect on the timestamp of the first whole line
+    low, high = 0, stat.st_size
+    while high - low > 65536:
+        middle = (low + high) // 2
+        handle.seek(middle)
+        handle.readline()
+        line = handle.readline()
+        if line.strip() and line.endswith(b'\n') and json.loads(line)['timestamp'] < since - slack:
+            low = middle
+        else:
+            high = middle
+    handle.seek(low)
+    if low:
+        handle.readline()
+    return handle.tell()
+
+
+def ingest_polls(store: UtilizationStore, paths: Iterable[str], block_cycles: int = 288) -> int:
+    """Ingest SNMP collector exports: one JSON document per device poll,
+
+    {"device": ..., "timestamp": ..., "sys_uptime": <TimeTicks>,
+     "names": [...], "in_octets": [...], "out_octets": [...], "speed_mbps": [...], "hc": [...]}
+
+    Polls are bucketed into cycles of the store interval. Each export is read from
+    the offset recorded in the store on the last run (a compacted export is searched
+    by timestamp), and cycles already stored are skipped, so re-reading an export is
+    cheap and harmless. Returns the cycles ingested.
+    """
+    catalog = store.catalog
+    cycles: Dict[int, List[Tuple[str, int, float, np.ndarray, np.ndarray, np.ndarray]]] = defaultdict(list)
+    # Interface layout per device as of its last poll: (names, speeds, hc, rows)
+    layouts: Dict[str, Tuple[List[str], List[Any], List[Any], np.ndarray]] = {}
+    newest = store.last_cycle // store.interval if store.count else -1
+    for path in paths:
+        key = os.path.abspath(path)
+        with open(path, 'rb') as handle:
+            position = _export_start(handle, store.sources.get(key), store.last_cycle, 2 * store.interval)
+            handle.seek(position)
+            for line in handle:
+                if not line.endswith(b'\n'):
+                    # The collector is still appending this one
+                    break
+                position += len(line)
+                if not line.strip():
+                    continue
+                poll = json.loads(line)
+                cycle = int(poll['timestamp']) // store.interval
+                if cycle <= newest:
+                    continue
+                device = poll['device']
+                names, in_octets, out_octets, speeds, hc = _poll_columns(poll)
+                layout = layouts.get(device)
+                if layout is None or layout[0] != names or layout[1] != speeds or layout[2] != hc:
+                    rows = np.array([catalog.add(device, name, float(speed or 0) * 1e6, 64 if wide else 32)
+                                     for name, speed, wide in zip(names, speeds, hc)], dtype=np.int64)
+                    layout = layouts[device] = (names, speeds, hc, rows)
+                # Counters become arrays right away; millions of retained ints would slow the whole pass
+                cycles[cycle].append((device, int(poll['timestamp']), float(poll.get('sys_uptime') or 0) / 100,
+                                      layout[3], np.array(in_octets, dtype=np.uint64),
+                                      np.array(out_octets, dtype=np.uint64)))
+            store.sources[key] = {'inode': os.fstat(handle.fileno()).st_ino, 'offset': position}
+
+    ordered = sorted(cycles)
+    for offset in range(0, len(ordered), block_cycles):
+        block = ordered[offset:offset + block_cycles]
+        k = len(block)
+        times = np.zeros((len(catalog.devices), k), dtype=np.int64)
+        uptime = np.zeros((len(catalog.devices), k), dtype=np.float64)
+        rows: List[np.ndarray] = []
+        columns: List[int] = []
+        in_values: List[np.ndarray] = []
+        out_values: List[np.ndarray] = []
+        for column, cycle in enumerate(block):
+            for device, timestamp, seconds, poll_rows, in_octets, out_octets in cycles[cycle]:
+                device_id = catalog.device_ids[device]
+                times[device_id, column] = timestamp
+                uptime[device_id, column] = seconds
+                rows.append(poll_rows)
+                columns.append(column)
+                in_values.append(in_octets)
+                out_values.append(out_octets)
+
+        # One flat scatter per array instead of a store per interface
+        counts = [len(r) for r in rows]
+        cells = np.concatenate(rows) * k + np.repeat(np.array(columns, dtype=np.int64), counts)
+        present = np.zeros((len(catalog), k), dtype=bool)
+        present.reshape(-1)[cells] = True
+        in_matrix = np.zeros((len(catalog), k), dtype=np.uint64)
+        in_matrix.reshape(-1)[cells] = np.concatenate(in_values)
+        out_matrix = np.zeros((len(catalog), k), dtype=np.uint64)
+        out_matrix.reshape(-1)[cells] = np.concatenate(out_values)
+        store.ingest(times, in_matrix, out_matrix, uptime if uptime.any() else None, present)
+    return len(ordered)
+
+
+def load_policy_vars(paths: Sequence[str]) -> Dict[str, Any]:
+    """Merge bandwidth_management variable files (YAML or JSON)"""
+    merged: Dict[str, Any] = {}
+    for path in paths:
+        with open(path) as handle:
+            merged.update(yaml.safe_load(handle) or {})
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Interface utilization and capacity analytics')
+    parser.add_argument('--store', required=True, help='Counter store (.npz), created if missing')
+    parser.add_argument('--ingest', nargs='*', default=[], help='SNMP collector exports (JSON lines)')
+    parser.add_argument('--vars', nargs='*', default=[], help='bandwidth_management variable files')
+    parser.add_argument('--interval', type=int, default=DEFAULT_SETTINGS['interval'], help='Poll interval (s)')
+    parser.add_argument('--retention-days', type=float, default=DEFAULT_SETTINGS['retention_days'],
+                        help='History kept in the store')
+    parser.add_argument('--horizon-days', type=float, default=DEFAULT_SETTINGS['horizon_days'],
+                        help='Forecast horizon for breach flags')
+    parser.add_argument('--output', help='Write flagged interfaces (JSON)')
+    parser.add_argument('--summary', help='Write run summary (JSON)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    policy_vars = load_policy_vars(args.vars)
+    settings = {
+        'horizon_days': args.horizon_days,
+        'threshold_minor': policy_vars.get('bandwidth_threshold_minor', DEFAULT_SETTINGS['threshold_minor']),
+        'threshold_major': policy_vars.get('bandwidth_threshold_major', DEFAULT_SETTINGS['threshold_major']),
+    }
+    if os.path.exists(args.store):
+        store = UtilizationStore.load(args.store)
+    else:
+        capacity = int(args.retention_days * 86400 // args.interval)
+        store = UtilizationStore(InterfaceCatalog(), args.interval, capacity)
+
+    started = time.perf_counter()
+    sources = json.dumps(store.sources, sort_keys=True)
+    ingested = ingest_polls(store, args.ingest, block_cycles=max(86400 // store.interval, 1))
+    if ingested or json.dumps(store.sources, sort_keys=True) != sources:
+        store.save(args.store)
+    ingest_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = analyze(store, resolve_limits(store.catalog, policy_vars), settings)
+    records = findings(store, result, settings)
+    summary = summarize(store, result)
+    summary.update({
+        'cycles_ingested': ingested,
+        'ingest_seconds': round(ingest_seconds, 2),
+        'analyze_seconds': round(time.perf_counter() - started, 2),
+    })
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(records, handle, indent=2)
+    if args.summary:
+        with open(args.summary, 'w') as handle:
+            json.dump(summary, handle, indent=2)
+    logger.info(f"{summary['interfaces']} interfaces, {summary['polls_stored']} polls stored, "
+                f"{summary['flagged']} flagged: {summary['flags']}")
+
+
+if __name__ == '__main__':
+    main()
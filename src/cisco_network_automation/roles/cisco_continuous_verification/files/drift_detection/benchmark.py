@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Drift Detector Benchmark
+Seeds baselines from a synthetic backup store of 10k running configs, then polls
+simulated devices (config-change marker, archive change log, `| section` filters)
+after a small fraction of them change. Compares the incremental poll with a naive
+full re-fetch and re-hash of every config, and checks both find the same drift.
+"""
+
+import os
+import re
+import time
+import random
+import argparse
+import tempfile
+
+from drift_detector import (
+    BaselineStore, CHANGE_LOG_COMMAND, CliChannel, DriftDetector, MARKER_COMMAND, _top_level,
+    digest, split_sections,
+)
+
+BASE_CONFIG = """!
+version 16.9
+service timestamps log datetime msec
+service password-encryption
+hostname {host}
+!
+no ip domain lookup
+ip domain name network.local
+ip ssh version 2
+ip ssh time-out 60
+!
+spanning-tree mode mst
+spanning-tree mst 0 priority 24576
+spanning-tree mst configuration
+ name REGION1
+ revision 1
+ instance 1 vlan 10-20
+!
+username admin privilege 15 secret 9 $9$abcdefghijklmnop
+!
+{interfaces}
+!
+router bgp 65001
+ bgp router-id 10.255.{a}.{b}
+ bgp log-neighbor-changes
+ neighbor 10.255.0.1 remote-as 65001
+ neighbor 10.255.0.1 update-source Loopback0
+!
+ip access-list extended MGMT
+ permit tcp 10.0.0.0 0.0.255.255 any eq 22
+ deny ip any any log
+!
+snmp-server community c{n} RO MGMT
+logging buffered 4096
+logging host 10.0.10.{log_host}
+ntp server 10.0.0.1
+!
+archive
+ log config
+  logging enable
+  hidekeys
+!
+banner motd ^CAuthorized access only^C
+!
+line vty 0 15
+ exec-timeout 5 0
+ transport input ssh
+!
+end
+"""
+
+INTERFACE = """interface GigabitEthernet0/{index}
+ description link-{index}
+ ip address 10.{a}.{index}.1 255.255.255.252
+ no shutdown
+!"""
+
+
+def ios_to_python(regex: str) -> str:
+    out, i = [], 0
+    while i < len(regex):
+        c = regex[i]
+        if c == '\\' and i + 1 < len(regex):
+            out.append(re.escape(regex[i + 1]))
+            i += 2
+            continue
+        out.append(r'(?:[\s,]|$)' if c == '_' else c)
+        i += 1
+    return ''.join(out)
+
+
+class SimulatedDevice:
+    """Device CLI stand-in: change marker, bounded archive log and output filters"""
+
+    LOG_SIZE = 100
+
+    def __init__(self, config: str):
+        self.config = config
+        self.counter = 1
+        self.log = []
+        self.next_index = 1
+
+    def run(self, command: str) -> str:
+        if command == MARKER_COMMAND:
+            return f"! Last configuration change at change {self.counter}"
+        if command == CHANGE_LOG_COMMAND:
+            rows = [f"{index:5d}     1        admin@vty0     |{cmd}" for index, cmd in self.log]
+            return ' idx   sess           user@line      Logged command\n' + '\n'.join(rows)
+        if command == 'show running-config':
+            return self.config
+        head, _, regex = command.partition(' | ')
+        verb, _, pattern = regex.partition(' ')
+        compiled = re.compile(ios_to_python(pattern))
+        if verb == 'include':
+            return '\n'.join(l for l in self.config.splitlines() if compiled.search(l))
+        out = []
+        for line, children in _top_level(self.config):
+            if compiled.search(line) or any(compiled.search(c) for c in children):
+                out.append(line)
+                out.extend(children)
+        return '\n'.join(out)
+
+    def configure(self, commands, logged: bool = True) -> None:
+        """Apply top-level/indented config commands and log them like `archive log config`"""
+        entries = [[line, list(children)] for line, children in _top_level(self.config)]
+        current = None
+        for command in commands:
+            if command.startswith(' '):
+                child = command.strip()
+                if child.startswith('no '):
+                    current[1] = [c for c in current[1] if c.strip() != child[3:]]
+                    continue
+                # Single-valued attributes (description, ip address, ...) are replaced in place
+                attribute = child.split()[:2 if child.startswith('ip ') else 1]
+                position = next((i for i, c in enumerate(current[1]) if c.split()[:len(attribute)] == attribute), None)
+                if position is None:
+                    current[1].append(' ' + child)
+                else:
+                    current[1][position] = ' ' + child
+                continue
+            negate = command.startswith('no ')
+            line = command[3:] if negate else command
+            match = next((e for e in entries if e[0] == line), None)
+            if negate:
+                entries = [e for e in entries if e[0] != line]
+                current = None
+            elif match is not None:
+                current = match
+            else:
+                current = [line, []]
+                entries.append(current)
+        self.config = '\n'.join('\n'.join([line] + children) for line, children in entries) + '\nend\n'
+        self.counter += 1
+        if logged:
+            for command in commands:
+                self.log.append((self.next_index, command))
+                self.next_index += 1
+            self.log = self.log[-self.LOG_SIZE:]
+
+
+def generate_fleet(directory: str, devices: int, interfaces: int):
+    fleet = {}
+    for n in range(devices):
+        host = f"device-{n:05d}"
+        config = BASE_CONFIG.format(
+            host=host, n=n, a=n // 250 % 250, b=n % 250, log_host=n % 250,
+            interfaces='\n'.join(INTERFACE.format(index=i, a=n % 250) for i in range(interfaces)),
+        )
+        with open(os.path.join(directory, f"{host}_running_1700000000.cfg"), 'w') as handle:
+            handle.write(config)
+        fleet[host] = SimulatedDevice(config)
+    return fleet
+
+
+def mutate(fleet, args):
+    """Change a small fraction of the fleet; return the (device, section) pairs that really changed"""
+    rng = random.Random(7)
+    hosts = sorted(fleet)
+    changed = rng.sample(hosts, int(len(hosts) * args.change_rate))
+    unlogged = set(changed[:max(1, len(changed) // 10)])
+    wrapped = set(changed[len(unlogged):len(unlogged) + max(1, len(changed) // 20)])
+    for host in changed:
+        device = fleet[host]
+        port = rng.randrange(args.interfaces)
+        commands = [f"interface GigabitEthernet0/{port}", f" description changed-{rng.randrange(1000)}"]
+        if rng.random() < 0.5:
+            commands += ["logging host 10.99.0.1"]
+        if rng.random() < 0.3:
+            # Group filter ^(no )?spanning-tree mst_ also matches the "spanning-tree mst configuration" header
+            commands += ["spanning-tree mst 1 priority 28672"]
+        if rng.random() < 0.3:
+            commands += ["interface Loopback99", " ip address 10.99.99.1 255.255.255.255"]
+        if host in wrapped:
+            # Heavy churn that rolls the archive log past what the detector last saw
+            for _ in range(SimulatedDevice.LOG_SIZE // 2 + 1):
+                device.configure(["ip ssh time-out 60"] * 2)
+        device.configure(commands, logged=host not in unlogged)
+    return changed, unlogged, wrapped
+
+
+def naive_poll(store, fleet):
+    """Re-fetch and re-hash every config, compare every section against its baseline"""
+    drift, transferred = set(), 0
+    for host, device in fleet.items():
+        text = device.run('show running-config')
+        transferred += len(text)
+        current = split_sections(text)
+        baseline = store.sections(host)
+        for key in set(current) | set(baseline):
+            text = current.get(key)
+            if (digest(text) if text is not None else None) != baseline.get(key, (None,))[0]:
+                drift.add((host, key))
+    return drift, transferred
+
+
+def poll(store, fleet, workers):
+    detector = DriftDetector(store)
+    channels = {host: CliChannel(device.run) for host, device in fleet.items()}
+    start = time.perf_counter()
+    events = detector.poll(channels, workers)
+    return detector, events, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark incremental vs full config drift detection')
+    parser.add_argument('--devices', type=int, default=10000, help='Number of configs')
+    parser.add_argument('--interfaces', type=int, default=48, help='Interfaces per config')
+    parser.add_argument('--change-rate', type=float, default=0.01, help='Fraction of devices changed between polls')
+    parser.add_argument('--workers', type=int, default=16, help='Concurrent device polls')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        backups = os.path.join(directory, 'backups')
+        os.makedirs(backups)
+        start = time.perf_counter()
+        fleet = generate_fleet(backups, args.devices, args.interfaces)
+        generate_time = time.perf_counter() - start
+        config_bytes = sum(len(d.config) for d in fleet.values())
+
+        store = BaselineStore(os.path.join(directory, 'store'))
+        start = time.perf_counter()
+        loaded = store.load_backups(backups)
+        seed_time = time.perf_counter() - start
+        start = time.perf_counter()
+        store.load_backups(backups)
+        reseed_time = time.perf_counter() - start
+        sections = len(store.sections('device-00000'))
+
+        print("DRIFT DETECTOR BENCHMARK")
+        print(f"Fleet: {args.devices:,} configs, {args.interfaces} interfaces, {sections} sections each, "
+              f"{config_bytes / 2**20:.0f} MiB (generated in {generate_time:.1f}s)")
+        print(f"Baseline from backups: {seed_time:.1f}s for {loaded['refreshed']:,} configs, "
+              f"unchanged re-seed {reseed_time:.2f}s")
+
+        detector, _, first_time = poll(store, fleet, args.workers)
+        print(f"First poll (establish markers, full fetch): {first_time:.1f}s, "
+              f"{detector.stats['bytes'] / 2**20:.0f} MiB transferred")
+
+        detector, _, idle_time = poll(store, fleet, args.workers)
+        print(f"Idle poll (no changes): {idle_time:.2f}s, {detector.stats['commands']:,} commands, "
+              f"{detector.stats['bytes'] / 2**20:.2f} MiB")
+
+        changed, unlogged, wrapped = mutate(fleet, args)
+        start = time.perf_counter()
+        truth, naive_bytes = naive_poll(store, fleet)
+        naive_time = time.perf_counter() - start
+
+        detector, events, drift_time = poll(store, fleet, args.workers)
+        stats = detector.stats
+        found = {(e['device'], e['section']) for e in events if e['event'] == 'drift'}
+        print(f"Changed devices: {len(changed)} ({len(unlogged)} outside the CLI log, "
+              f"{len(wrapped)} with a wrapped log)")
+        print(f"Naive full re-fetch: {naive_time:.1f}s, {naive_bytes / 2**20:.0f} MiB, "
+              f"{len(truth)} drifted sections")
+        print(f"Incremental poll: {drift_time:.2f}s, {stats['bytes'] / 2**20:.2f} MiB, {stats['commands']:,} commands "
+              f"({stats['incremental']} incremental, {stats['full']} full, {stats['sections_fetched']} sections fetched)")
+        print(f"Drift events: {stats['drift_events']}, match naive full diff: {found == truth}")
+        print(f"Speedup: {naive_time / drift_time:.1f}x time, {naive_bytes / max(stats['bytes'], 1):.0f}x less data")
+        sample = next(e for e in events if e['event'] == 'drift' and e['section'].startswith('interface Gig'))
+        print(f"Sample event: {sample['device']} [{sample['section']}] {sample['diff']}")
+
+        # Revert one change through the CLI: the drift resolves from a single section fetch
+        host, key = sample['device'], sample['section']
+        fleet[host].configure([key] + [' ' + line[1:].strip() for line in sample['diff'] if line.startswith('-')])
+        detector, events, _ = poll(store, {host: fleet[host]}, 1)
+        print(f"After CLI revert on {host}: {[e['event'] + ' ' + e['section'] for e in events]}, "
+              f"{detector.stats['commands']} commands")
+
+        # Same for a global group that shares its words with a block header
+        host = next(h for h in sorted(fleet) if h not in changed)
+        fleet[host].configure(["spanning-tree mst 0 priority 28672", "no spanning-tree mst 0 priority 24576"])
+        _, events, _ = poll(store, {host: fleet[host]}, 1)
+        print(f"Colliding group on {host}: {[(e['section'], e['diff']) for e in events]}")
+        fleet[host].configure(["spanning-tree mst 0 priority 24576", "no spanning-tree mst 0 priority 28672"])
+        _, events, _ = poll(store, {host: fleet[host]}, 1)
+        print(f"After CLI revert on {host}: {[e['event'] + ' ' + e['section'] for e in events]}, "
+              f"open drift: {sorted(store.devices[host]['observed'])}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+Incremental Configuration Drift Detector
+Keeps per-device, per-section hashes of the last known good running config
+(seeded from the backup store) and polls devices cheaply: a config-change
+marker first, then the archive change log to find touched sections, then
+`show running-config | section` for only those sections. Full configs are
+fetched only when the change log cannot account for a change. Drift events
+carry minimal per-section diffs.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import difflib
+import hashlib
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKUP_NAME_PATTERN = re.compile(r'^(?P<host>.+)_running_(?P<timestamp>\d+)\.cfg$')
+BANNER_PATTERN = re.compile(r'^banner\s+(\S+)\s+(\^C|\S)')
+ARCHIVE_ENTRY = re.compile(r'^\s*(\d+)\s+\d+\s+\S+\s+\|(.*)$')
+
+# Lines that change without any configuration change
+VOLATILE_CONFIG = re.compile(
+    r'^(Building configuration|Current configuration|! Last configuration change|! NVRAM config last updated'
+    r'|! No configuration change since last restart|! Time:|ntp clock-period)'
+)
+
+# Top-level commands that open a section even when it has no children yet
+BLOCK_PREFIXES = (
+    'interface ', 'router ', 'line ', 'ip access-list ', 'ipv6 access-list ', 'route-map ', 'class-map ',
+    'policy-map ', 'crypto ', 'vrf definition ', 'ip vrf ', 'key chain ', 'archive', 'control-plane',
+    'redundancy', 'track ', 'ip sla ', 'object-group ', 'parameter-map ', 'zone ', 'zone-pair ', 'flow ',
+    'event manager applet ', 'vlan ', 'aaa group server ', 'ip dhcp pool ', 'banner ',
+)
+
+# Standalone globals are grouped by their first keyword, or first two for these
+TWO_WORD_GROUPS = {'ip', 'ipv6', 'snmp-server', 'aaa', 'service', 'logging', 'spanning-tree', 'mpls'}
+
+MARKER_COMMAND = 'show running-config | include Last configuration change'
+CHANGE_LOG_COMMAND = 'show archive log config all'
+IOS_REGEX_SPECIAL = set('.^$*+?()[]_\\')
+
+
+def digest(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def is_block(line: str) -> bool:
+    return line.startswith(BLOCK_PREFIXES)
+
+
+def group_key(line: str) -> str:
+    """Key of the global group a standalone top-level line belongs to ("no" toggles the same group)"""
+    words = line.split()
+    if words and words[0] == 'no':
+        words = words[1:]
+    if not words:
+        return 'global:'
+    width = 2 if words[0] in TWO_WORD_GROUPS and len(words) > 1 else 1
+    return 'global:' + ' '.join(words[:width])
+
+
+def _top_level(text: str) -> List[Tuple[str, List[str]]]:
+    """Top-level lines with their indented children; banners keep their body as children"""
+    entries: List[Tuple[str, List[str]]] = []
+    banner: Optional[str] = None
+    for raw in text.splitlines():
+        if banner is not None:
+            entries[-1][1].append(raw.rstrip())
+            if banner in raw:
+                banner = None
+            continue
+
+        line = raw.rstrip()
+        if not line or line == 'end' or VOLATILE_CONFIG.match(line):
+            continue
+        if line.startswith('!'):
+            continue
+        if line[0] in ' \t':
+            if entries:
+                entries[-1][1].append(line)
+            continue
+
+        entries.append((line, []))
+        match = BANNER_PATTERN.match(line)
+        if match:
+            delimiter = match.group(2)
+            rest = line[match.end():]
+            if delimiter not in rest:
+                banner = delimiter
+    return entries
+
+
+def section_key(line: str, has_children: bool = False, blocks: Set[str] = frozenset()) -> str:
+    if line.startswith('banner '):
+        return 'banner ' + line.split()[1]
+    if has_children or is_block(line) or line in blocks:
+        return line
+    return group_key(line)
+
+
+def split_sections(text: str, blocks: Set[str] = frozenset()) -> Dict[str, str]:
+    """Split a running config into keyed sections: block headers with children, banners, global groups
+
+    Headers in `blocks` (the device's known block sections) keep their own key even
+    when the output carries no children, as with `| include` group fetches.
+    """
+    sections: Dict[str, List[str]] = {}
+    for line, children in _top_level(text):
+        key = section_key(line, bool(children), blocks)
+        sections.setdefault(key, []).append(line)
+        sections[key].extend(children)
+    return {key: '\n'.join(lines) for key, lines in sections.items()}
+
+
+def ios_regex(text: str) -> str:
+    return ''.join('\\' + c if c in IOS_REGEX_SPECIAL else c for c in text)
+
+
+def section_command(key: str) -> str:
+    """Device command that returns exactly one section"""
+    if key.startswith('global:'):
+        # IOS regex "_" matches a space or end of line
+        return f"show running-config | include ^(no )?{ios_regex(key[len('global:'):])}_"
+    if key.startswith('banner '):
+        return f"show running-config | section ^{ios_regex(key)}_"
+    return f"show running-config | section ^{ios_regex(key)}$"
+
+
+def parse_change_log(text: str) -> List[Tuple[int, str]]:
+    """(index, command) rows of `show archive log config all`; nested commands keep their indent"""
+    entries = []
+    for line in (text or '').splitlines():
+        match = ARCHIVE_ENTRY.match(line)
+        if match:
+            entries.append((int(match.group(1)), match.group(2).rstrip()))
+    return entries
+
+
+def touched_sections(commands: List[str], blocks: Set[str]) -> Set[str]:
+    """Section keys touched by logged config commands"""
+    touched: Set[str] = set()
+    parent: Optional[str] = None
+    for i, command in enumerate(commands):
+        stripped = command.strip()
+        if not stripped:
+            continue
+        if command[0] in ' \t':
+            if parent is not None:
+                touched.add(parent)
+            continue
+        if stripped in ('end', 'exit'):
+            parent = None
+            continue
+
+        line = stripped[3:] if stripped.startswith('no ') else stripped
+        has_children = i + 1 < len(commands) and commands[i + 1][:1] in (' ', '\t')
+        key = section_key(line, has_children, blocks)
+        touched.add(key)
+        parent = key if key == line else None
+    return touched
+
+
+def section_diff(old: Optional[str], new: Optional[str]) -> List[str]:
+    """Changed lines only, unified-diff style without file headers or context"""
+    diff = difflib.unified_diff((old or '').splitlines(), (new or '').splitlines(), lineterm='', n=0)
+    return [line for line in diff if not line.startswith(('---', '+++'))]
+
+
+class CliChannel:
+    """Drift-detection queries over a device CLI `run(command) -> output` function"""
+
+    def __init__(self, run: Callable[[str], str], marker_command: str = MARKER_COMMAND,
+                 change_log_command: Optional[str] = CHANGE_LOG_COMMAND):
+        self.run = run
+        self.marker_command = marker_command
+        self.change_log_command = change_log_command
+        self.commands = 0
+        self.bytes = 0
+
+    def _run(self, command: str) -> str:
+        output = self.run(command)
+        self.commands += 1
+        self.bytes += len(output)
+        return output
+
+    def marker(self) -> str:
+        return self._run(self.marker_command).strip()
+
+    def change_log(self) -> Optional[List[Tuple[int, str]]]:
+        if not self.change_log_command:
+            return None
+        return parse_change_log(self._run(self.change_log_command))
+
+    def section(self, key: str, blocks: Set[str] = frozenset()) -> Optional[str]:
+        # A global group filter also returns bare headers of blocks sharing its words
+        return split_sections(self._run(section_command(key)), blocks).get(key)
+
+    def running_config(self) -> str:
+        return self._run('show running-config')
+
+
+class DirectoryChannel:
+    """Current configs from a directory (e.g. a fresh backup run); the file stat is the marker"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.commands = 0
+        self.bytes = 0
+
+    def marker(self) -> str:
+        stat = os.stat(self.path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def change_log(self) -> Optional[List[Tuple[int, str]]]:
+        return None
+
+    def section(self, key: str, blocks: Set[str] = frozenset()) -> Optional[str]:
+        return split_sections(self.running_config(), blocks).get(key)
+
+    def running_config(self) -> str:
+        with open(self.path, errors='replace') as handle:
+            text = handle.read()
+        self.commands += 1
+        self.bytes += len(text)
+        return text
+
+
+class BaselineStore:
+    """Index of per-device poll state plus per-device baseline section files, loaded on demand"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = os.path.join(path, 'index.json')
+        os.makedirs(os.path.join(path, 'baselines'), exist_ok=True)
+        try:
+            with open(self.index_path) as handle:
+                self.devices: Dict[str, Dict[str, Any]] = json.load(handle).get('devices', {})
+        except (OSError, ValueError):
+            self.devices = {}
+
+    def _baseline_path(self, device: str) -> str:
+        return os.path.join(self.path, 'baselines', f"{device}.json")
+
+    @staticmethod
+    def _write(path: str, data: Any) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp_')
+        with os.fdopen(fd, 'w') as handle:
+            json.dump(data, handle, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    def save(self) -> None:
+        self._write(self.index_path, {'version': 1, 'devices': self.devices})
+
+    def sections(self, device: str) -> Dict[str, List[str]]:
+        """Baseline sections as {key: [digest, text]}"""
+        try:
+            with open(self._baseline_path(device)) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def set_baseline(self, device: str, sections: Dict[str, str], source: Optional[str] = None) -> None:
+        self._write(self._baseline_path(device), {key: [digest(text), text] for key, text in sections.items()})
+        state = self.devices.setdefault(device, {})
+        state.update({
+            'source': source,
+            'baseline_digest': digest('\n'.join(f"{k}\0{v}" for k, v in sorted(sections.items()))),
+            'blocks': sorted(k for k in sections if not k.startswith(('global:', 'banner '))),
+            'observed': {},
+            'marker': None,
+            'log_index': 0,
+            'baselined': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        })
+
+    def load_backups(self, backup_dir: str) -> Dict[str, int]:
+        """Refresh baselines from the latest backup per device; unchanged backups are not re-read"""
+        latest: Dict[str, Tuple[int, str]] = {}
+        for entry in os.scandir(backup_dir):
+            if not entry.is_file() or not entry.name.endswith('.cfg'):
+                continue
+            match = BACKUP_NAME_PATTERN.match(entry.name)
+            host, timestamp = (match.group('host'), int(match.group('timestamp'))) if match \
+                else (entry.name[:-len('.cfg')], 0)
+            if host not in latest or timestamp > latest[host][0]:
+                latest[host] = (timestamp, entry.path)
+
+        counts = {'devices': len(latest), 'refreshed': 0, 'unchanged': 0}
+        for host, (_, path) in latest.items():
+            stat = os.stat(path)
+            source = f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+            if self.devices.get(host, {}).get('source') == source:
+                counts['unchanged'] += 1
+                continue
+            with open(path, errors='replace') as handle:
+                self.set_baseline(host, split_sections(handle.read()), source)
+            counts['refreshed'] += 1
+        return counts
+
+    def accept(self, device: str) -> int:
+        """Promote open drift on a device to its baseline; returns sections accepted"""
+        state = self.devices.get(device)
+        if not state or not state.get('observed'):
+            return 0
+        baseline = self.sections(device)
+        for key, observed in state['observed'].items():
+            if observed['text'] is None:
+                baseline.pop(key, None)
+            else:
+                baseline[key] = [observed['digest'], observed['text']]
+        self._write(self._baseline_path(device), baseline)
+        accepted = len(state['observed'])
+        state['observed'] = {}
+        state['blocks'] = sorted(k for k in baseline if not k.startswith(('global:', 'banner ')))
+        return accepted
+
+
+class DriftDetector:
+    """Poll devices and emit per-section drift events against the baseline store"""
+
+    def __init__(self, store: BaselineStore, sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 full_fetch_ratio: float = 0.3, max_section_fetches: int = 25):
+        self.store = store
+        self.sink = sink or (lambda event: None)
+        self.full_fetch_ratio = full_fetch_ratio
+        self.max_section_fetches = max_section_fetches
+        self.stats = {'polled': 0, 'unchanged': 0, 'incremental': 0, 'full': 0, 'sections_fetched': 0,
+                      'drift_events': 0, 'resolved_events': 0, 'errors': 0, 'commands': 0, 'bytes': 0}
+
+    def _fetch(self, device: str, channel) -> Dict[str, Any]:
+        """Runs in a worker thread: talks to the device, returns what changed relative to state"""
+        state = self.store.devices.get(device)
+        if state is None:
+            return {'device': device, 'error': 'no baseline'}
+
+        marker = channel.marker()
+        if state.get('marker') is not None and marker == state['marker']:
+            return {'device': device, 'mode': 'unchanged', 'marker': marker}
+
+        # Position in the change log is taken on every changed poll, including the first
+        touched: Optional[Set[str]] = None
+        blocks = set(state.get('blocks', []))
+        log_index = state.get('log_index', 0)
+        entries = channel.change_log()
+        if entries:
+            first, last = entries[0][0], entries[-1][0]
+            # Usable only if the log has not wrapped past our position or restarted after a reload
+            if state.get('marker') is not None and first <= log_index + 1 and last >= log_index:
+                new = [command for index, command in entries if index > log_index]
+                if new:
+                    touched = touched_sections(new, blocks)
+            log_index = last
+
+        baseline = self.store.sections(device)
+        limit = min(self.max_section_fetches, max(1, int(len(baseline) * self.full_fetch_ratio)))
+        if touched is not None and len(touched) <= limit:
+            current = {key: channel.section(key, blocks) for key in sorted(touched)}
+            mode = 'incremental'
+        else:
+            # Changed outside the CLI log (or too much changed): one full fetch beats many section fetches
+            sections = split_sections(channel.running_config(), blocks)
+            current = {key: sections.get(key) for key in set(baseline) | set(sections)}
+            mode = 'full'
+        return {'device': device, 'mode': mode, 'marker': marker, 'log_index': log_index,
+                'current': current, 'baseline': baseline}
+
+    def _compare(self, result: Dict[str, Any], now: float) -> List[Dict[str, Any]]:
+        """Runs in the main thread: updates device state and builds events"""
+        device = result['device']
+        state = self.store.devices[device]
+        state['marker'] = result['marker']
+        if result['mode'] == 'unchanged':
+            return []
+        state['log_index'] = result['log_index']
+        observed = state.setdefault('observed', {})
+        baseline = result['baseline']
+        events = []
+        for key, text in result['current'].items():
+            base_digest, base_text = baseline.get(key, (None, None))
+            current_digest = digest(text) if text is not None else None
+            if current_digest == base_digest:
+                if key in observed:
+                    del observed[key]
+                    events.append({'event': 'drift_resolved', 'device': device, 'section': key, 'detected': now})
+                continue
+            if key in observed and observed[key]['digest'] == current_digest:
+                continue
+            change = 'added' if base_text is None else 'removed' if text is None else 'modified'
+            observed[key] = {'digest': current_digest, 'text': text, 'since': now}
+            events.append({
+                'event': 'drift', 'device': device, 'section': key, 'change': change,
+                'diff': section_diff(base_text, text), 'baseline_digest': base_digest,
+                'current_digest': current_digest, 'detected': now,
+            })
+        return events
+
+    def poll(self, channels: Dict[str, Any], workers: int = 16) -> List[Dict[str, Any]]:
+        """Poll every device once; `channels` maps device name to a channel"""
+        now = time.time()
+        events: List[Dict[str, Any]] = []
+
+        def fetch(item):
+            device, channel = item
+            try:
+                return self._fetch(device, channel)
+            except Exception as e:
+                return {'device': device, 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(fetch, channels.items()):
+                self.stats['polled'] += 1
+                if 'error' in result:
+                    self.stats['errors'] += 1
+                    logger.warning(f"{result['device']}: {result['error']}")
+                    continue
+                self.stats[result['mode']] += 1
+                if result['mode'] == 'incremental':
+                    self.stats['sections_fetched'] += len(result['current'])
+                for event in self._compare(result, now):
+                    self.stats['drift_events' if event['event'] == 'drift' else 'resolved_events'] += 1
+                    events.append(event)
+                    self.sink(event)
+
+        for channel in channels.values():
+            self.stats['commands'] += channel.commands
+            self.stats['bytes'] += channel.bytes
+        self.store.save()
+        return events
+
+    def open_drift(self) -> Dict[str, List[str]]:
+        return {device: sorted(state['observed']) for device, state in self.store.devices.items()
+                if state.get('observed')}
+
+
+class BrokerCli:
+    """`run(command)` over a pooled session leased from the session broker"""
+
+    def __init__(self, broker, socket_path: str, params: Dict[str, Any], timeout: float = 60):
+        self.broker = broker
+        self.socket_path = socket_path
+        self.params = params
+        self.timeout = timeout
+        self.any_prompt = re.compile(broker.DEFAULT_PROMPT_PATTERNS[0].encode())
+        self.prompt = self.any_prompt
+        self.sock = None
+
+    def _read(self) -> bytes:
+        buffer = b''
+        while not self.prompt.search(buffer[-256:]):
+            data = self.sock.recv(65536)
+            if not data:
+                raise RuntimeError(f"session to {self.params['host']} closed")
+            buffer += data
+        return buffer
+
+    def __call__(self, command: str) -> str:
+        if self.sock is None:
+            self.sock, _ = self.broker.lease(self.socket_path, self.params, timeout=self.timeout)
+            self.sock.settimeout(self.timeout)
+            # The broker replays the session's prompt; output ends only at that exact
+            # prompt, so config lines ending in '#' or '>' do not cut a read short
+            current = self._read().replace(b'\r', b'').rstrip(b'\n').rsplit(b'\n', 1)[-1].strip()
+            self.prompt = re.compile(rb'[\r\n]' + re.escape(current) + rb' ?$')
+        self.sock.sendall(command.encode() + b'\r')
+        lines = self._read().decode(errors='replace').replace('\r', '').split('\n')
+        # Drop the echoed command and the trailing prompt
+        return '\n'.join(lines[1:-1])
+
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.prompt = self.any_prompt
+
+
+def broker_channels(devices: List[Dict[str, Any]], broker_lib: str, socket_path: Optional[str],
+                    marker_command: str, change_log_command: Optional[str]):
+    """CLI channels for inventory devices, leasing sessions from the session broker"""
+    sys.path.insert(0, broker_lib)
+    try:
+        import broker
+    except ImportError as e:
+        raise RuntimeError(f"Session broker not found in {broker_lib}") from e
+    path = broker.socket_path(socket_path)
+    channels, clis = {}, []
+    for device in devices:
+        params = {
+            'host': device.get('host', device['name']), 'port': device.get('port', 22),
+            'username': device.get('username') or os.environ.get('DRIFT_DEVICE_USERNAME'),
+            'password': os.environ.get('DRIFT_DEVICE_PASSWORD'),
+            'become': True, 'become_pass': os.environ.get('DRIFT_ENABLE_PASSWORD'),
+            'setup_commands': ['terminal length 0', 'terminal width 512'],
+        }
+        cli = BrokerCli(broker, path, params)
+        clis.append(cli)
+        channels[device['name']] = CliChannel(cli, marker_command, change_log_command)
+    return channels, clis
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental per-section configuration drift detection')
+    parser.add_argument('--store', required=True, help='Baseline store directory')
+    parser.add_argument('--backup-dir', help='Refresh baselines from the latest running-config backups here')
+    parser.add_argument('--current-dir', help='Compare a directory of current configs (offline poll)')
+    parser.add_argument('--devices', help='Devices JSON ([{name, host, port, username}]) to poll via the session broker')
+    parser.add_argument('--broker-lib', help='Directory containing the session broker module')
+    parser.add_argument('--broker-socket', help='Session broker socket')
+    parser.add_argument('--marker-command', default=MARKER_COMMAND, help='Cheap config-change marker command')
+    parser.add_argument('--change-log-command', default=CHANGE_LOG_COMMAND,
+                        help="Config change log command ('' to always re-fetch full configs on change)")
+    parser.add_argument('--accept', nargs='+', metavar='DEVICE', help="Promote open drift to baseline ('all' for every device)")
+    parser.add_argument('--workers', '-w', type=int, default=16, help='Concurrent device polls')
+    parser.add_argument('--output', '-o', help='Append drift events to this JSONL file')
+    parser.add_argument('--summary', help='Write poll summary JSON')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+    store = BaselineStore(args.store)
+    summary: Dict[str, Any] = {}
+
+    if args.backup_dir:
+        summary['baselines'] = store.load_backups(args.backup_dir)
+        logger.info(f"Baselines: {summary['baselines']}")
+
+    if args.accept:
+        targets = list(store.devices) if args.accept == ['all'] else args.accept
+        summary['accepted'] = {device: store.accept(device) for device in targets}
+
+    output = open(args.output, 'a') if args.output else None
+    sink = (lambda event: output.write(json.dumps(event) + '\n')) if output else None
+    detector = DriftDetector(store, sink=sink)
+    clis = []
+    try:
+        if args.current_dir:
+            channels = {name[:-len('.cfg')]: DirectoryChannel(os.path.join(args.current_dir, name))
+                        for name in os.listdir(args.current_dir) if name.endswith('.cfg')}
+            channels = {device: channel for device, channel in channels.items() if device in store.devices}
+            detector.poll(channels, args.workers)
+        elif args.devices:
+            with open(args.devices) as handle:
+                devices = [d for d in json.load(handle) if d['name'] in store.devices]
+            channels, clis = broker_channels(devices, args.broker_lib, args.broker_socket,
+                                             args.marker_command, args.change_log_command or None)
+            detector.poll(channels, args.workers)
+    finally:
+        for cli in clis:
+            cli.close()
+        if output:
+            output.close()
+
+    store.save()
+    summary['poll'] = detector.stats
+    summary['open_drift'] = detector.open_drift()
+    if args.summary:
+        with open(args.summary, 'w') as handle:
+            json.dump(summary, handle, indent=2)
+    print(json.dumps({'poll': detector.stats, 'devices_with_drift': len(summary['open_drift'])}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
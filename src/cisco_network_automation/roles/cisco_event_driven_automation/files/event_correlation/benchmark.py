@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Event Correlation Replay Benchmark
+Replays a synthetic syslog stream for a large three-tier topology (background
+noise, interface flap storms and distribution outages that cascade to access
+devices) and reports events/sec, memory and action consolidation.
+"""
+
+import time
+import random
+import argparse
+import resource
+import tracemalloc
+
+from correlation_engine import CorrelationEngine, parse_event
+
+# Syslog as IOS sends it (with PRI) and as a relay writes it to file; (line, device, type, resource, state)
+SYSLOG_SAMPLES = [
+    ('<187>Oct 19 03:52:00 core-rtr-01 1043: Oct 19 03:52:00.412: %LINK-3-UPDOWN: '
+     'Interface GigabitEthernet0/1, changed state to down',
+     'core-rtr-01', 'LINK-3-UPDOWN', 'GigabitEthernet0/1', 'down'),
+    ('Oct 19 03:52:00 edge-02 %LINEPROTO-5-UPDOWN: Line protocol on Interface Gi1/0/24, changed state to up',
+     'edge-02', 'LINEPROTO-5-UPDOWN', 'Gi1/0/24', 'up'),
+    ('<189>Oct  9 03:52:00 dist-00017: 88: *Oct  9 03:52:00.001: %BGP-5-ADJCHANGE: neighbor 10.0.0.2 Down BGP Notification sent',
+     'dist-00017', 'BGP-5-ADJCHANGE', '10.0.0.2', 'down'),
+    ('<189>45: acc-000001: *Mar  1 00:00:41.000: %SYS-5-CONFIG_I: Configured from console by vty0',
+     'acc-000001', 'SYS-5-CONFIG_I', '', ''),
+    ('1697600000.5 acc-000002 %LINK-3-UPDOWN: Interface Gi1/0/3, changed state to up',
+     'acc-000002', 'LINK-3-UPDOWN', 'Gi1/0/3', 'up'),
+]
+
+TRIGGERS = [
+    {'name': 'interface_flap', 'condition': 'LINK-*-UPDOWN', 'threshold': 5, 'window': 60,
+     'action': 'dampen_interface', 'scope': 'resource'},
+    {'name': 'device_unreachable', 'condition': 'SYS-*-NODE_DOWN', 'threshold': 1, 'window': 60,
+     'action': 'open_incident', 'scope': 'device'},
+    {'name': 'bgp_churn', 'condition': 'BGP-5-ADJCHANGE', 'threshold': 3, 'window': 120,
+     'action': 'collect_bgp_diagnostics', 'scope': 'resource'},
+]
+
+
+def build_topology(devices: int, fanout: int):
+    """core -> distribution -> access"""
+    cores = [f"core-{i:02d}" for i in range(4)]
+    distribution_count = max(1, devices // fanout)
+    distribution = [f"dist-{i:05d}" for i in range(distribution_count)]
+    access = [f"acc-{i:06d}" for i in range(devices - distribution_count - len(cores))]
+
+    topology = {d: [cores[i % len(cores)], cores[(i + 1) % len(cores)]] for i, d in enumerate(distribution)}
+    for i, device in enumerate(access):
+        topology[device] = [distribution[i % distribution_count]]
+    return topology, distribution, access
+
+
+def generate_events(args, topology, distribution, access):
+    rng = random.Random(11)
+    start = 1700000000.0
+    events = []
+    everyone = distribution + access
+
+    # Background noise across the whole estate, mostly unmatched event types
+    for i in range(args.background):
+        device = rng.choice(everyone)
+        ts = start + rng.uniform(0, args.duration)
+        kind = rng.random()
+        if kind < 0.7:
+            events.append((ts, device, 'SYS-5-CONFIG_I', '', ''))
+        elif kind < 0.95:
+            port = f"Gi1/0/{rng.randint(1, 48)}"
+            events.append((ts, device, 'LINK-3-UPDOWN', port, rng.choice(('up', 'down'))))
+        else:
+            events.append((ts, device, 'BGP-5-ADJCHANGE', f"10.{rng.randint(0, 255)}.0.1", 'down'))
+
+    # Flap storms: a port bouncing every ~0.5s for a minute, duplicated by two collectors
+    for device in rng.sample(access, args.storm_devices):
+        port = f"Gi1/0/{rng.randint(1, 48)}"
+        ts = start + rng.uniform(0, args.duration - 60)
+        for flap in range(args.flaps):
+            state = 'down' if flap % 2 == 0 else 'up'
+            events.append((ts, device, 'LINK-3-UPDOWN', port, state))
+            events.append((ts + 0.01, device, 'LINK-3-UPDOWN', port, state))
+            ts += rng.uniform(0.3, 0.7)
+
+    # Distribution outages: the distribution node and every access child report down
+    children = {}
+    for device in access:
+        children.setdefault(topology[device][0], []).append(device)
+    for parent in rng.sample(distribution, args.outages):
+        ts = start + rng.uniform(0, args.duration - 30)
+        events.append((ts, parent, 'SYS-1-NODE_DOWN', '', 'down'))
+        for child in children.get(parent, []):
+            child_ts = ts + rng.uniform(0.1, 3.0)
+            events.append((child_ts, child, 'SYS-1-NODE_DOWN', '', 'down'))
+            for port in range(5):
+                events.append((child_ts + port * 0.2, child, 'LINK-3-UPDOWN', 'Gi1/0/49', 'down'))
+
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def check_parsing():
+    """Parse real IOS syslog lines before timing anything"""
+    now = time.mktime((2023, 10, 19, 4, 0, 0, 0, 0, -1))
+    for line, device, event_type, resource, state in SYSLOG_SAMPLES:
+        ts, *fields = parse_event(line, now)
+        assert fields == [device, event_type, resource, state], (line, fields)
+        assert now - 86400 * 11 <= ts <= now, (line, ts)
+    # RFC 3164 carries no year: a December line read on New Year's Day is last year's
+    ts = parse_event(SYSLOG_SAMPLES[1][0].replace('Oct 19', 'Dec 31'), time.mktime((2024, 1, 1, 0, 5, 0, 0, 0, -1)))[0]
+    assert time.localtime(ts).tm_year == 2023, ts
+    assert parse_event(SYSLOG_SAMPLES[0][0], now)[0] == time.mktime((2023, 10, 19, 3, 52, 0, 0, 0, -1))
+    print(f"Syslog parsing: {len(SYSLOG_SAMPLES)} sample lines OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay benchmark for the event correlation engine')
+    parser.add_argument('--devices', type=int, default=100000, help='Devices in the topology')
+    parser.add_argument('--fanout', type=int, default=50, help='Access devices per distribution node')
+    parser.add_argument('--background', type=int, default=2000000, help='Background events')
+    parser.add_argument('--storm-devices', type=int, default=500, help='Devices with a flapping port')
+    parser.add_argument('--flaps', type=int, default=120, help='Flaps per storm')
+    parser.add_argument('--outages', type=int, default=20, help='Distribution outages')
+    parser.add_argument('--duration', type=float, default=3600, help='Replay span in seconds')
+    parser.add_argument('--trace-memory', action='store_true', help='Measure engine allocations with tracemalloc')
+    args = parser.parse_args()
+
+    check_parsing()
+    topology, distribution, access = build_topology(args.devices, args.fanout)
+    events = generate_events(args, topology, distribution, access)
+    matched_naive = sum(1 for e in events if e[2] != 'SYS-5-CONFIG_I')
+
+    print("EVENT CORRELATION REPLAY BENCHMARK")
+    print(f"Devices: {args.devices:,} ({len(distribution):,} distribution), events: {len(events):,}, "
+          f"span {args.duration:.0f}s")
+
+    actions = []
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if args.trace_memory:
+        tracemalloc.start()
+    engine = CorrelationEngine(TRIGGERS, topology, sink=actions.append)
+
+    start = time.perf_counter()
+    process = engine.process
+    for event in events:
+        process(*event)
+    engine.drain()
+    elapsed = time.perf_counter() - start
+
+    print(f"Replay: {elapsed:.2f}s, {len(events) / elapsed:,.0f} events/s")
+    if args.trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Engine memory: {current / 2**20:.1f} MiB retained, {peak / 2**20:.1f} MiB peak")
+    print(f"Process max RSS growth: {(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024:.1f} MiB")
+
+    stats = engine.stats
+    print(f"Matched events: {stats['matched']:,} (naive actions at one per matched event: {matched_naive:,})")
+    print(f"Duplicates dropped: {stats['duplicates']:,}, threshold firings: {stats['firings']:,}")
+    print(f"Consolidated actions: {stats['actions']:,}, merged into roots: {stats['merged']:,}, "
+          f"cascade suppressed: {stats['suppressed_cascade']:,}, cooldown suppressed: {stats['suppressed_cooldown']:,}")
+    print(f"State: {engine.state_size()}, expired keys: {stats['expired_keys']:,}")
+    outage_roots = [a for a in actions if a['trigger'] == 'device_unreachable' and a['suppressed_devices']]
+    if outage_roots:
+        print(f"Largest cascade: {outage_roots[0]['device']} absorbed "
+              f"{max(len(a['suppressed_devices']) for a in outage_roots)} downstream devices")
+
+
+if __name__ == '__main__':
+    main()
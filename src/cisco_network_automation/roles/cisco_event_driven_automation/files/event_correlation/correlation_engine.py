@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Event Correlation Engine
+Correlates syslog/alert events against automation triggers before remediation:
+per-key sliding windows in pooled fixed-size ring buffers, O(1) threshold checks,
+duplicate suppression, topology-aware cascade suppression and consolidated actions.
+"""
+
+import re
+import sys
+import json
+import time
+import queue
+import fnmatch
+import logging
+import argparse
+import threading
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# %LINK-3-UPDOWN: Interface GigabitEthernet0/1, changed state to down
+SYSLOG_PATTERN = re.compile(r'%(?P<type>[A-Z0-9_]+-\d-[A-Z0-9_]+):\s*(?P<message>.*)')
+RESOURCE_PATTERN = re.compile(r'(?:Interface|neighbor|Neighbor)\s+([\w/.:-]+)')
+STATE_PATTERN = re.compile(r'(?:changed state to|state to|is now)\s+(\w+)|\b(Up|Down)\b')
+MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+# RFC 3164: <187>Oct 19 03:52:00 core-rtr-01 ... (the PRI is usually gone once written to a file)
+RFC3164_PATTERN = re.compile(r'(?:<\d{1,3}>)?(?P<month>' + '|'.join(MONTHS) + r') +(?P<day>\d{1,2}) '
+                             r'(?P<hour>\d\d):(?P<minute>\d\d):(?P<second>\d\d) +(?P<host>[^\s:]+):? +(?P<message>.*)')
+PRI_PATTERN = re.compile(r'<\d{1,3}>')
+
+DEFAULTS = {
+    'window': 60,                 # seconds, event-processing-interval
+    'cooldown': 300,              # seconds between actions for the same device/trigger
+    'dedup_seconds': 2,           # a repeated state inside this interval is a duplicate
+    'consolidation_seconds': 10,  # hold fired triggers this long to merge cascades
+    'tick_seconds': 1,            # flush cadence, event time (and wall clock while stdin is idle)
+    'max_topology_depth': 8,
+}
+
+
+def _syslog_time(match: re.Match, now: float) -> float:
+    """Epoch for an RFC 3164 timestamp (sender local time, no year)"""
+    year = time.localtime(now).tm_year
+    fields = (MONTHS[match.group('month')], int(match.group('day')), int(match.group('hour')),
+              int(match.group('minute')), int(match.group('second')), 0, 0, -1)
+    ts = time.mktime((year,) + fields)
+    if ts > now + 86400:
+        # December messages read in early January belong to last year
+        ts = time.mktime((year - 1,) + fields)
+    return ts
+
+
+def parse_syslog_line(line: str, default_ts: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Split a syslog line into {ts, device, message}
+
+    RFC 3164 "<PRI>Mmm dd hh:mm:ss host [seq:] [*timestamp:] %TYPE: message" as
+    sent by IOS, falling back to "<ts> <device> ... %TYPE: message".
+    """
+    now = default_ts if default_ts is not None else time.time()
+    match = RFC3164_PATTERN.match(line)
+    if match:
+        return {'ts': _syslog_time(match, now), 'device': match.group('host'), 'message': match.group('message')}
+
+    match = PRI_PATTERN.match(line)
+    if match:
+        line = line[match.end():]
+    parts = line.split(None, 2)
+    if len(parts) < 3:
+        return None
+    try:
+        ts = float(parts[0])
+    except ValueError:
+        ts = now
+    return {'ts': ts, 'device': parts[1].rstrip(':'), 'message': parts[2]}
+
+
+def parse_event(record: Any, default_ts: Optional[float] = None) -> Optional[Tuple[float, str, str, str, str]]:
+    """Normalize a JSON alert or syslog record to (ts, device, type, resource, state)"""
+    if isinstance(record, str):
+        record = record.strip()
+        if not record:
+            return None
+        if record[0] == '{':
+            record = json.loads(record)
+        else:
+            record = parse_syslog_line(record, default_ts)
+            if record is None:
+                return None
+
+    event_type = record.get('type')
+    message = record.get('message', '')
+    if not event_type:
+        match = SYSLOG_PATTERN.search(message)
+        if not match:
+            return None
+        event_type, message = match.group('type'), match.group('message')
+
+    resource = record.get('resource')
+    if resource is None:
+        match = RESOURCE_PATTERN.search(message)
+        resource = match.group(1).rstrip(',') if match else ''
+    state = record.get('state')
+    if state is None:
+        match = STATE_PATTERN.search(message)
+        state = (match.group(1) or match.group(2)).lower() if match else ''
+
+    ts = record.get('ts', default_ts if default_ts is not None else time.time())
+    return float(ts), record['device'], event_type, resource, state
+
+
+class Trigger:
+    """Automation trigger: event-type condition, threshold within a window, and an action"""
+
+    def __init__(self, spec: Dict[str, Any], defaults: Dict[str, Any]):
+        self.name = spec['name']
+        self.condition = spec['condition']
+        self.threshold = max(1, int(spec.get('threshold', 1)))
+        self.action = spec['action']
+        self.notification = spec.get('notification', 'enabled')
+        self.window = float(spec.get('window', defaults['window']))
+        self.cooldown = float(spec.get('cooldown', defaults['cooldown']))
+        self.scope = spec.get('scope', 'resource')
+        self.state = spec.get('state')
+        self._regex = re.compile(fnmatch.translate(self.condition))
+        self.ring = RingWindow(self.threshold, self.window)
+
+    def matches(self, event_type: str) -> bool:
+        return self._regex.match(event_type) is not None
+
+    def key(self, device: str, resource: str) -> str:
+        return f"{device}|{resource}" if self.scope == 'resource' and resource else device
+
+
+class RingWindow:
+    """Pooled fixed-size timestamp rings, one slot of `size` entries per correlation key"""
+
+    def __init__(self, size: int, window: float):
+        self.size = size
+        self.window = window
+        self.slots: Dict[str, int] = {}
+        self.free: List[int] = []
+        self._blank = array('d', [0.0]) * size
+        self.times = array('d')
+        self.heads = array('l')
+        self.counts = array('l')
+        self.last = array('d')
+
+    def _allocate(self, key: str) -> int:
+        if self.free:
+            slot = self.free.pop()
+            self.heads[slot] = 0
+            self.counts[slot] = 0
+        else:
+            slot = len(self.heads)
+            self.times.extend(self._blank)
+            self.heads.append(0)
+            self.counts.append(0)
+            self.last.append(0.0)
+        self.slots[key] = slot
+        return slot
+
+    def add(self, key: str, ts: float) -> bool:
+        """Record an event; True when the last `size` events fall inside the window"""
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self._allocate(key)
+        base = slot * self.size
+        head = self.heads[slot]
+        self.times[base + head] = ts
+        head += 1
+        if head == self.size:
+            head = 0
+        self.heads[slot] = head
+        self.last[slot] = ts
+
+        count = self.counts[slot]
+        if count < self.size:
+            count += 1
+            self.counts[slot] = count
+        # Once full, `head` points at the oldest of the last `size` timestamps
+        return count == self.size and ts - self.times[base + head] <= self.window
+
+    def reset(self, key: str) -> None:
+        slot = self.slots.get(key)
+        if slot is not None:
+            self.counts[slot] = 0
+
+    def expire(self, before: float) -> int:
+        """Release slots idle since `before` for reuse"""
+        idle = [key for key, slot in self.slots.items() if self.last[slot] < before]
+        for key in idle:
+            self.free.append(self.slots.pop(key))
+        return len(idle)
+
+
+class CorrelationEngine:
+    """Correlate events into consolidated, cascade-suppressed automation actions"""
+
+    def __init__(self, triggers: List[Dict[str, Any]], topology: Optional[Dict[str, List[str]]] = None,
+                 settings: Optional[Dict[str, Any]] = None, sink: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.settings = dict(DEFAULTS, **(settings or {}))
+        self.triggers = [Trigger(spec, self.settings) for spec in triggers]
+        self._cooldown_by_trigger = {t.name: t.cooldown for t in self.triggers}
+        self.topology = {device: list(parents) for device, parents in (topology or {}).items() if parents}
+        self.sink = sink or (lambda action: None)
+
+        self._by_type: Dict[str, List[Trigger]] = {}
+        self._dedup: Dict[Tuple[str, str, str], Tuple[float, str]] = {}
+        self._incidents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._open_devices: Dict[str, List[Tuple[str, str]]] = {}
+        self._cooldowns: Dict[Tuple[str, str], float] = {}
+        self._active_roots: Dict[str, float] = {}
+
+        self.dedup_seconds = float(self.settings['dedup_seconds'])
+        self.hold = float(self.settings['consolidation_seconds'])
+        self.tick = float(self.settings['tick_seconds'])
+        self.idle_after = max([t.window for t in self.triggers] + [self.hold, self.dedup_seconds]) * 2
+        self._next_flush = None
+        self._next_expire = None
+        self.now = 0.0
+
+        self.stats = {
+            'events': 0, 'duplicates': 0, 'matched': 0, 'firings': 0, 'actions': 0,
+            'suppressed_cooldown': 0, 'suppressed_cascade': 0, 'merged': 0, 'expired_keys': 0,
+        }
+
+    def _triggers_for(self, event_type: str) -> List[Trigger]:
+        triggers = self._by_type.get(event_type)
+        if triggers is None:
+            triggers = self._by_type[event_type] = [t for t in self.triggers if t.matches(event_type)]
+        return triggers
+
+    def process(self, ts: float, device: str, event_type: str, resource: str = '', state: str = '') -> None:
+        """Consume one normalized event"""
+        self.stats['events'] += 1
+        self.advance(ts)
+        self.now = ts
+
+        triggers = self._triggers_for(event_type)
+        if not triggers:
+            return
+
+        # Collectors and retransmits repeat the same state; real flaps alternate it
+        dedup_key = (device, event_type, resource)
+        previous = self._dedup.get(dedup_key)
+        self._dedup[dedup_key] = (ts, state)
+        if previous is not None and previous[1] == state and ts - previous[0] < self.dedup_seconds:
+            self.stats['duplicates'] += 1
+            return
+
+        self.stats['matched'] += 1
+        for trigger in triggers:
+            if trigger.state and trigger.state != state:
+                continue
+            key = trigger.key(device, resource)
+            if trigger.ring.add(key, ts):
+                trigger.ring.reset(key)
+                self._fire(trigger, device, resource, ts)
+
+    def advance(self, now: float) -> List[Dict[str, Any]]:
+        """Run the flush and expiry passes that are due at event time `now`"""
+        emitted: List[Dict[str, Any]] = []
+        if self._next_flush is None:
+            self._next_flush = now + self.tick
+            self._next_expire = now + self.idle_after
+        elif now >= self._next_flush:
+            emitted = self.flush(now)
+            self._next_flush = now + self.tick
+            if now >= self._next_expire:
+                self.expire(now)
+                self._next_expire = now + self.idle_after
+        return emitted
+
+    def _fire(self, trigger: Trigger, device: str, resource: str, ts: float) -> None:
+        self.stats['firings'] += 1
+        incident_key = (trigger.name, device)
+        incident = self._incidents.get(incident_key)
+        if incident is None:
+            if self._cooldowns.get(incident_key, 0.0) > ts:
+                self.stats['suppressed_cooldown'] += 1
+                return
+            incident = self._incidents[incident_key] = {
+                'trigger': trigger.name, 'action': trigger.action, 'notification': trigger.notification,
+                'device': device, 'first_ts': ts, 'last_ts': ts, 'firings': 0,
+                'resources': set(), 'suppressed_devices': [],
+            }
+            self._open_devices.setdefault(device, []).append(incident_key)
+        incident['firings'] += 1
+        incident['last_ts'] = ts
+        if resource:
+            incident['resources'].add(resource)
+
+    def _upstream(self, device: str) -> Iterable[str]:
+        """Ancestors of a device, nearest first"""
+        seen = {device}
+        frontier = self.topology.get(device, [])
+        for _ in range(self.settings['max_topology_depth']):
+            next_frontier = []
+            for parent in frontier:
+                if parent not in seen:
+                    seen.add(parent)
+                    yield parent
+                    next_frontier.extend(self.topology.get(parent, []))
+            if not next_frontier:
+                return
+            frontier = next_frontier
+
+    def flush(self, now: float) -> List[Dict[str, Any]]:
+        """Close incidents past their consolidation hold and emit root-cause actions"""
+        due = [key for key, incident in self._incidents.items() if incident['first_ts'] + self.hold <= now]
+
+        # Merge each due incident into its farthest upstream device with an open
+        # incident, so a whole cascade collapses onto one root in a single pass
+        roots = []
+        for key in due:
+            root = None
+            for ancestor in self._upstream(key[1]):
+                if ancestor in self._open_devices:
+                    root = ancestor
+            roots.append(root)
+
+        for key, root in zip(due, roots):
+            if root is None or root not in self._open_devices:
+                continue
+            incident = self._close(key)
+            target = self._incidents[self._open_devices[root][0]]
+            target['suppressed_devices'].append(key[1])
+            target['suppressed_devices'].extend(incident['suppressed_devices'])
+            target['firings'] += incident['firings']
+            self._cooldowns[key] = now + self._cooldown_by_trigger[key[0]]
+            self.stats['merged'] += 1
+
+        emitted = []
+        for key in due:
+            incident = self._incidents.get(key)
+            if incident is None:
+                continue
+            self._close(key)
+            self._cooldowns[key] = now + self._cooldown_by_trigger[key[0]]
+            if any(self._active_roots.get(ancestor, 0.0) > now for ancestor in self._upstream(key[1])):
+                self.stats['suppressed_cascade'] += 1
+                continue
+            emitted.append(self._emit(incident, now))
+        return emitted
+
+    def _close(self, key: Tuple[str, str]) -> Dict[str, Any]:
+        incident = self._incidents.pop(key)
+        keys = self._open_devices[incident['device']]
+        keys.remove(key)
+        if not keys:
+            del self._open_devices[incident['device']]
+        return incident
+
+    def _emit(self, incident: Dict[str, Any], now: float) -> Dict[str, Any]:
+        action = dict(incident, resources=sorted(incident['resources']),
+                      suppressed_devices=sorted(set(incident['suppressed_devices'])), emitted_ts=now)
+        self._active_roots[incident['device']] = max(self._active_roots.get(incident['device'], 0.0),
+                                                     now + self._cooldown_by_trigger[incident['trigger']])
+        self.stats['actions'] += 1
+        self.sink(action)
+        return action
+
+    def expire(self, now: float) -> None:
+        """Drop idle correlation state so memory tracks active keys, not all devices seen"""
+        before = now - self.idle_after
+        for trigger in self.triggers:
+            self.stats['expired_keys'] += trigger.ring.expire(before)
+        self._dedup = {key: seen for key, seen in self._dedup.items() if seen[0] >= before}
+        self._cooldowns = {key: until for key, until in self._cooldowns.items() if until > now}
+        self._active_roots = {device: until for device, until in self._active_roots.items() if until > now}
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Emit everything still held, e.g. at the end of a replay"""
+        return self.flush(self.now + self.hold)
+
+    def state_size(self) -> Dict[str, int]:
+        return {
+            'ring_keys': sum(len(t.ring.slots) for t in self.triggers),
+            'ring_slots': sum(len(t.ring.heads) for t in self.triggers),
+            'dedup_keys': len(self._dedup),
+            'open_incidents': len(self._incidents),
+        }
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Load triggers, topology and settings from JSON or YAML"""
+    with open(path) as f:
+        if path.endswith(('.yml', '.yaml')):
+            import yaml
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def follow(stream: Iterable[str], timeout: float) -> Iterator[Optional[str]]:
+    """Yield lines from a live stream, or None after `timeout` seconds without input"""
+    lines: 'queue.Queue[Optional[str]]' = queue.Queue(maxsize=10000)
+
+    def read():
+        try:
+            for line in stream:
+                lines.put(line)
+        finally:
+            lines.put(None)
+
+    threading.Thread(target=read, name='event-reader', daemon=True).start()
+    while True:
+        try:
+            line = lines.get(timeout=timeout)
+        except queue.Empty:
+            yield None
+            continue
+        if line is None:
+            return
+        yield line
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Correlate network events into consolidated automation actions')
+    parser.add_argument('--config', '-c', required=True, help='Triggers/topology/settings (JSON or YAML)')
+    parser.add_argument('--input', '-i', default='-', help='JSONL alerts or syslog lines (default: stdin)')
+    parser.add_argument('--output', '-o', help='Append consolidated actions as JSONL')
+    parser.add_argument('--summary', help='Write replay statistics as JSON')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    config = load_config(args.config)
+    out = open(args.output, 'a') if args.output else sys.stdout
+
+    def sink(action):
+        out.write(json.dumps(action) + '\n')
+        out.flush()
+
+    engine = CorrelationEngine(config.get('triggers', []), config.get('topology', {}),
+                               config.get('settings', {}), sink)
+    logger.info(f"Loaded {len(engine.triggers)} triggers, {len(engine.topology)} topology entries")
+
+    # Replays flush on event time alone; a live stdin feed also ticks on the wall
+    # clock so held incidents are emitted when the event stream goes quiet
+    stream = follow(sys.stdin, engine.tick) if args.input == '-' else open(args.input)
+    unparsed = 0
+    last_event = time.monotonic()
+    try:
+        for line in stream:
+            if line is None:
+                if engine.stats['events']:
+                    engine.advance(engine.now + time.monotonic() - last_event)
+                continue
+            try:
+                event = parse_event(line)
+            except (ValueError, KeyError) as e:
+                logger.debug(f"Skipping malformed event: {e}")
+                event = None
+            if event is None:
+                unparsed += 1
+                continue
+            engine.process(*event)
+            last_event = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.drain()
+
+    summary = dict(engine.stats, unparsed=unparsed, **engine.state_size())
+    logger.info(f"Correlation summary: {summary}")
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if out is not sys.stdout:
+        out.close()
+
+
+if __name__ == '__main__':
+    main()
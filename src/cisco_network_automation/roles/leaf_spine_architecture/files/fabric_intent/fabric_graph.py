@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Fabric Intent Graph
+In-memory leaf-spine fabric model built from inventory and role defaults.
+Validates underlay adjacencies, OSPF areas, EVPN peering and VNI/VLAN/multicast
+mappings in a single indexed pass, and re-validates incrementally per device.
+"""
+
+import sys
+import json
+import argparse
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ERROR = 'error'
+SEVERITY_WARNING = 'warning'
+
+CheckKey = Tuple[str, ...]
+
+
+def normalize_area(area: Any) -> str:
+    """Normalize an OSPF area to dotted-decimal notation."""
+    if area is None:
+        return '0.0.0.0'
+    text = str(area).strip()
+    if text.isdigit():
+        value = int(text)
+        return '.'.join(str((value >> shift) & 0xFF) for shift in (24, 16, 8, 0))
+    return text
+
+
+class FabricNode:
+    """A single fabric switch and the intent declared for it."""
+
+    def __init__(self, name: str, data: Dict[str, Any]):
+        self.name = name
+        self.role = str(data.get('datacenter_role', 'leaf')).lower()
+        self.loopback = data.get('vtep_address') or data.get('ansible_host')
+        self.ospf_area = normalize_area(data.get('ospf_area'))
+        self.bgp_as = data.get('bgp_as')
+        self.evpn_enabled = bool(data.get('bgp_evpn_enabled', True))
+
+        # VLAN -> VNI mappings, keeping duplicates so they can be reported
+        self.vni_mappings: List[Tuple[int, int]] = [
+            (int(m['vni']), int(m['vlan_id']))
+            for m in data.get('vxlan_vni_mappings') or []
+        ]
+        self.mcast_groups: Dict[int, str] = {
+            int(m['vni']): str(m['multicast_group'])
+            for m in data.get('vxlan_multicast_groups') or []
+        }
+        self.evpn_neighbors: Set[str] = {
+            str(n['neighbor']) for n in data.get('bgp_evpn_neighbors') or []
+        }
+        self.links: Set[str] = {
+            str(link['peer']) for link in data.get('fabric_links') or []
+        }
+
+    @property
+    def vnis(self) -> Set[int]:
+        return {vni for vni, _ in self.vni_mappings}
+
+
+class Finding:
+    """A validation result attached to a check key."""
+
+    def __init__(self, check: str, severity: str, subject: str, message: str):
+        self.check = check
+        self.severity = severity
+        self.subject = subject
+        self.message = message
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            'check': self.check,
+            'severity': self.severity,
+            'subject': self.subject,
+            'message': self.message,
+        }
+
+
+class FabricGraph:
+    """Indexed fabric model with full and incremental validation."""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.vni_range = (
+            int(settings.get('vni_range_start', 1)),
+            int(settings.get('vni_range_end', 16777214)),
+        )
+        self.require_links = bool(settings.get('require_fabric_links', False))
+
+        self.nodes: Dict[str, FabricNode] = {}
+        self.spines: Set[str] = set()
+        self.leaves: Set[str] = set()
+
+        # Hash indexes: key -> value -> set of node names declaring it
+        self.vni_vlan_index: Dict[int, Dict[int, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.vni_mcast_index: Dict[int, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.mcast_vni_index: Dict[str, Set[int]] = defaultdict(set)
+        self.mcast_refcount: Dict[Tuple[str, int], int] = defaultdict(int)
+        self.loopback_index: Dict[str, Set[str]] = defaultdict(set)
+        self.link_index: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        # Reverse links: peer name -> nodes declaring a link to it
+        self.peer_index: Dict[str, Set[str]] = defaultdict(set)
+
+        self.findings: Dict[CheckKey, List[Finding]] = {}
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def _index(self, node: FabricNode) -> None:
+        self.nodes[node.name] = node
+        (self.spines if node.role == 'spine' else self.leaves).add(node.name)
+        for vni, vlan in node.vni_mappings:
+            self.vni_vlan_index[vni][vlan].add(node.name)
+        for vni, group in node.mcast_groups.items():
+            self.vni_mcast_index[vni][group].add(node.name)
+            self.mcast_refcount[(group, vni)] += 1
+            self.mcast_vni_index[group].add(vni)
+        if node.loopback:
+            self.loopback_index[node.loopback].add(node.name)
+        for peer in node.links:
+            self.link_index[self._edge(node.name, peer)].add(node.name)
+            self.peer_index[peer].add(node.name)
+
+    def _unindex(self, node: FabricNode) -> None:
+        self.nodes.pop(node.name, None)
+        self.spines.discard(node.name)
+        self.leaves.discard(node.name)
+        for vni, vlan in node.vni_mappings:
+            self._discard(self.vni_vlan_index[vni], vlan, node.name)
+            if not self.vni_vlan_index[vni]:
+                del self.vni_vlan_index[vni]
+        for vni, group in node.mcast_groups.items():
+            self._discard(self.vni_mcast_index[vni], group, node.name)
+            if not self.vni_mcast_index[vni]:
+                del self.vni_mcast_index[vni]
+            self.mcast_refcount[(group, vni)] -= 1
+            if self.mcast_refcount[(group, vni)] <= 0:
+                del self.mcast_refcount[(group, vni)]
+                self.mcast_vni_index[group].discard(vni)
+                if not self.mcast_vni_index[group]:
+                    del self.mcast_vni_index[group]
+        if node.loopback:
+            self._discard(self.loopback_index, node.loopback, node.name)
+        for peer in node.links:
+            self._discard(self.link_index, self._edge(node.name, peer), node.name)
+            self._discard(self.peer_index, peer, node.name)
+
+    @staticmethod
+    def _discard(index: Dict[Any, Set[str]], key: Any, name: str) -> None:
+        members = index.get(key)
+        if members is None:
+            return
+        members.discard(name)
+        if not members:
+            del index[key]
+
+    @staticmethod
+    def _edge(a: str, b: str) -> Tuple[str, str]:
+        return (a, b) if a <= b else (b, a)
+
+    # ------------------------------------------------------------------
+    # Check keys
+    # ------------------------------------------------------------------
+
+    def _neighborhood(self, node: FabricNode) -> Set[CheckKey]:
+        """Return every check key whose result depends on this node."""
+        keys: Set[CheckKey] = {('node', node.name)}
+        keys.update(('node', peer) for peer in node.links)
+        # Nodes linking to this one report it as unknown or same-tier
+        keys.update(('node', peer) for peer in self.peer_index.get(node.name, ()))
+        keys.update(('vni', str(vni)) for vni in node.vnis | set(node.mcast_groups))
+        keys.update(('mcast', group) for group in node.mcast_groups.values())
+        if node.loopback:
+            keys.add(('loopback', node.loopback))
+        if node.role == 'spine':
+            keys.update(('adjacency', leaf, node.name) for leaf in self.leaves)
+        else:
+            keys.update(('adjacency', node.name, spine) for spine in self.spines)
+        return keys
+
+    def _all_keys(self) -> Set[CheckKey]:
+        keys: Set[CheckKey] = {('fabric',)}
+        keys.update(('node', name) for name in self.nodes)
+        keys.update(('vni', str(vni)) for vni in set(self.vni_vlan_index) | set(self.vni_mcast_index))
+        keys.update(('mcast', group) for group in self.mcast_vni_index)
+        keys.update(('loopback', ip) for ip in self.loopback_index)
+        keys.update(('adjacency', leaf, spine) for leaf in self.leaves for spine in self.spines)
+        return keys
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+
+    def _evaluate(self, key: CheckKey) -> List[Finding]:
+        kind = key[0]
+        if kind == 'adjacency':
+            return self._check_adjacency(key[1], key[2])
+        if kind == 'vni':
+            return self._check_vni(int(key[1]))
+        if kind == 'mcast':
+            return self._check_mcast(key[1])
+        if kind == 'loopback':
+            return self._check_loopback(key[1])
+        if kind == 'node':
+            return self._check_node(key[1])
+        if kind == 'fabric':
+            return self._check_fabric()
+        return []
+
+    def _check_adjacency(self, leaf_name: str, spine_name: str) -> List[Finding]:
+        if leaf_name not in self.leaves or spine_name not in self.spines:
+            return []
+        leaf = self.nodes[leaf_name]
+        spine = self.nodes[spine_name]
+        subject = f"{leaf_name}<->{spine_name}"
+        findings = []
+
+        edge = self._edge(leaf_name, spine_name)
+        if (self.require_links or leaf.links or spine.links) and edge not in self.link_index:
+            findings.append(Finding('underlay_link', SEVERITY_ERROR, subject,
+                                    'Expected leaf-spine underlay link is not declared'))
+        if leaf.ospf_area != spine.ospf_area:
+            findings.append(Finding('ospf_area', SEVERITY_ERROR, subject,
+                                    f"OSPF area mismatch: {leaf.ospf_area} vs {spine.ospf_area}"))
+        if leaf.evpn_enabled and spine.evpn_enabled:
+            if spine.loopback and spine.loopback not in leaf.evpn_neighbors:
+                findings.append(Finding('evpn_peer', SEVERITY_ERROR, subject,
+                                        f"{leaf_name} has no EVPN session to spine {spine.loopback}"))
+            if spine.evpn_neighbors and leaf.loopback and leaf.loopback not in spine.evpn_neighbors:
+                findings.append(Finding('evpn_peer', SEVERITY_ERROR, subject,
+                                        f"{spine_name} has no EVPN session to leaf {leaf.loopback}"))
+        return findings
+
+    def _check_vni(self, vni: int) -> List[Finding]:
+        findings = []
+        subject = f"vni {vni}"
+        vlans = self.vni_vlan_index.get(vni, {})
+        if vlans and not self.vni_range[0] <= vni <= self.vni_range[1]:
+            findings.append(Finding('vni_range', SEVERITY_ERROR, subject,
+                                    f"VNI outside range {self.vni_range[0]}-{self.vni_range[1]}"))
+        if len(vlans) > 1:
+            detail = ', '.join(f"vlan {vlan} on {len(names)} device(s)" for vlan, names in sorted(vlans.items()))
+            findings.append(Finding('vni_vlan_collision', SEVERITY_ERROR, subject,
+                                    f"VNI mapped to multiple VLANs: {detail}"))
+        groups = self.vni_mcast_index.get(vni, {})
+        if len(groups) > 1:
+            detail = ', '.join(sorted(groups))
+            findings.append(Finding('vni_mcast_collision', SEVERITY_ERROR, subject,
+                                    f"VNI uses different multicast groups: {detail}"))
+        if groups and not vlans:
+            findings.append(Finding('vni_mcast_orphan', SEVERITY_WARNING, subject,
+                                    'Multicast group assigned to a VNI with no VLAN mapping'))
+        return findings
+
+    def _check_mcast(self, group: str) -> List[Finding]:
+        vnis = self.mcast_vni_index.get(group, set())
+        if len(vnis) > 1:
+            return [Finding('mcast_group_shared', SEVERITY_WARNING, f"group {group}",
+                            f"Multicast group shared by {len(vnis)} VNIs: "
+                            f"{', '.join(str(v) for v in sorted(vnis))}")]
+        return []
+
+    def _check_loopback(self, address: str) -> List[Finding]:
+        names = self.loopback_index.get(address, set())
+        if len(names) > 1:
+            return [Finding('loopback_collision', SEVERITY_ERROR, f"loopback {address}",
+                            f"Loopback shared by {', '.join(sorted(names))}")]
+        return []
+
+    def _check_node(self, name: str) -> List[Finding]:
+        node = self.nodes.get(name)
+        if node is None:
+            return []
+        findings = []
+        if not node.loopback:
+            findings.append(Finding('loopback_missing', SEVERITY_ERROR, name, 'No VTEP/loopback address'))
+        seen: Dict[int, int] = {}
+        for vni, vlan in node.vni_mappings:
+            if vlan in seen and seen[vlan] != vni:
+                findings.append(Finding('vlan_vni_collision', SEVERITY_ERROR, name,
+                                        f"VLAN {vlan} mapped to VNIs {seen[vlan]} and {vni}"))
+            seen.setdefault(vlan, vni)
+        for peer in sorted(node.links):
+            peer_node = self.nodes.get(peer)
+            if peer_node is None:
+                findings.append(Finding('underlay_link', SEVERITY_ERROR, name,
+                                        f"Link to unknown device {peer}"))
+            elif peer_node.role == node.role:
+                findings.append(Finding('underlay_link', SEVERITY_WARNING, name,
+                                        f"Link to same-tier device {peer}"))
+        return findings
+
+    def _check_fabric(self) -> List[Finding]:
+        if self.leaves and not self.spines:
+            return [Finding('underlay_link', SEVERITY_ERROR, 'fabric',
+                            f"{len(self.leaves)} leaves but no spines declared")]
+        return []
+
+    def _apply(self, keys: Iterable[CheckKey]) -> int:
+        checked = 0
+        for key in keys:
+            checked += 1
+            result = self._evaluate(key)
+            if result:
+                self.findings[key] = result
+            else:
+                self.findings.pop(key, None)
+        return checked
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def load(self, hosts: Dict[str, Dict[str, Any]]) -> None:
+        """Index every device in one pass."""
+        for name, data in hosts.items():
+            self._index(FabricNode(name, data or {}))
+
+    def validate(self) -> int:
+        """Run every check; returns the number of checks evaluated."""
+        self.findings.clear()
+        return self._apply(self._all_keys())
+
+    def validate_neighborhood(self, names: Iterable[str]) -> int:
+        """Run only the checks touching the given devices."""
+        keys: Set[CheckKey] = set()
+        for name in names:
+            node = self.nodes.get(name)
+            if node is not None:
+                keys |= self._neighborhood(node)
+        return self._apply(keys)
+
+    def update_node(self, name: str, data: Optional[Dict[str, Any]]) -> int:
+        """Replace (or remove, when data is None) a device and re-check its neighborhood."""
+        dirty: Set[CheckKey] = set()
+        old = self.nodes.get(name)
+        if old is not None:
+            dirty |= self._neighborhood(old)
+            self._unindex(old)
+        if data is not None:
+            new = FabricNode(name, data)
+            self._index(new)
+            dirty |= self._neighborhood(new)
+        # Tier membership may have changed the expected spine set
+        dirty.add(('fabric',))
+        return self._apply(dirty)
+
+    def report(self) -> Dict[str, Any]:
+        findings = [f.to_dict() for key in sorted(self.findings) for f in self.findings[key]]
+        errors = sum(1 for f in findings if f['severity'] == SEVERITY_ERROR)
+        return {
+            'summary': {
+                'spines': len(self.spines),
+                'leaves': len(self.leaves),
+                'expected_adjacencies': len(self.spines) * len(self.leaves),
+                'vnis': len(set(self.vni_vlan_index) | set(self.vni_mcast_index)),
+                'multicast_groups': len(self.mcast_vni_index),
+                'errors': errors,
+                'warnings': len(findings) - errors,
+                'status': 'FAIL' if errors else 'PASS',
+            },
+            'findings': findings,
+        }
+
+
+def load_intent(path: str) -> Dict[str, Any]:
+    """Load a fabric intent document (YAML or JSON)."""
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate leaf-spine fabric intent')
+    parser.add_argument('--intent', '-i', required=True,
+                        help='Fabric intent document (YAML or JSON)')
+    parser.add_argument('--changed', nargs='*', default=None,
+                        help='Only re-check the neighborhood of these devices')
+    parser.add_argument('--output', '-o', help='Write JSON report to file')
+    parser.add_argument('--fail-on-error', action='store_true',
+                        help='Exit with non-zero code if errors are found')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    intent = load_intent(args.intent)
+    graph = FabricGraph(intent.get('settings'))
+    graph.load(intent.get('hosts') or {})
+
+    if args.changed:
+        checked = graph.validate_neighborhood(args.changed)
+    else:
+        checked = graph.validate()
+
+    report = graph.report()
+    report['summary']['checks_evaluated'] = checked
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        logger.info(f"Report written to: {args.output}")
+    print(output)
+
+    if args.fail_on_error and report['summary']['errors']:
+        sys.exit(1)
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
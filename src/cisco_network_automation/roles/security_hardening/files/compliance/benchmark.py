@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Compliance Scanner Benchmark
+Generates a synthetic fleet of running configs and times cold and cached scans.
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from compliance_scanner import ComplianceScanner, build_rules
+
+BASE_CONFIG = """!
+version 16.9
+service timestamps log datetime msec
+service password-encryption
+hostname {host}
+!
+security passwords min-length {min_length}
+login block-for 300 attempts 3 within 60
+login on-failure log
+login on-success log
+!
+username admin privilege 15 secret 9 $9$abcdefghijklmnop
+!
+ip ssh version 2
+ip ssh time-out 300
+ip ssh authentication-retries 3
+!
+{interfaces}
+!
+snmp-server community {community} RO {snmp_acl}
+snmp-server enable traps config
+!
+logging buffered 4096
+logging host 10.0.10.{log_host}
+!
+archive
+ log config
+  logging enable
+  hidekeys
+!
+banner motd ^CAuthorized access only^C
+banner login ^C
+AUTHORIZED ACCESS ONLY
+^C
+banner exec ^CAll commands are logged^C
+!
+line vty 0 15
+ exec-timeout 5 0
+ transport input {transport}
+!
+end
+"""
+
+INTERFACE = """interface GigabitEthernet0/{index}
+ description uplink-{index}
+ ip address 10.{a}.{b}.1 255.255.255.252
+ no shutdown
+!"""
+
+
+def generate_fleet(directory: str, devices: int, interfaces: int, violation_rate: float) -> None:
+    """Write one running-config backup per synthetic device."""
+    rng = random.Random(42)
+    for n in range(devices):
+        bad = rng.random() < violation_rate
+        body = BASE_CONFIG.format(
+            host=f"device-{n:05d}",
+            min_length=6 if bad and rng.random() < 0.5 else 8,
+            interfaces='\n'.join(INTERFACE.format(index=i, a=n % 250, b=i) for i in range(interfaces)),
+            community='public' if bad and rng.random() < 0.3 else f"c{n:05d}",
+            snmp_acl='SNMP_RO_ACL',
+            log_host=n % 250,
+            transport='ssh telnet' if bad and rng.random() < 0.3 else 'ssh',
+        )
+        path = os.path.join(directory, f"device-{n:05d}_running_1700000000.cfg")
+        with open(path, 'w') as f:
+            f.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the offline compliance scanner')
+    parser.add_argument('--devices', type=int, default=10000, help='Number of configs')
+    parser.add_argument('--interfaces', type=int, default=48, help='Interfaces per config')
+    parser.add_argument('--violation-rate', type=float, default=0.1, help='Fraction of non-compliant devices')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        generate_fleet(directory, args.devices, args.interfaces, args.violation_rate)
+        generate_time = time.perf_counter() - start
+
+        cache_file = os.path.join(directory, '.compliance_cache.json')
+        rules = build_rules({})
+
+        scanner = ComplianceScanner(rules, cache_file=cache_file, workers=args.workers)
+        configs = scanner.discover(directory)
+        start = time.perf_counter()
+        report = scanner.report(scanner.scan(configs))
+        cold_time = time.perf_counter() - start
+
+        scanner = ComplianceScanner(rules, cache_file=cache_file, workers=args.workers)
+        start = time.perf_counter()
+        scanner.report(scanner.scan(configs))
+        warm_time = time.perf_counter() - start
+
+    summary = report['summary']
+    print("COMPLIANCE SCANNER BENCHMARK")
+    print(f"Fleet: {args.devices} configs, {args.interfaces} interfaces each "
+          f"(generated in {generate_time:.1f}s)")
+    print(f"Workers: {scanner.workers}, rules: {summary['rules_evaluated']}")
+    print(f"Cold scan: {cold_time:.2f}s ({args.devices / cold_time:.0f} configs/s)")
+    print(f"Cached scan: {warm_time:.2f}s ({scanner.cache_hits} cache hits)")
+    print(f"Compliance: {summary['compliant_devices']}/{summary['devices_scanned']} "
+          f"({summary['compliance_rate']}%)")
+
+
+if __name__ == '__main__':
+    main()
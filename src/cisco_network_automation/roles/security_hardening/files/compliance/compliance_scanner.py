@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Offline Configuration Compliance Scanner
+Evaluates security_hardening policy rules against backed-up running configs.
+Each config is parsed once into an indexed section tree; configs are scanned
+in a process pool and results are cached by content hash.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+BANNER_PATTERN = re.compile(r'^banner\s+(\S+)\s+(\S)(.*)$')
+BACKUP_NAME_PATTERN = re.compile(r'^(?P<host>.+)_running_(?P<timestamp>\d+)\.cfg$')
+ANCHOR_PATTERN = re.compile(r'^\^([\w-]+)(?: |\$|$)')
+
+# Policy defaults mirror roles/security_hardening/defaults/main.yml
+DEFAULT_POLICY = {
+    'min_password_length': 8,
+    'auth_failure_rate': 3,
+    'login_block_time': 300,
+    'login_attempts': 3,
+    'login_time_window': 60,
+    'ssh_timeout': 300,
+    'ssh_auth_retries': 3,
+    'vty_timeout': '5 0',
+    'log_buffer_size': '4096',
+    'required_banners': ['motd', 'login', 'exec'],
+}
+
+
+class ConfigTree:
+    """Running configuration parsed into indexed top-level sections."""
+
+    def __init__(self, text: str):
+        self.lines: set = set()
+        self.children: Dict[str, set] = {}
+        self.by_keyword: Dict[str, List[str]] = defaultdict(list)
+        self.banners: Dict[str, str] = {}
+        self._parse(text)
+
+    def _parse(self, text: str) -> None:
+        parent: Optional[str] = None
+        banner: Optional[Tuple[str, str, List[str]]] = None
+
+        for raw in text.splitlines():
+            if banner is not None:
+                kind, delimiter, body = banner
+                if delimiter in raw:
+                    body.append(raw.split(delimiter, 1)[0])
+                    self.banners[kind] = '\n'.join(body).strip()
+                    banner = None
+                else:
+                    body.append(raw)
+                continue
+
+            line = raw.rstrip()
+            if not line or line.startswith('!'):
+                parent = None if line.startswith('!') else parent
+                continue
+
+            if line[0] in ' \t':
+                if parent is not None:
+                    self.children[parent].add(line.strip())
+                continue
+
+            match = BANNER_PATTERN.match(line)
+            if match:
+                kind, delimiter, rest = match.groups()
+                # IOS shows ^C as a two-character delimiter
+                if delimiter == '^' and rest.startswith('C'):
+                    delimiter, rest = '^C', rest[1:]
+                if delimiter in rest:
+                    self.banners[kind] = rest.split(delimiter, 1)[0].strip()
+                else:
+                    banner = (kind, delimiter, [rest])
+                parent = None
+                continue
+
+            self.lines.add(line)
+            self.by_keyword[line.split(' ', 1)[0]].append(line)
+            self.children.setdefault(line, set())
+            parent = line
+
+    def scope(self, parent_pattern: Optional[str]) -> List[Iterable[str]]:
+        """Return the line sets a rule applies to."""
+        if parent_pattern is None:
+            return [self.lines]
+        regex = re.compile(parent_pattern)
+        return [self.children[line] for line in self.candidates(parent_pattern) if regex.search(line)]
+
+    def candidates(self, pattern: str) -> Iterable[str]:
+        """Anchored patterns only need the lines sharing their first keyword."""
+        keyword = anchor_keyword(pattern)
+        return self.by_keyword.get(keyword, []) if keyword else self.lines
+
+
+def anchor_keyword(pattern: str) -> Optional[str]:
+    """Return the literal first keyword of an anchored pattern, if any."""
+    match = ANCHOR_PATTERN.match(pattern)
+    return match.group(1) if match else None
+
+
+def build_rules(policy: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Build the rule set from rendered security_hardening settings."""
+    p = dict(DEFAULT_POLICY)
+    p.update({k: v for k, v in (policy or {}).items() if v is not None})
+
+    rules = [
+        # SSH
+        {'id': 'SSH-001', 'category': 'ssh', 'severity': 'high',
+         'description': 'SSH version 2 only', 'type': 'present', 'pattern': r'^ip ssh version 2$'},
+        {'id': 'SSH-002', 'category': 'ssh', 'severity': 'medium',
+         'description': f"SSH timeout {p['ssh_timeout']}s or less", 'type': 'max_value',
+         'pattern': r'^ip ssh time-out (\d+)$', 'value': int(p['ssh_timeout'])},
+        {'id': 'SSH-003', 'category': 'ssh', 'severity': 'medium',
+         'description': f"SSH authentication retries {p['ssh_auth_retries']} or less", 'type': 'max_value',
+         'pattern': r'^ip ssh authentication-retries (\d+)$', 'value': int(p['ssh_auth_retries'])},
+        {'id': 'SSH-004', 'category': 'ssh', 'severity': 'high',
+         'description': 'VTY lines accept SSH only', 'type': 'present', 'scope': r'^line vty ',
+         'pattern': r'^transport input ssh$'},
+        {'id': 'SSH-005', 'category': 'ssh', 'severity': 'medium',
+         'description': f"VTY exec-timeout {p['vty_timeout']}", 'type': 'present', 'scope': r'^line vty ',
+         'pattern': rf"^exec-timeout {re.escape(str(p['vty_timeout']))}$"},
+        {'id': 'SSH-006', 'category': 'ssh', 'severity': 'high',
+         'description': 'Telnet disabled on VTY lines', 'type': 'absent', 'scope': r'^line vty ',
+         'pattern': r'^transport input .*telnet'},
+        # SNMP
+        {'id': 'SNMP-001', 'category': 'snmp', 'severity': 'critical',
+         'description': 'Default SNMP communities removed', 'type': 'absent',
+         'pattern': r'^snmp-server community (public|private)( |$)'},
+        {'id': 'SNMP-002', 'category': 'snmp', 'severity': 'high',
+         'description': 'SNMP communities restricted by ACL', 'type': 'absent',
+         'pattern': r'^snmp-server community \S+ (RO|RW)$'},
+        {'id': 'SNMP-003', 'category': 'snmp', 'severity': 'medium',
+         'description': 'SNMP traps enabled', 'type': 'present', 'pattern': r'^snmp-server enable traps'},
+        # Password
+        {'id': 'PWD-001', 'category': 'password', 'severity': 'high',
+         'description': 'Service password-encryption enabled', 'type': 'present',
+         'pattern': r'^service password-encryption$'},
+        {'id': 'PWD-002', 'category': 'password', 'severity': 'high',
+         'description': f"Minimum password length {p['min_password_length']} or more", 'type': 'min_value',
+         'pattern': r'^security passwords min-length (\d+)$', 'value': int(p['min_password_length'])},
+        {'id': 'PWD-003', 'category': 'password', 'severity': 'medium',
+         'description': 'Login block-for configured', 'type': 'present',
+         'pattern': r'^login block-for \d+ attempts \d+ within \d+$'},
+        {'id': 'PWD-004', 'category': 'password', 'severity': 'critical',
+         'description': 'No cleartext or type 7 user passwords', 'type': 'absent',
+         'pattern': r'^(username \S+ .*password [07] |enable password )'},
+        {'id': 'PWD-005', 'category': 'password', 'severity': 'medium',
+         'description': 'Login failures logged', 'type': 'present', 'pattern': r'^login on-failure log'},
+        # Logging
+        {'id': 'LOG-001', 'category': 'logging', 'severity': 'medium',
+         'description': f"Logging buffer {p['log_buffer_size']} or larger", 'type': 'min_value',
+         'pattern': r'^logging buffered (\d+)', 'value': int(p['log_buffer_size'])},
+        {'id': 'LOG-002', 'category': 'logging', 'severity': 'high',
+         'description': 'Remote syslog host configured', 'type': 'present', 'pattern': r'^logging (host )?\d+\.'},
+        {'id': 'LOG-003', 'category': 'logging', 'severity': 'medium',
+         'description': 'Configuration change archive logging', 'type': 'present', 'scope': r'^archive$',
+         'pattern': r'^log config$'},
+        {'id': 'LOG-004', 'category': 'logging', 'severity': 'low',
+         'description': 'Timestamps on log messages', 'type': 'present',
+         'pattern': r'^service timestamps log '},
+    ]
+    for banner in p['required_banners']:
+        rules.append({'id': f"BNR-{banner.upper()}", 'category': 'banner', 'severity': 'low',
+                      'description': f"Banner {banner} configured", 'type': 'banner', 'pattern': banner})
+    return rules
+
+
+def compile_rules(rules: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Any]]:
+    """Pair each rule with its compiled pattern."""
+    return [(rule, None if rule['type'] == 'banner' else re.compile(rule['pattern'])) for rule in rules]
+
+
+def evaluate_rule(tree: ConfigTree, rule: Dict[str, Any], regex) -> bool:
+    """Return True when the config satisfies the rule."""
+    if rule['type'] == 'banner':
+        return bool(tree.banners.get(rule['pattern']))
+
+    if rule.get('scope') is None:
+        scopes = [tree.candidates(rule['pattern'])]
+    else:
+        scopes = tree.scope(rule['scope'])
+
+    if rule['type'] == 'absent':
+        return not any(regex.search(line) for lines in scopes for line in lines)
+    if rule['type'] == 'present':
+        # Scoped rules must hold in every matching section
+        return bool(scopes) and all(any(regex.search(line) for line in lines) for lines in scopes)
+
+    values = [int(m.group(1)) for lines in scopes for line in lines for m in [regex.search(line)] if m]
+    if not values:
+        return False
+    if rule['type'] == 'min_value':
+        return min(values) >= rule['value']
+    if rule['type'] == 'max_value':
+        return max(values) <= rule['value']
+    raise ValueError(f"Unknown rule type: {rule['type']}")
+
+
+def scan_config(path: str, compiled: List[Tuple[Dict[str, Any], Any]]) -> Dict[str, Any]:
+    """Parse one config and evaluate every rule against it."""
+    with open(path, 'r', errors='replace') as f:
+        tree = ConfigTree(f.read())
+    failed = [rule['id'] for rule, regex in compiled if not evaluate_rule(tree, rule, regex)]
+    return {'failed': failed, 'passed': len(compiled) - len(failed)}
+
+
+def _scan_chunk(paths: List[str], rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    compiled = compile_rules(rules)
+    return [scan_config(path, compiled) for path in paths]
+
+
+class ComplianceScanner:
+    """Fleet compliance scan over a directory of running-config backups."""
+
+    def __init__(self, rules: List[Dict[str, Any]], cache_file: Optional[str] = None,
+                 workers: Optional[int] = None, chunk_size: int = 64):
+        self.rules = rules
+        self.rule_index = {rule['id']: rule for rule in rules}
+        self.cache_file = cache_file
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.policy_hash = hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:16]
+        self.cache: Dict[str, Dict[str, Any]] = self._load_cache()
+        self.cache_hits = 0
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            # Results are only valid for the policy they were computed with
+            if data.get('policy_hash') != self.policy_hash:
+                return {}
+            return data.get('results', {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache {self.cache_file}: {e}")
+            return {}
+
+    def _save_cache(self) -> None:
+        if not self.cache_file:
+            return
+        tmp = f"{self.cache_file}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'policy_hash': self.policy_hash, 'results': self.cache}, f)
+        os.replace(tmp, self.cache_file)
+
+    @staticmethod
+    def discover(backup_dir: str, latest_only: bool = True) -> Dict[str, str]:
+        """Map device name to its backed-up config path."""
+        configs: Dict[str, Tuple[int, str]] = {}
+        for entry in os.scandir(backup_dir):
+            if not entry.is_file() or not entry.name.endswith('.cfg'):
+                continue
+            match = BACKUP_NAME_PATTERN.match(entry.name)
+            if match:
+                host, timestamp = match.group('host'), int(match.group('timestamp'))
+            else:
+                host, timestamp = entry.name[:-len('.cfg')], 0
+            key = host if latest_only else entry.name[:-len('.cfg')]
+            if key not in configs or timestamp > configs[key][0]:
+                configs[key] = (timestamp, entry.path)
+        return {host: path for host, (_, path) in configs.items()}
+
+    @staticmethod
+    def _digest(path: str) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def scan(self, configs: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """Scan every config, reusing cached results for unchanged content."""
+        results: Dict[str, Dict[str, Any]] = {}
+        pending: List[Tuple[str, str, str]] = []
+        seen: Set[str] = set()
+        self.cache_hits = 0
+
+        for host, path in configs.items():
+            digest = self._digest(path)
+            seen.add(digest)
+            cached = self.cache.get(digest)
+            if cached is not None:
+                results[host] = cached
+                self.cache_hits += 1
+            else:
+                pending.append((host, path, digest))
+
+        chunks = [pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+        if self.workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                outputs = pool.map(_scan_chunk, [[p for _, p, _ in c] for c in chunks],
+                                   [self.rules] * len(chunks))
+                for chunk, output in zip(chunks, outputs):
+                    self._collect(chunk, output, results)
+        else:
+            for chunk in chunks:
+                self._collect(chunk, _scan_chunk([p for _, p, _ in chunk], self.rules), results)
+
+        # Keep only configs that still exist so the cache tracks the current fleet
+        self.cache = {digest: result for digest, result in self.cache.items() if digest in seen}
+        self._save_cache()
+        return results
+
+    def _collect(self, chunk, output, results) -> None:
+        for (host, _, digest), result in zip(chunk, output):
+            self.cache[digest] = result
+            results[host] = result
+
+    def report(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Aggregate per-device results into a fleet report."""
+        rule_failures: Dict[str, int] = defaultdict(int)
+        category_checks: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        devices = {}
+
+        for host in sorted(results):
+            failed = results[host]['failed']
+            for rule_id in failed:
+                rule_failures[rule_id] += 1
+            failed_set = set(failed)
+            for rule in self.rules:
+                counts = category_checks[rule['category']]
+                counts[0] += rule['id'] not in failed_set
+                counts[1] += 1
+            devices[host] = {
+                'compliant': not failed,
+                'score': round(100.0 * results[host]['passed'] / max(len(self.rules), 1), 1),
+                'failed_rules': failed,
+            }
+
+        total = len(results)
+        compliant = sum(1 for d in devices.values() if d['compliant'])
+        return {
+            'summary': {
+                'devices_scanned': total,
+                'compliant_devices': compliant,
+                'non_compliant_devices': total - compliant,
+                'compliance_rate': round(100.0 * compliant / total, 1) if total else 100.0,
+                'rules_evaluated': len(self.rules),
+                'cache_hits': self.cache_hits,
+                'status': 'PASS' if compliant == total else 'FAIL',
+            },
+            'categories': {
+                category: round(100.0 * passed / checks, 1) if checks else 100.0
+                for category, (passed, checks) in sorted(category_checks.items())
+            },
+            'rule_failures': [
+                {'id': rule_id, 'severity': self.rule_index[rule_id]['severity'],
+                 'description': self.rule_index[rule_id]['description'], 'devices': count}
+                for rule_id, count in sorted(rule_failures.items(), key=lambda item: -item[1])
+            ],
+            'devices': devices,
+        }
+
+
+def format_text(report: Dict[str, Any]) -> str:
+    summary = report['summary']
+    lines = [
+        'FLEET COMPLIANCE REPORT',
+        f"Devices Scanned: {summary['devices_scanned']}",
+        f"Compliant: {summary['compliant_devices']} ({summary['compliance_rate']}%)",
+        f"Non-Compliant: {summary['non_compliant_devices']}",
+        f"Cached Results: {summary['cache_hits']}",
+        f"Status: {summary['status']}",
+        '',
+        'Category Scores:',
+    ]
+    lines += [f"  {category}: {score}%" for category, score in report['categories'].items()]
+    if report['rule_failures']:
+        lines += ['', 'Top Rule Failures:']
+        lines += [f"  {r['id']} [{r['severity']}] {r['description']}: {r['devices']} device(s)"
+                  for r in report['rule_failures'][:20]]
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline compliance scan of backed-up running configs')
+    parser.add_argument('--backup-dir', '-d', required=True, help='Directory of running-config backups')
+    parser.add_argument('--policy', '-p', help='Policy settings file (YAML or JSON)')
+    parser.add_argument('--cache', help='Result cache file (default: compliance_cache.json next to --output)')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='Worker processes')
+    parser.add_argument('--all-versions', action='store_true',
+                        help='Scan every backup instead of the latest per device')
+    parser.add_argument('--output', '-o', help='Write JSON report to file')
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help='Stdout format')
+    parser.add_argument('--exit-code', action='store_true',
+                        help='Exit with non-zero code if any device is non-compliant')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    policy = {}
+    if args.policy:
+        with open(args.policy, 'r') as f:
+            policy = yaml.safe_load(f) or {}
+
+    if not Path(args.backup_dir).is_dir():
+        print(f"Backup directory not found: {args.backup_dir}")
+        sys.exit(1 if args.exit_code else 0)
+
+    scanner = ComplianceScanner(
+        build_rules(policy),
+        cache_file=args.cache or os.path.join(os.path.dirname(os.path.abspath(args.output)) if args.output
+                                              else os.getcwd(), 'compliance_cache.json'),
+        workers=args.workers,
+    )
+    configs = scanner.discover(args.backup_dir, latest_only=not args.all_versions)
+    report = scanner.report(scanner.scan(configs))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report['summary']) if args.format == 'json' else format_text(report))
+
+    if args.exit_code and report['summary']['non_compliant_devices']:
+        sys.exit(1)
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()